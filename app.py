@@ -3,6 +3,7 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
 from extensions import db, migrate, mail
+from utils.crypto import init_crypto
 from datetime import datetime
 import time
 
@@ -14,14 +15,15 @@ app.config.from_object(Config)
 db.init_app(app)
 migrate.init_app(app, db)
 mail.init_app(app)
+init_crypto(app)
 
 # Setup CORS
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type"],
+        "allow_headers": ["Content-Type", "Authorization", "X-Payload-Compression", "Idempotency-Key"],
+        "expose_headers": ["Content-Type", "Idempotent-Replayed"],
     }
 }, supports_credentials=True)
 
@@ -59,16 +61,24 @@ from models.category import Category
 from models.subcategory import SubCategory
 from models.customer import Customer
 from models.product import Product
+from models.product_variant import ProductVariant
+from models.product_stock_snapshot import ProductStockSnapshot
 from models.cart import Cart
 from models.wishlist import Wishlist
 from models.admin import Admin, create_default_admin
 from models.address import Address
 from models.widget import Widget
 from models.coupons import Coupon
+from models.catalog_version import CatalogVersion
+from models.barcode_sequence import BarcodeSequence
+from models.image_derivative import ImageDerivative
+from models.idempotency_key import IdempotencyKey
 
 # Import additional models needed across the app so metadata is complete
 from models.wallet import Wallet, WalletTransaction
 from models.order import Order, OrderItem
+from models.sales_rollup import SalesDailyRollup, OrderDailyRollup
+from models.order_location import OrderLocationRollup, OrderLocationCustomer
 from models.delivery_auth import DeliveryGuyAuth
 from models.delivery_onboarding import DeliveryOnboarding
 from models.delivery_loyalty import Delivery_Loyalty
@@ -92,6 +102,7 @@ from routes.pincode import pincode_bp
 from routes.review import review_bp
 from routes.review_comment import review_comment_bp
 from routes.auth import auth_bp
+from routes.storage import storage_bp
 
 # Register blueprints
 app.register_blueprint(customer_bp, url_prefix='/api/customers')
@@ -109,6 +120,7 @@ app.register_blueprint(pincode_bp, url_prefix='/api/pincode')
 app.register_blueprint(review_bp, url_prefix='/api/reviews')
 app.register_blueprint(review_comment_bp, url_prefix='/api/review-comments')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
+app.register_blueprint(storage_bp, url_prefix='/api/storage')
 
 def cleanup_expired_otps_background():
         """Background task to clean up expired OTPs every 10 minutes"""
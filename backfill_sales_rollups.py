@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Recompute sales_daily_rollup / order_daily_rollup from all orders.
+Use after bulk data fixes or if the rollups are suspected to have drifted;
+run during low traffic since the tables are rebuilt in one transaction.
+"""
+
+import sys
+import os
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    """Rebuild the sales rollups"""
+    print("🚀 Backfilling sales rollups...")
+
+    try:
+        from app import app
+        from services.sales_rollup_service import rebuild_sales_rollups
+
+        with app.app_context():
+            rebuild_sales_rollups()
+
+        print("✅ Sales rollups rebuilt")
+        return 0
+    except Exception as e:
+        print(f"❌ Sales rollup backfill failed: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
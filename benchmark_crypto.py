@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for utils/crypto payload encryption.
+
+Encrypts and decrypts catalog-shaped payloads of increasing size with the
+stdlib-json codec, the orjson codec and orjson + zlib, and prints
+throughput (plaintext MB/s) and envelope size for each.
+
+Usage: python benchmark_crypto.py [repeats]
+"""
+
+import sys
+import time
+from utils.crypto import CryptoCodec, orjson
+
+SECRET = "my_super_secret_key_32chars!!"
+PRODUCT_COUNTS = [1, 10, 100, 1000, 5000]
+
+def make_payload(products):
+    """Roughly the shape of /api/products/customer responses"""
+    return {
+        "success": True,
+        "products": [
+            {
+                "id": i,
+                "pname": f"Cotton T-Shirt {i}",
+                "pdescription": "Soft breathable cotton, regular fit. " * 4,
+                "price": 499.0 + i % 50,
+                "final_price": 449.1,
+                "discount_value": 10.0,
+                "images": [f"https://bucket.s3.ap-south-1.amazonaws.com/products/{i}/main/image_{j}.jpg" for j in range(3)],
+                "colors": [{"name": c, "sizeCounts": {"S": 4, "M": 7, "L": 2}} for c in ("Red", "Blue")],
+                "available_sizes": ["S", "M", "L"],
+                "is_active": True,
+                "category": "Men",
+                "created_at": "2025-01-01T10:00:00",
+            }
+            for i in range(products)
+        ],
+    }
+
+def measure(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    variants = [("stdlib json", CryptoCodec(SECRET, use_orjson=False), False)]
+    if orjson:
+        variants.append(("orjson", CryptoCodec(SECRET), False))
+    else:
+        print("⚠️ orjson not installed; only the stdlib codec is measured")
+    variants.append((f"{variants[-1][0]} + zlib", variants[-1][1], True))
+
+    print(f"{'payload':>10} {'codec':>16} {'enc MB/s':>10} {'dec MB/s':>10} {'envelope':>10}")
+    for products in PRODUCT_COUNTS:
+        payload = make_payload(products)
+        plain_mb = len(variants[0][1].dumps(payload)) / (1024 * 1024)
+        for name, codec, compress in variants:
+            envelope = codec.encrypt(payload, compress=compress)
+            enc = measure(lambda: codec.encrypt(payload, compress=compress), repeats)
+            dec = measure(lambda: codec.decrypt(envelope), repeats)
+            print(f"{plain_mb * 1024:>8.0f}KB {name:>16} {plain_mb / enc:>10.1f} {plain_mb / dec:>10.1f} {len(envelope) / 1024:>8.0f}KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
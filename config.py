@@ -10,6 +10,8 @@ class Config:
 
     # AES encryption key (must match frontend VITE_CRYPTO_SECRET)
     CRYPTO_SECRET = os.getenv("CRYPTO_SECRET", "my_super_secret_key_32chars!!")
+    # Opted-in clients get zlib-compressed payloads from this plaintext size up (utils/crypto.py)
+    CRYPTO_COMPRESS_MIN_BYTES = int(os.getenv("CRYPTO_COMPRESS_MIN_BYTES", str(16 * 1024)))
     
     # MySQL connection (adjust your .env accordingly)
     DB_USER = os.getenv("DB_USER", "root")
@@ -42,7 +44,10 @@ class Config:
     GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
     GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
     
-    # AWS S3 configuration - All required from environment
+    # Media storage backend: "s3" (default) or "local" (offline dev / tests, see utils/s3_service.py)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3").lower()
+    
+    # AWS S3 configuration - All required from environment when STORAGE_BACKEND is s3
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
     AWS_REGION = os.getenv("AWS_REGION")
@@ -75,5 +80,5 @@ class Config:
     }
     
     missing_vars = [var for var, value in required_s3_vars.items() if not value]
-    if missing_vars:
+    if missing_vars and STORAGE_BACKEND == "s3":
         raise ValueError(f"❌ Missing required S3 environment variables: {', '.join(missing_vars)}. Please set all S3 configuration variables in your .env file.")
\ No newline at end of file
@@ -8,7 +8,7 @@ import os
 import sys
 import json
 from pathlib import Path
-from utils.s3_service import S3Service
+from utils.s3_service import S3Service, S3Backend
 from models.product import Product
 from models.category import Category
 from models.review import ProductReview
@@ -21,8 +21,8 @@ def migrate_assets_to_s3():
     """Migrate all local assets to S3 and update database references"""
     with app.app_context():
         try:
-            # Initialize S3 service
-            s3_service = S3Service()
+            # Initialize S3 service (always S3 here, whatever STORAGE_BACKEND says)
+            s3_service = S3Service(backend=S3Backend(), test_connection=True)
             print("✅ S3 service initialized successfully")
             
             # Migration counters
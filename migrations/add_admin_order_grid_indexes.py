@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the `order` indexes behind the paginated admin
+order grid (GET /api/admin/orders with filters / sorting).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+ORDER_GRID_INDEXES = {
+    "ix_order_created_at_id": "created_at, id",
+    "ix_order_updated_at_id": "updated_at, id",
+    "ix_order_total_amount_id": "total_amount, id",
+    "ix_order_status_id": "status, id",
+    "ix_order_payment_status_id": "payment_status, id",
+}
+
+def add_order_grid_indexes():
+    """Create each grid index on `order` if missing"""
+
+    print("Adding admin order grid indexes...")
+
+    try:
+        for index_name, columns in ORDER_GRID_INDEXES.items():
+            result = db.session.execute(db.text("""
+                SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'order' AND INDEX_NAME = :index_name
+            """), {"index_name": index_name})
+            if result.first():
+                print(f"ℹ️ {index_name} already exists")
+                continue
+            db.session.execute(db.text(f"CREATE INDEX {index_name} ON `order` ({columns})"))
+            print(f"✅ Created {index_name} ({columns})")
+
+        db.session.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Error creating admin order grid indexes: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Admin Order Grid Index Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = add_order_grid_indexes()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
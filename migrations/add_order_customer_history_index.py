@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the (customer_id, id) index behind the customer
+order history (GET /api/orders/customer).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+INDEX_NAME = "ix_order_customer_id_id"
+
+def add_customer_history_index():
+    """Create ix_order_customer_id_id on `order` if missing"""
+
+    print(f"Adding {INDEX_NAME}...")
+
+    try:
+        result = db.session.execute(db.text("""
+            SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'order' AND INDEX_NAME = :index_name
+        """), {"index_name": INDEX_NAME})
+        if result.first():
+            print(f"ℹ️ {INDEX_NAME} already exists")
+            return True
+
+        db.session.execute(db.text(f"CREATE INDEX {INDEX_NAME} ON `order` (customer_id, id)"))
+        db.session.commit()
+
+        print(f"✅ {INDEX_NAME} created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating {INDEX_NAME}: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Order History Index Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = add_customer_history_index()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
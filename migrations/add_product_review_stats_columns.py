@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the approved-review aggregate columns to product
+(review_count, rating_sum, rating_count_1..5) and backfill them
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+REVIEW_STATS_COLUMNS = ["review_count", "rating_sum"] + [f"rating_count_{i}" for i in range(1, 6)]
+
+def add_review_stats_columns():
+    """Add the aggregate columns to product if missing"""
+    print("Adding review aggregate columns to product...")
+
+    try:
+        result = db.session.execute(db.text("""
+            SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'product'
+        """))
+        existing = {row[0] for row in result}
+
+        for column in REVIEW_STATS_COLUMNS:
+            if column in existing:
+                print(f"ℹ️ {column} column already exists")
+                continue
+            db.session.execute(db.text(f"ALTER TABLE product ADD COLUMN {column} INT NOT NULL DEFAULT 0"))
+            print(f"✅ Added {column}")
+
+        db.session.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Error adding review aggregate columns: {str(e)}")
+        db.session.rollback()
+        return False
+
+def backfill_review_stats():
+    """Compute the aggregates from approved reviews"""
+    from services.review_service import rebuild_review_stats
+
+    print("\nBackfilling review aggregates...")
+
+    try:
+        products = rebuild_review_stats()
+        print(f"✅ Review aggregates backfilled for {products} products")
+        return True
+    except Exception as e:
+        print(f"❌ Error backfilling review aggregates: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Product Review Stats Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = add_review_stats_columns() and backfill_review_stats()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
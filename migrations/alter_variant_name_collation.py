@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration script to switch product_variant / product_stock_snapshot
+color and size columns to utf8mb4_bin, so variant names are matched
+exactly (case-sensitive) as they are in the colors JSON.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+TABLES = ("product_variant", "product_stock_snapshot")
+
+def alter_variant_name_collation(table):
+    """MODIFY color/size on `table` to utf8mb4_bin if not already"""
+
+    print(f"Altering {table}.color / {table}.size collation...")
+
+    try:
+        result = db.session.execute(db.text("""
+            SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = :table AND COLUMN_NAME IN ('color', 'size')
+            AND COLLATION_NAME <> 'utf8mb4_bin'
+        """), {"table": table})
+        if not result.first():
+            print(f"ℹ️ {table} already uses utf8mb4_bin")
+            return True
+
+        # Rows unique under the case-insensitive collation stay unique under the binary one
+        db.session.execute(db.text(f"""
+            ALTER TABLE {table}
+            MODIFY color VARCHAR(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL DEFAULT '',
+            MODIFY size VARCHAR(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL
+        """))
+        db.session.commit()
+
+        print(f"✅ {table} collation updated successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error altering {table}: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Variant Name Collation Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = all([alter_variant_name_collation(table) for table in TABLES])
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Generate thumbnail / WebP derivatives for images uploaded before the
+derivative pipeline existed and fill in image_variants on their rows.
+Safe to re-run: images that already have derivatives are skipped.
+
+Usage: python migrations/backfill_image_derivatives.py [product|category|widget|review ...]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def main():
+    """Run the backfill"""
+    from services.image_derivative_service import backfill_image_derivatives, IMAGE_OWNERS
+
+    owners = sys.argv[1:] or list(IMAGE_OWNERS)
+    unknown = [o for o in owners if o not in IMAGE_OWNERS]
+    if unknown:
+        print(f"❌ Unknown image owners: {', '.join(unknown)} (expected {', '.join(IMAGE_OWNERS)})")
+        return 1
+
+    print("🚀 Starting Image Derivative Backfill")
+    print("=" * 60)
+
+    with app.app_context():
+        try:
+            report = backfill_image_derivatives(owners)
+        except Exception as e:
+            print(f"❌ Backfill failed: {str(e)}")
+            db.session.rollback()
+            return 1
+
+    print("\n" + "=" * 60)
+    for owner, stats in report.items():
+        print(f"✅ {owner}: {stats['generated']} new derivatives, {stats['rows']} rows refreshed")
+    print("🎉 Backfill completed successfully!")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
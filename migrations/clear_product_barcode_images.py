@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script to clear the base64 sticker blobs stored in
+product.barcode_image. Stickers are now rendered on demand and cached on
+disk by utils/barcode_renderer.py.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def clear_barcode_images(batch_size=1000):
+    """NULL out product.barcode_image in batches to keep transactions short"""
+    print("Clearing stored barcode images...")
+
+    with app.app_context():
+        try:
+            cleared = 0
+            while True:
+                result = db.session.execute(db.text(
+                    "UPDATE product SET barcode_image = NULL WHERE barcode_image IS NOT NULL LIMIT :batch"
+                ), {"batch": batch_size})
+                db.session.commit()
+                if result.rowcount == 0:
+                    break
+                cleared += result.rowcount
+
+            print(f"✅ Cleared barcode images on {cleared} products")
+            return True
+        except Exception as e:
+            print(f"❌ Error clearing barcode images: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == "__main__":
+    sys.exit(0 if clear_barcode_images() else 1)
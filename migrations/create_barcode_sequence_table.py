@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the barcode_sequence table used by the barcode
+allocator in utils/barcode_generator.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def create_barcode_sequence_table():
+    """Create the barcode_sequence table and seed its single row"""
+
+    print("Creating barcode_sequence table...")
+
+    with app.app_context():
+        try:
+            db.session.execute(db.text("""
+            CREATE TABLE IF NOT EXISTS barcode_sequence (
+                id INT PRIMARY KEY,
+                next_value BIGINT NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+            """))
+            db.session.execute(db.text("INSERT IGNORE INTO barcode_sequence (id, next_value) VALUES (1, 1)"))
+            db.session.commit()
+
+            print("✅ barcode_sequence table created successfully!")
+            return True
+        except Exception as e:
+            print(f"❌ Error creating barcode_sequence table: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == "__main__":
+    sys.exit(0 if create_barcode_sequence_table() else 1)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the catalog_version table used by utils/catalog_cache.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def create_catalog_version_table():
+    """Create the catalog_version table and seed its single row"""
+
+    print("Creating catalog_version table...")
+
+    with app.app_context():
+        try:
+            db.session.execute(db.text("""
+            CREATE TABLE IF NOT EXISTS catalog_version (
+                id INT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+            """))
+            db.session.execute(db.text("INSERT IGNORE INTO catalog_version (id, version) VALUES (1, 1)"))
+            db.session.commit()
+
+            print("✅ catalog_version table created successfully!")
+            return True
+        except Exception as e:
+            print(f"❌ Error creating catalog_version table: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == "__main__":
+    sys.exit(0 if create_catalog_version_table() else 1)
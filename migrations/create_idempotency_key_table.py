@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the idempotency_key table used to replay
+order, wallet and payment responses for retried requests.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def create_idempotency_key_table():
+    """Create the idempotency_key table"""
+
+    print("Creating idempotency_key table...")
+
+    try:
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS idempotency_key (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            customer_id INT NOT NULL,
+            scope VARCHAR(50) NOT NULL,
+            idempotency_key VARCHAR(100) NOT NULL,
+            request_hash CHAR(64) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'in_progress',
+            response_status INT NULL,
+            response_body MEDIUMTEXT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME NOT NULL,
+            UNIQUE KEY uq_idempotency_key (customer_id, scope, idempotency_key),
+            INDEX ix_idempotency_key_expires_at (expires_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.commit()
+
+        print("✅ idempotency_key table created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating idempotency_key table: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Idempotency Key Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = create_idempotency_key_table()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+        print("ℹ️ Schedule purge_idempotency_keys.py to remove expired keys")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the image_derivative table and add the
+image_variants column to product, category, widget and product_review.
+Run migrations/backfill_image_derivatives.py afterwards for existing images.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+IMAGE_VARIANT_TABLES = ["product", "category", "widget", "product_review"]
+
+def create_image_derivative_table():
+    """Create the image_derivative registry table"""
+
+    print("Creating image_derivative table...")
+
+    try:
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS image_derivative (
+            url_hash CHAR(64) PRIMARY KEY,
+            source_url TEXT NOT NULL,
+            variants TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.commit()
+
+        print("✅ image_derivative table created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating image_derivative table: {str(e)}")
+        db.session.rollback()
+        return False
+
+def add_image_variants_columns():
+    """Add image_variants to every table that stores image URLs"""
+    print("\nAdding image_variants columns...")
+
+    try:
+        for table in IMAGE_VARIANT_TABLES:
+            result = db.session.execute(db.text("""
+                SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = :table AND COLUMN_NAME = 'image_variants'
+            """), {"table": table})
+            if result.first():
+                print(f"ℹ️ {table}.image_variants already exists")
+                continue
+            db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN image_variants TEXT NULL"))
+            print(f"✅ Added {table}.image_variants")
+
+        db.session.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Error adding image_variants columns: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Image Derivative Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = create_image_derivative_table() and add_image_variants_columns()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
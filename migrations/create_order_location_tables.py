@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Migration script to add order.location_key and create the order location
+rollup tables used by /api/products/customer-order-locations
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def add_location_key_column():
+    """Add location_key (indexed) to order if missing"""
+    print("Adding location_key column to order...")
+
+    try:
+        result = db.session.execute(db.text("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'order'
+            AND COLUMN_NAME = 'location_key'
+        """))
+        if result.scalar() > 0:
+            print("ℹ️ location_key column already exists")
+            return True
+
+        db.session.execute(db.text("ALTER TABLE `order` ADD COLUMN location_key VARCHAR(64) NULL"))
+        db.session.execute(db.text("CREATE INDEX ix_order_location_key ON `order` (location_key)"))
+        db.session.commit()
+        print("✅ location_key column added successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error adding location_key column: {str(e)}")
+        db.session.rollback()
+        return False
+
+def create_location_tables():
+    """Create order_location_rollup and order_location_customer"""
+    print("\nCreating order location tables...")
+
+    try:
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS order_location_rollup (
+            location_key VARCHAR(64) NOT NULL PRIMARY KEY,
+            address VARCHAR(255) NULL,
+            city VARCHAR(100) NULL,
+            state VARCHAR(100) NULL,
+            postal_code VARCHAR(20) NULL,
+            order_count INT NOT NULL DEFAULT 0,
+            total_amount DOUBLE NOT NULL DEFAULT 0,
+            lat_sum DOUBLE NOT NULL DEFAULT 0,
+            lng_sum DOUBLE NOT NULL DEFAULT 0,
+            geo_count INT NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX ix_order_location_rollup_order_count (order_count)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS order_location_customer (
+            location_key VARCHAR(64) NOT NULL,
+            customer_id INT NOT NULL,
+            order_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (location_key, customer_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.commit()
+        print("✅ Order location tables created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating order location tables: {str(e)}")
+        db.session.rollback()
+        return False
+
+def backfill_locations():
+    """Set location_key on existing orders and populate the rollups"""
+    from services.order_location_service import rebuild_order_locations
+
+    print("\nBackfilling order locations...")
+
+    try:
+        rebuild_order_locations()
+        print("✅ Order locations backfilled")
+        return True
+    except Exception as e:
+        print(f"❌ Error backfilling order locations: {str(e)}")
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Order Location Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = add_location_key_column() and create_location_tables() and backfill_locations()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the product_stock_snapshot table used by
+GET /api/products/stock-analytics and populate it
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def create_product_stock_snapshot_table():
+    """Create the product_stock_snapshot table"""
+
+    print("Creating product_stock_snapshot table...")
+
+    try:
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS product_stock_snapshot (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_id INT NOT NULL,
+            product_name VARCHAR(120) NOT NULL,
+            color VARCHAR(50) COLLATE utf8mb4_bin NOT NULL DEFAULT '',
+            size VARCHAR(20) COLLATE utf8mb4_bin NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            is_listed BOOLEAN NOT NULL DEFAULT TRUE,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES product(id) ON DELETE CASCADE,
+            UNIQUE KEY uq_product_stock_snapshot (product_id, color, size),
+            INDEX idx_stock_snapshot_listed_count (is_listed, count)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        db.session.execute(db.text(create_table_sql))
+        db.session.commit()
+        print("✅ product_stock_snapshot table created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating product_stock_snapshot table: {str(e)}")
+        db.session.rollback()
+        return False
+
+def populate_product_stock_snapshot():
+    """Fill the snapshot from current variant / JSON stock"""
+    from services.stock_snapshot_service import rebuild_stock_snapshot
+
+    print("\nPopulating product_stock_snapshot...")
+
+    try:
+        rebuild_stock_snapshot()
+        print("✅ product_stock_snapshot populated")
+        return True
+    except Exception as e:
+        print(f"❌ Error populating product_stock_snapshot: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Product Stock Snapshot Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = create_product_stock_snapshot_table() and populate_product_stock_snapshot()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
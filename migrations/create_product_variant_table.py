@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the product_variant table and backfill it
+from the existing Product.colors (sizeCounts) / Product.size JSON columns
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+BATCH_SIZE = 500
+
+def create_product_variant_table():
+    """Create the product_variant table"""
+
+    print("Creating product_variant table...")
+
+    try:
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS product_variant (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_id INT NOT NULL,
+            color VARCHAR(50) COLLATE utf8mb4_bin NOT NULL DEFAULT '',
+            size VARCHAR(20) COLLATE utf8mb4_bin NOT NULL,
+            stock INT NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES product(id) ON DELETE CASCADE,
+            UNIQUE KEY uq_product_variant (product_id, color, size),
+            INDEX idx_product_variant_product_id (product_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        db.session.execute(db.text(create_table_sql))
+        db.session.commit()
+        print("✅ product_variant table created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating product_variant table: {str(e)}")
+        db.session.rollback()
+        return False
+
+def backfill_product_variants():
+    """Populate product_variant rows from the JSON stock columns, one batch per commit"""
+    from models.product import Product
+    from services.inventory_service import sync_product_variants
+
+    print("\nBackfilling product_variant from product JSON columns...")
+
+    try:
+        last_id = 0
+        products_done = 0
+        variants_done = 0
+        while True:
+            products = Product.query.filter(Product.id > last_id)\
+                .order_by(Product.id.asc())\
+                .limit(BATCH_SIZE)\
+                .all()
+            if not products:
+                break
+
+            for product in products:
+                variants_done += sync_product_variants(product)
+                products_done += 1
+
+            db.session.commit()
+            last_id = products[-1].id
+            print(f"   ... {products_done} products processed")
+
+        print(f"✅ Backfilled {variants_done} variants across {products_done} products")
+        return True
+    except Exception as e:
+        print(f"❌ Error backfilling product_variant: {str(e)}")
+        db.session.rollback()
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Product Variant Inventory Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = create_product_variant_table() and backfill_product_variants()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
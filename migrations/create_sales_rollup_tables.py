@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Migration script to add order_item.unit_cost and create the daily
+sales / order rollup tables used by the order analytics endpoints
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from extensions import db
+
+def add_unit_cost_column():
+    """Add unit_cost to order_item if missing"""
+    print("Adding unit_cost column to order_item...")
+
+    try:
+        result = db.session.execute(db.text("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'order_item'
+            AND COLUMN_NAME = 'unit_cost'
+        """))
+        if result.scalar() > 0:
+            print("ℹ️ unit_cost column already exists")
+            return True
+
+        db.session.execute(db.text("ALTER TABLE order_item ADD COLUMN unit_cost FLOAT NULL"))
+        db.session.commit()
+        print("✅ unit_cost column added successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error adding unit_cost column: {str(e)}")
+        db.session.rollback()
+        return False
+
+def create_rollup_tables():
+    """Create sales_daily_rollup and order_daily_rollup"""
+    print("\nCreating rollup tables...")
+
+    try:
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            day DATE NOT NULL,
+            product_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue DOUBLE NOT NULL DEFAULT 0,
+            cost DOUBLE NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (day, product_id, status),
+            INDEX idx_sales_rollup_status_day (status, day),
+            INDEX idx_sales_rollup_product (product_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS order_daily_rollup (
+            day DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            order_count INT NOT NULL DEFAULT 0,
+            order_amount DOUBLE NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (day, status),
+            INDEX idx_order_rollup_status_day (status, day)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """))
+        db.session.commit()
+        print("✅ Rollup tables created successfully!")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating rollup tables: {str(e)}")
+        db.session.rollback()
+        return False
+
+def backfill_rollups():
+    """Populate the rollups from existing orders"""
+    from services.sales_rollup_service import rebuild_sales_rollups
+
+    print("\nBackfilling rollups from existing orders...")
+
+    try:
+        rebuild_sales_rollups()
+        print("✅ Rollups backfilled")
+        return True
+    except Exception as e:
+        print(f"❌ Error backfilling rollups: {str(e)}")
+        return False
+
+def main():
+    """Run the migration"""
+
+    print("🚀 Starting Sales Rollup Migration")
+    print("=" * 60)
+
+    with app.app_context():
+        success = add_unit_cost_column() and create_rollup_tables() and backfill_rollups()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Migration completed successfully!")
+    else:
+        print("⚠️ Migration completed with errors. Please check the issues above.")
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
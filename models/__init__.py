@@ -1,10 +1,14 @@
 # Import all models to ensure they are registered with SQLAlchemy
 from .customer import Customer
 from .product import Product
+from .product_variant import ProductVariant
+from .product_stock_snapshot import ProductStockSnapshot
 from .category import Category
 from .subcategory import SubCategory
 from .admin import Admin
 from .order import Order, OrderItem
+from .sales_rollup import SalesDailyRollup, OrderDailyRollup
+from .order_location import OrderLocationRollup, OrderLocationCustomer
 from .address import Address
 from .wallet import Wallet
 from .loyalty import Loyalty
@@ -14,15 +18,25 @@ from .exchange import Exchange
 from .delivery_onboarding import DeliveryOnboarding
 from .delivery_auth import DeliveryGuyAuth, DeliveryGuyOTP
 from .delivery_leave_request import DeliveryLeaveRequest
+from .catalog_version import CatalogVersion
+from .barcode_sequence import BarcodeSequence
+from .image_derivative import ImageDerivative
+from .idempotency_key import IdempotencyKey
 
 __all__ = [
     'Customer',
     'Product', 
+    'ProductVariant',
+    'ProductStockSnapshot',
     'Category',
     'SubCategory',
     'Admin',
     'Order',
     'OrderItem',
+    'SalesDailyRollup',
+    'OrderDailyRollup',
+    'OrderLocationRollup',
+    'OrderLocationCustomer',
     'Address',
     'Wallet',
     'Loyalty',
@@ -33,4 +47,8 @@ __all__ = [
     'DeliveryGuyAuth',
     'DeliveryGuyOTP',
     'DeliveryLeaveRequest',
+    'CatalogVersion',
+    'BarcodeSequence',
+    'ImageDerivative',
+    'IdempotencyKey',
 ]
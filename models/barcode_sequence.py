@@ -0,0 +1,12 @@
+from extensions import db
+
+
+class BarcodeSequence(db.Model):
+    """Single-row counter from which utils/barcode_generator.py reserves blocks of barcode numbers"""
+    __tablename__ = "barcode_sequence"
+    id = db.Column(db.Integer, primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<BarcodeSequence {self.next_value}>"
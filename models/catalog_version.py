@@ -0,0 +1,12 @@
+from extensions import db
+
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped on every catalog write; polled by workers to invalidate caches"""
+    __tablename__ = "catalog_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
@@ -7,6 +7,7 @@ class Category(db.Model):
     description = db.Column(db.String(80), nullable=False)
     category_count = db.Column(db.Integer, default=0)
     image = db.Column(db.String(255), nullable=True)  # Store image path
+    image_variants = db.Column(db.Text, nullable=True)  # JSON {image url: {"webp": url, "w200": url, ...}}
     subcategories = db.relationship(
         "SubCategory",
         backref="category",
@@ -0,0 +1,23 @@
+from extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a customer mutation replayed by Idempotency-Key (see utils/idempotency.py)"""
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        db.UniqueConstraint("customer_id", "scope", "idempotency_key", name="uq_idempotency_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, nullable=False)
+    scope = db.Column(db.String(50), nullable=False)  # endpoint, e.g. "orders.create"
+    idempotency_key = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 of the decrypted request body
+    status = db.Column(db.String(20), nullable=False, default="in_progress")  # in_progress, completed, completed_unrecorded
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)  # JSON body exactly as first returned
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.scope} {self.idempotency_key} ({self.status})>"
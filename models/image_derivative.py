@@ -0,0 +1,25 @@
+import json
+from extensions import db
+
+
+class ImageDerivative(db.Model):
+    """Resized / WebP copies generated for one uploaded image (see services/image_derivative_service.py)"""
+    __tablename__ = "image_derivative"
+    url_hash = db.Column(db.String(64), primary_key=True)  # sha256 of source_url
+    source_url = db.Column(db.Text, nullable=False)
+    variants = db.Column(db.Text, nullable=False)  # JSON {"webp": url, "w200": url, ...}
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<ImageDerivative {self.source_url}>"
+
+
+def parse_variants_map(raw):
+    """Decode an `image_variants` column; bad or empty JSON reads as no variants"""
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    return value if isinstance(value, dict) else {}
@@ -1,11 +1,22 @@
 from extensions import db
 from datetime import datetime
+from utils.fragment_cache import fragment
 
 def get_current_time():
     return datetime.utcnow()
 
 class Order(db.Model):
     __tablename__ = "order"
+    __table_args__ = (
+        # Customer order history: WHERE customer_id = ? [AND id < ?] ORDER BY id DESC
+        db.Index("ix_order_customer_id_id", "customer_id", "id"),
+        # Admin order grid filters / sorts (services/admin_order_query_service.py)
+        db.Index("ix_order_created_at_id", "created_at", "id"),
+        db.Index("ix_order_updated_at_id", "updated_at", "id"),
+        db.Index("ix_order_total_amount_id", "total_amount", "id"),
+        db.Index("ix_order_status_id", "status", "id"),
+        db.Index("ix_order_payment_status_id", "payment_status", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -44,6 +55,10 @@ class Order(db.Model):
     
     # Simple delivery type tracking (optional for now)
     is_exchange_delivery = db.Column(db.Boolean, default=False, nullable=True)
+
+    # Normalized delivery location (postal code / city) for geo analytics,
+    # see services/order_location_service.py
+    location_key = db.Column(db.String(64), nullable=True, index=True)
     
 
 
@@ -51,12 +66,19 @@ class Order(db.Model):
     customer = db.relationship("Customer", backref="orders")
     order_items = db.relationship("OrderItem", backref="order", lazy="dynamic", cascade="all, delete-orphan")
     coupon = db.relationship("Coupon", backref="orders")
+    # Read-only list view of order_items that can be eager loaded (order_items is dynamic)
+    items = db.relationship("OrderItem", viewonly=True, order_by="OrderItem.id")
 
 
     def __repr__(self):
         return f"<Order {self.order_number} - Customer: {self.customer_id}, Status: {self.status}>"
 
     def as_dict(self):
+        data = fragment(self, self._build_dict)
+        data["coupon_code"] = self.coupon.code if self.coupon else None
+        return data
+
+    def _build_dict(self):
         return {
             "id": self.id,
             "customer_id": self.customer_id,
@@ -98,6 +120,8 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
+    # Product.actual_price captured when the item is created (profit analytics)
+    unit_cost = db.Column(db.Float, nullable=True)
     
     # Product snapshot (in case product details change)
     product_name = db.Column(db.String(200), nullable=False)
@@ -146,6 +170,9 @@ class OrderItem(db.Model):
         return f"<OrderItem {self.id} - Order: {self.order_id}, Product: {self.product_id}, Size: {self.selected_size}, Color: {self.selected_color}, Qty: {self.quantity}, Cancelled: {self.quantity_cancel}{pickup_info}>"
 
     def as_dict(self):
+        return fragment(self, self._build_dict)
+
+    def _build_dict(self):
         return {
             "id": self.id,
             "order_id": self.order_id,
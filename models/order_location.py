@@ -0,0 +1,39 @@
+from extensions import db
+
+
+class OrderLocationRollup(db.Model):
+    """Sales-status order totals per normalized delivery location"""
+    __tablename__ = "order_location_rollup"
+
+    location_key = db.Column(db.String(64), primary_key=True)
+    address = db.Column(db.String(255), nullable=True)
+    city = db.Column(db.String(100), nullable=True)
+    state = db.Column(db.String(100), nullable=True)
+    postal_code = db.Column(db.String(20), nullable=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    # Running sums for the centroid of orders that carried coordinates
+    lat_sum = db.Column(db.Float, nullable=False, default=0.0)
+    lng_sum = db.Column(db.Float, nullable=False, default=0.0)
+    geo_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def centroid(self):
+        if not self.geo_count:
+            return None, None
+        return self.lat_sum / self.geo_count, self.lng_sum / self.geo_count
+
+    def __repr__(self):
+        return f"<OrderLocationRollup {self.location_key}: {self.order_count}>"
+
+
+class OrderLocationCustomer(db.Model):
+    """Orders per (location, customer); backs unique customer counts per location"""
+    __tablename__ = "order_location_customer"
+
+    location_key = db.Column(db.String(64), primary_key=True)
+    customer_id = db.Column(db.Integer, primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<OrderLocationCustomer {self.location_key} customer={self.customer_id}: {self.order_count}>"
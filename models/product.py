@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy.orm import deferred
 import json
 
 class Product(db.Model):
@@ -17,6 +18,7 @@ class Product(db.Model):
     cid = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
     sid = db.Column(db.Integer, db.ForeignKey('subcategory.id'))
     image = db.Column(db.String(255), nullable=True)
+    image_variants = db.Column(db.Text, nullable=True)  # JSON {image url: {"webp": url, "w200": url, ...}}
     stock = db.Column(db.Integer, default=0)
     visibility = db.Column(db.Boolean, default=True)
     is_active = db.Column(db.Boolean, default=True)
@@ -24,6 +26,14 @@ class Product(db.Model):
     is_returnable = db.Column(db.Boolean, default=True)
     is_cod_available = db.Column(db.Boolean, default=True)
     rating = db.Column(db.Float, default=0.0)
+    # Approved review aggregates, maintained by services/review_service.py
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_count_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_count_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_count_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_count_5 = db.Column(db.Integer, nullable=False, default=0)
     is_featured = db.Column(db.Boolean, default=False)
     is_latest = db.Column(db.Boolean, default=False)
     is_trending = db.Column(db.Boolean, default=False)
@@ -31,7 +41,8 @@ class Product(db.Model):
     shared_count = db.Column(db.Integer, default=0)
     discount_value = db.Column(db.Float, default=0.0)
     barcode = db.Column(db.String(50), unique=True, nullable=True, index=True)
-    barcode_image = db.Column(db.Text, nullable=True)  # Store base64 encoded barcode image
+    # Legacy base64 sticker, cleared by migrations/clear_product_barcode_images.py; never loaded by default
+    barcode_image = deferred(db.Column(db.Text, nullable=True))
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     actual_price = db.Column(db.Float, default=0.0)
@@ -43,9 +54,16 @@ class Product(db.Model):
         back_populates="products",
         foreign_keys=[sid]
     )
+    # Authoritative per color/size stock (see services/inventory_service.py)
+    variants = db.relationship(
+        "ProductVariant",
+        back_populates="product",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
-    def get_sizes_dict(self):
-        """Get sizes as a dictionary with quantity counts"""
+    def load_sizes_json(self):
+        """Parse the raw size JSON column without applying variant stock"""
         if not self.size:
             return {}
         
@@ -63,6 +81,18 @@ class Product(db.Model):
         except Exception:
             return {}
 
+    def get_variant_stock_map(self):
+        """Get {(color, size): stock} from product_variant rows (empty if not backfilled)"""
+        return {(v.color, v.size): v.stock for v in self.variants}
+
+    def get_sizes_dict(self):
+        """Get sizes as a dictionary with quantity counts"""
+        sizes = self.load_sizes_json()
+        variant_stock = self.get_variant_stock_map() if sizes else {}
+        if variant_stock:
+            sizes = {size: variant_stock.get(("", str(size)), qty) for size, qty in sizes.items()}
+        return sizes
+
     def get_available_sizes(self):
         """Get list of sizes that have stock > 0"""
         sizes = self.get_sizes_dict()
@@ -79,28 +109,47 @@ class Product(db.Model):
 
     def reserve_size(self, size, quantity=1):
         """Reserve/remove quantity from a specific size"""
+        if self.variants:
+            from services.inventory_service import reserve_variant
+            if reserve_variant(self.id, "", size, quantity):
+                return True, f"Reserved {quantity} of size {size}"
+            return False, f"Insufficient stock for size {size}"
+
         if not self.is_size_available(size) or self.get_size_stock(size) < quantity:
             return False, f"Insufficient stock for size {size}"
         
         sizes = self.get_sizes_dict()
         sizes[size] = max(0, sizes[size] - quantity)
         self.size = json.dumps(sizes)
+        self._refresh_stock_snapshot()
         return True, f"Reserved {quantity} of size {size}"
 
     def add_size_stock(self, size, quantity=1):
         """Add quantity back to a specific size"""
+        if self.variants:
+            from services.inventory_service import release_variant
+            if release_variant(self.id, "", size, quantity):
+                return True, f"Added {quantity} to size {size}"
+            return False, f"Size {size} not found"
+
         sizes = self.get_sizes_dict()
         sizes[size] = sizes.get(size, 0) + quantity
         self.size = json.dumps(sizes)
+        self._refresh_stock_snapshot()
         return True, f"Added {quantity} to size {size}"
 
+    def _refresh_stock_snapshot(self):
+        # Legacy JSON stock changed; keep the analytics snapshot in step
+        from services.stock_snapshot_service import refresh_product_snapshot
+        refresh_product_snapshot(self)
+
     def get_total_stock(self):
         """Get total stock across all sizes"""
         sizes = self.get_sizes_dict()
         return sum(sizes.values())
 
-    def get_colors_data(self):
-        """Get colors data as a list of dictionaries"""
+    def load_colors_json(self):
+        """Parse the raw colors JSON column without applying variant stock"""
         if not self.colors:
             return []
         
@@ -114,6 +163,20 @@ class Product(db.Model):
         except Exception:
             return []
 
+    def get_colors_data(self):
+        """Get colors data as a list of dictionaries"""
+        colors = self.load_colors_json()
+        variant_stock = self.get_variant_stock_map() if colors else {}
+        if variant_stock:
+            # sizeCounts in the JSON are only a fallback; live stock lives in product_variant
+            for color in colors:
+                if isinstance(color, dict) and color.get("name") and color.get("sizeCounts"):
+                    color["sizeCounts"] = {
+                        size: variant_stock.get((color["name"], str(size)), count)
+                        for size, count in color["sizeCounts"].items()
+                    }
+        return colors
+
     def get_total_stock_from_colors(self):
         """Get total stock from colors structure"""
         colors = self.get_colors_data()
@@ -138,6 +201,12 @@ class Product(db.Model):
 
     def reserve_color_size(self, color_name, size, quantity=1):
         """Reserve/remove quantity from a specific color and size combination"""
+        if self.variants:
+            from services.inventory_service import reserve_variant
+            if reserve_variant(self.id, color_name, size, quantity):
+                return True, f"Reserved {quantity} of {color_name} - {size}"
+            return False, f"Insufficient stock for {color_name} - {size}"
+
         if not self.is_color_size_available(color_name, size) or self.get_color_size_stock(color_name, size) < quantity:
             return False, f"Insufficient stock for {color_name} - {size}"
         
@@ -148,12 +217,19 @@ class Product(db.Model):
                 size_counts[size] = max(0, size_counts.get(size, 0) - quantity)
                 color["sizeCounts"] = size_counts
                 self.colors = json.dumps(colors)
+                self._refresh_stock_snapshot()
                 return True, f"Reserved {quantity} of {color_name} - {size}"
         
         return False, f"Color {color_name} not found"
 
     def add_color_size_stock(self, color_name, size, quantity=1):
         """Add quantity back to a specific color and size combination"""
+        if self.variants:
+            from services.inventory_service import release_variant
+            if release_variant(self.id, color_name, size, quantity):
+                return True, f"Added {quantity} to {color_name} - {size}"
+            return False, f"Color {color_name} not found"
+
         colors = self.get_colors_data()
         for color in colors:
             if isinstance(color, dict) and color.get("name") == color_name:
@@ -161,71 +237,106 @@ class Product(db.Model):
                 size_counts[size] = size_counts.get(size, 0) + quantity
                 color["sizeCounts"] = size_counts
                 self.colors = json.dumps(colors)
+                self._refresh_stock_snapshot()
                 return True, f"Added {quantity} to {color_name} - {size}"
         
         return False, f"Color {color_name} not found"
 
-    def to_dict(self):
-        # Build images list from comma-separated storage
-        images_list = []
-        if self.image:
-            images_list = [u.strip() for u in self.image.split(",") if u and u.strip()]
+    def review_stats(self):
+        """Approved review total / average / per-star breakdown from the aggregate columns"""
+        total = self.review_count or 0
+        breakdown = {str(i): getattr(self, f"rating_count_{i}") or 0 for i in range(1, 6)}
+        average = round((self.rating_sum or 0) / total, 2) if total > 0 else 0.0
+        return {"total": total, "average": average, "breakdown": breakdown}
 
-        # Pricing calculation with optional coupon(s) and tax
-        original_price = float(self.price or 0)
-        final_price = original_price - (original_price * (self.discount_value or 0) / 100)
+    def _build_dict(self, fields):
+        if fields is None:
+            return {key: getter(self) for key, getter in PRODUCT_FIELD_GETTERS.items()}
+        return {key: PRODUCT_FIELD_GETTERS[key](self) for key in fields if key in PRODUCT_FIELD_GETTERS}
 
-        # Get sizes information
-        sizes_dict = self.get_sizes_dict()
-        available_sizes = self.get_available_sizes()
-        total_stock = self.get_total_stock()
-        
-        # Get colors information
-        colors_data = self.get_colors_data()
-        colors_stock = self.get_total_stock_from_colors()
-
-        result = {
-            "id": self.id,
-            "pname": self.pname,
-            "pdescription": self.pdescription,
-            "size": self.size,
-            "sizes": sizes_dict,
-            "available_sizes": available_sizes,
-            "total_stock": total_stock,
-            "color": self.color,
-            "colors": colors_data,
-            "colors_stock": colors_stock,
-            "price": self.price,
-            "tag": self.tag,
-            "cid": self.cid,
-            "sid": self.sid,
-            "image": self.image,
-            "images": images_list,
-            "stock": self.stock,
-            "visibility": self.visibility,
-            "is_active": self.is_active,
-            "quantity": self.quantity,
-            "discount_value": self.discount_value,
-            "is_returnable": self.is_returnable,
-            "is_cod_available": self.is_cod_available,
-            "rating": self.rating,
-            "is_featured": self.is_featured,
-            "is_latest": self.is_latest,
-            "is_trending": self.is_trending,
-            "is_new": self.is_new,
-            "shared_count": self.shared_count,
-            "barcode": self.barcode,
-            "barcode_image": self.barcode_image,
-            "final_price": round(final_price, 2),
-            "original_price": round(original_price, 2),
-            "category": self.category.category_name if self.category else None,
-            "subcategory": self.subcategory.sub_category_name if self.subcategory else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "actual_price": round(self.actual_price, 2),
-        }
-        
-        return result
+    def _fragment_state(self, fields):
+        """product_variant rows behind the variant fields; the product's own columns are keyed by fragment()"""
+        if fields is None or not PRODUCT_VARIANT_FIELDS.isdisjoint(fields):
+            return tuple(sorted((v.color, v.size, v.stock) for v in self.variants))
+        return ()
+
+    def to_dict(self, fields=None):
+        """Serialize product; pass `fields` to only compute the requested keys"""
+        fields = tuple(fields) if fields is not None else None
+        data = fragment(self, lambda: self._build_dict(fields), variant=fields, state=self._fragment_state(fields))
+        # Category names live on other rows, so they are never served from the fragment
+        for key in PRODUCT_LIVE_FIELDS:
+            if key in data:
+                data[key] = PRODUCT_FIELD_GETTERS[key](self)
+        return data
 
     def __repr__(self):
         return f"<Product {self.pname} ({self.id})>"
+
+
+# Registered here so the Product.variants relationship always resolves
+from models.product_variant import ProductVariant  # noqa: E402
+from models.image_derivative import parse_variants_map  # noqa: E402
+from utils.fragment_cache import fragment  # noqa: E402
+
+
+def _images_list(product):
+    # Build images list from comma-separated storage
+    if not product.image:
+        return []
+    return [u.strip() for u in product.image.split(",") if u and u.strip()]
+
+
+def _final_price(product):
+    original_price = float(product.price or 0)
+    return round(original_price - (original_price * (product.discount_value or 0) / 100), 2)
+
+
+# Ordered field -> getter map backing Product.to_dict; key order matches the
+# historical to_dict output so existing clients see identical payloads.
+PRODUCT_FIELD_GETTERS = {
+    "id": lambda p: p.id,
+    "pname": lambda p: p.pname,
+    "pdescription": lambda p: p.pdescription,
+    "size": lambda p: p.size,
+    "sizes": lambda p: p.get_sizes_dict(),
+    "available_sizes": lambda p: p.get_available_sizes(),
+    "total_stock": lambda p: p.get_total_stock(),
+    "color": lambda p: p.color,
+    "colors": lambda p: p.get_colors_data(),
+    "colors_stock": lambda p: p.get_total_stock_from_colors(),
+    "price": lambda p: p.price,
+    "tag": lambda p: p.tag,
+    "cid": lambda p: p.cid,
+    "sid": lambda p: p.sid,
+    "image": lambda p: p.image,
+    "images": _images_list,
+    "image_variants": lambda p: parse_variants_map(p.image_variants),
+    "stock": lambda p: p.stock,
+    "visibility": lambda p: p.visibility,
+    "is_active": lambda p: p.is_active,
+    "quantity": lambda p: p.quantity,
+    "discount_value": lambda p: p.discount_value,
+    "is_returnable": lambda p: p.is_returnable,
+    "is_cod_available": lambda p: p.is_cod_available,
+    "rating": lambda p: p.rating,
+    "is_featured": lambda p: p.is_featured,
+    "is_latest": lambda p: p.is_latest,
+    "is_trending": lambda p: p.is_trending,
+    "is_new": lambda p: p.is_new,
+    "shared_count": lambda p: p.shared_count,
+    "barcode": lambda p: p.barcode,
+    # Stickers are rendered on demand by GET /api/products/<pid>/barcode.png
+    "barcode_image_url": lambda p: f"/api/products/{p.id}/barcode.png" if p.barcode else None,
+    "final_price": _final_price,
+    "original_price": lambda p: round(float(p.price or 0), 2),
+    "category": lambda p: p.category.category_name if p.category else None,
+    "subcategory": lambda p: p.subcategory.sub_category_name if p.subcategory else None,
+    "created_at": lambda p: p.created_at.isoformat() if p.created_at else None,
+    "updated_at": lambda p: p.updated_at.isoformat() if p.updated_at else None,
+    "actual_price": lambda p: round(p.actual_price, 2),
+}
+
+# Getters that read product_variant rows rather than columns of this row
+PRODUCT_VARIANT_FIELDS = frozenset({"sizes", "available_sizes", "total_stock", "colors", "colors_stock"})
+PRODUCT_LIVE_FIELDS = ("category", "subcategory")
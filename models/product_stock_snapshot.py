@@ -0,0 +1,36 @@
+from extensions import db
+from models.product_variant import VariantColor, VariantSize
+
+
+class ProductStockSnapshot(db.Model):
+    """Denormalized (product, color, size) -> count rows backing the stock analytics dashboard"""
+    __tablename__ = "product_stock_snapshot"
+    __table_args__ = (
+        db.UniqueConstraint("product_id", "color", "size", name="uq_product_stock_snapshot"),
+        db.Index("idx_stock_snapshot_listed_count", "is_listed", "count"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id", ondelete="CASCADE"), nullable=False)
+    product_name = db.Column(db.String(120), nullable=False)
+    # Empty string for size-only products
+    color = db.Column(VariantColor, nullable=False, default="")
+    size = db.Column(VariantSize, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Product is active and visible (the dashboard only reports listed products)
+    is_listed = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            "product_id": self.product_id,
+            "product_name": self.product_name,
+            "color": self.color,
+            "size": self.size,
+            "count": self.count,
+            "is_listed": self.is_listed,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self):
+        return f"<ProductStockSnapshot {self.product_id} {self.color}/{self.size}: {self.count}>"
@@ -0,0 +1,43 @@
+from extensions import db
+from sqlalchemy.dialects import mysql
+
+COLOR_MAX_LENGTH = 50
+SIZE_MAX_LENGTH = 20
+
+# Binary collation on MySQL so "Red" / "red" are distinct keys, exactly as
+# they are in the colors JSON and in Python comparisons
+VariantColor = db.String(COLOR_MAX_LENGTH).with_variant(mysql.VARCHAR(COLOR_MAX_LENGTH, collation="utf8mb4_bin"), "mysql")
+VariantSize = db.String(SIZE_MAX_LENGTH).with_variant(mysql.VARCHAR(SIZE_MAX_LENGTH, collation="utf8mb4_bin"), "mysql")
+
+
+class ProductVariant(db.Model):
+    """Per (product, color, size) stock row; authoritative source for variant inventory"""
+    __tablename__ = "product_variant"
+    __table_args__ = (
+        db.UniqueConstraint("product_id", "color", "size", name="uq_product_variant"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Empty string for legacy size-only products (Product.size JSON without colors)
+    color = db.Column(VariantColor, nullable=False, default="")
+    size = db.Column(VariantSize, nullable=False)
+    stock = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    product = db.relationship("Product", back_populates="variants")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "color": self.color,
+            "size": self.size,
+            "stock": self.stock,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self):
+        return f"<ProductVariant {self.product_id} {self.color}/{self.size}: {self.stock}>"
@@ -1,5 +1,6 @@
 from datetime import datetime
 from extensions import db
+from models.image_derivative import parse_variants_map
 
 
 class ProductReview(db.Model):
@@ -15,6 +16,7 @@ class ProductReview(db.Model):
 
     # Comma-separated URLs for images and videos (served via routes)
     image_urls = db.Column(db.Text, nullable=True)
+    image_variants = db.Column(db.Text, nullable=True)  # JSON {image url: {"webp": url, "w200": url, ...}}
     video_urls = db.Column(db.Text, nullable=True)
 
     is_verified_purchase = db.Column(db.Boolean, default=False)
@@ -53,6 +55,7 @@ class ProductReview(db.Model):
             "title": self.title,
             "content": self.content,
             "images": images,
+            "image_variants": parse_variants_map(self.image_variants),
             "videos": videos,
             "is_verified_purchase": self.is_verified_purchase,
             "status": self.status,
@@ -0,0 +1,31 @@
+from extensions import db
+
+
+class SalesDailyRollup(db.Model):
+    """Per day / product / order status item totals (see services/sales_rollup_service.py)"""
+    __tablename__ = "sales_daily_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cost = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<SalesDailyRollup {self.day} product={self.product_id} {self.status}: {self.quantity}>"
+
+
+class OrderDailyRollup(db.Model):
+    """Per day / order status order counts and amounts"""
+    __tablename__ = "order_daily_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    order_amount = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<OrderDailyRollup {self.day} {self.status}: {self.order_count}>"
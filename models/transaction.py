@@ -53,8 +53,8 @@ class Transaction(db.Model):
         }
     
     @staticmethod
-    def create_transaction(customer_id, transaction_type, amount, description, reference_id=None, reference_type=None, payment_method=None, metadata=None, status="completed"):
-        """Helper method to create a transaction"""
+    def create_transaction(customer_id, transaction_type, amount, description, reference_id=None, reference_type=None, payment_method=None, metadata=None, status="completed", commit=True):
+        """Helper method to create a transaction; commit=False leaves it in the caller's unit of work"""
         transaction = Transaction(
             customer_id=customer_id,
             type=transaction_type,
@@ -67,5 +67,6 @@ class Transaction(db.Model):
             status=status
         )
         db.session.add(transaction)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return transaction
@@ -9,6 +9,7 @@ class Widget(db.Model):
     description = db.Column(db.String(200), nullable=True)
     page = db.Column(db.String(50), nullable=False, default="home")
     images = db.Column(db.Text, nullable=True)  # JSON or text representation of images
+    image_variants = db.Column(db.Text, nullable=True)  # JSON {image url: {"webp": url, "w200": url, ...}}
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     is_active = db.Column(db.Boolean, default=True)
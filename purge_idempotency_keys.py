@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Remove expired Idempotency-Key records (see utils/idempotency.py).
+Schedule it from cron, e.g. hourly:
+    0 * * * * cd /path/to/backend && python purge_idempotency_keys.py
+"""
+
+import sys
+import os
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    """Delete idempotency keys past their TTL"""
+    print("🚀 Purging expired idempotency keys...")
+
+    try:
+        from app import app
+        from utils.idempotency import purge_expired_idempotency_keys
+
+        with app.app_context():
+            removed = purge_expired_idempotency_keys()
+
+        print(f"✅ Removed {removed} expired idempotency keys")
+        return 0
+    except Exception as e:
+        print(f"❌ Idempotency key purge failed: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Periodic safety-net rebuild of product_stock_snapshot.
+Schedule it from cron, e.g. nightly:
+    0 3 * * * cd /path/to/backend && python rebuild_stock_snapshot.py
+"""
+
+import sys
+import os
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    """Rebuild the stock snapshot table from variant / JSON stock"""
+    print("🚀 Rebuilding product stock snapshot...")
+
+    try:
+        from app import app
+        from services.stock_snapshot_service import rebuild_stock_snapshot
+
+        with app.app_context():
+            products, rows = rebuild_stock_snapshot()
+
+        print(f"✅ Snapshot rebuilt: {rows} rows across {products} products")
+        return 0
+    except Exception as e:
+        print(f"❌ Snapshot rebuild failed: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,17 @@ from services.order_service import (
     cancel_order
 )
 from services.order_item_service import assign_delivery_guy_to_order_bulk
+from services.order_state_machine import bulk_update_order_status
+from services.admin_order_query_service import (
+    ADMIN_ORDER_FIELDS,
+    ADMIN_ORDER_QUERY_PARAMS,
+    parse_admin_order_query,
+    query_admin_orders,
+    serialize_admin_order
+)
 from services.wallet_service import refund_to_wallet
+from services.stock_snapshot_service import refresh_product_snapshot
+from services.inventory_service import lock_products_for_update
 from services.exchange_service import (
     get_all_exchanges_for_admin,
     approve_exchange,
@@ -22,31 +32,38 @@ from utils.crypto import encrypt_payload, decrypt_payload
 
 admin_order_bp = Blueprint("admin_order", __name__)
 
+# Paginated mode is enabled by any grid parameter: ?cursor=, ?limit=, ?fields=,
+# ?sort=&order=, filters (status, payment_status, date_from, date_to,
+# delivery_guy_id, customer_id, customer_email, order_number) or ?include_total=
 @admin_order_bp.route("/", methods=["GET"])
 @admin_order_bp.route("", methods=["GET"])
 @require_admin_auth
 def get_orders(current_admin):
-    """Get all orders for admin panel"""
+    """Get orders for admin panel"""
     try:
-        orders = get_all_orders()
-        orders_data = []
-        
-        for order in orders:
-            order_dict = order.as_dict()
-            # Add customer information
-            if hasattr(order, 'customer') and order.customer:
-                order_dict["customer"] = order.customer.as_dict()
+        if not any(param in request.args for param in ADMIN_ORDER_QUERY_PARAMS):
+            # Legacy full list response
+            orders = get_all_orders()
+            customers = {}
+            orders_data = [serialize_admin_order(order, ADMIN_ORDER_FIELDS, customers) for order in orders]
             
-            # Add order items
-            order_items = []
-            if hasattr(order, 'order_items'):
-                for item in order.order_items:
-                    order_items.append(item.as_dict())
-            order_dict["items"] = order_items
-            
-            orders_data.append(order_dict)
-        
-        data = {"orders": orders_data}
+            data = {"orders": orders_data}
+            enc = encrypt_payload(data)
+            return jsonify({"success": True, "encrypted_data": enc}), 200
+
+        try:
+            params = parse_admin_order_query(request.args)
+            orders_data, next_cursor, total = query_admin_orders(**params)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        data = {
+            "orders": orders_data,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
+        if total is not None:
+            data["total"] = total
         enc = encrypt_payload(data)
         return jsonify({"success": True, "encrypted_data": enc}), 200
     except Exception as e:
@@ -127,6 +144,50 @@ def update_status(current_admin, order_id):
         print(f"Update order status route error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@admin_order_bp.route("/bulk-status", methods=["POST"])
+@require_admin_auth
+def bulk_update_status(current_admin):
+    """Move many orders to one status, per the allowed-transition table"""
+    try:
+        encrypted_data = (request.get_json(silent=True) or {}).get("payload")
+        if not encrypted_data:
+            return jsonify({"error": "Missing encrypted payload"}), 400
+        
+        try:
+            data = decrypt_payload(encrypted_data)
+        except Exception as e:
+            print(f"Error decrypting payload: {e}")
+            return jsonify({"error": "Invalid encrypted payload"}), 401
+        
+        order_ids = data.get("order_ids")
+        status = data.get("status")
+        if not isinstance(order_ids, list) or not status:
+            return jsonify({"error": "order_ids (list) and status are required"}), 400
+        
+        try:
+            outcomes = bulk_update_order_status(order_ids, status)
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+        db.session.commit()
+        
+        counts = {}
+        for outcome in outcomes.values():
+            counts[outcome["result"]] = counts.get(outcome["result"], 0) + 1
+        print(f"✅ [ADMIN ORDER] Bulk status '{status}' by admin {current_admin['id']}: {counts}")
+        
+        data = {
+            "status": status,
+            "results": [{"order_id": order_id, **outcome} for order_id, outcome in outcomes.items()],
+            "counts": counts,
+        }
+        enc = encrypt_payload(data)
+        return jsonify({"success": True, "encrypted_data": enc}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Bulk update order status route error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @admin_order_bp.route("/<int:order_id>/refund", methods=["POST"])
 @require_admin_auth
 def update_refund_status(current_admin, order_id):
@@ -186,10 +247,17 @@ def update_refund_status(current_admin, order_id):
                     sizes_log = []
                 # Build map order_item_id -> log
                 id_to_log = {entry.get("order_item_id"): entry for entry in sizes_log if entry.get("order_item_id")}
+                # Lock every product up front in id order, like checkout, so the two cannot deadlock
+                lock_products_for_update(item.product_id for item in order.order_items if item.product_id)
                 for item in order.order_items:
                     product = Product.query.get(item.product_id)
                     if not product:
                         continue
+                    log = id_to_log.get(item.id)
+                    if product.variants and log and log.get("size"):
+                        # Variant-backed product: release restores variant, totals and snapshot together
+                        product.add_color_size_stock(item.selected_color or "", log.get("size"), int(log.get("quantity", 1)))
+                        continue
                     # restore total stock
                     try:
                         product.stock = int(product.stock or 0) + int(item.quantity or 0)
@@ -197,7 +265,6 @@ def update_refund_status(current_admin, order_id):
                     except Exception:
                         pass
                     # restore size-specific if available
-                    log = id_to_log.get(item.id)
                     if log and log.get("size"):
                         try:
                             sizes_map = {}
@@ -207,6 +274,7 @@ def update_refund_status(current_admin, order_id):
                             qty = int(log.get("quantity", 1))
                             sizes_map[chosen] = int(sizes_map.get(chosen, 0)) + qty
                             product.size = _json.dumps(sizes_map)
+                            refresh_product_snapshot(product)
                         except Exception as e:
                             print(f"Failed restoring size for product {product.id}: {e}")
                 db.session.flush()
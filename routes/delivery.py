@@ -9,9 +9,12 @@ from services.delivery_onboarding_service import (
     delete_onboarding,
     create_onboarding,
     get_onboarding_by_email,
-    upload_file
+    upload_file,
+    apply_onboarding_documents,
+    ONBOARDING_DOCUMENT_FIELDS,
 )
 from services.delivery_auth_service import verify_auth_token
+from services.direct_upload_service import create_upload_ticket, complete_upload
 from utils.auth import require_admin_auth
 from utils.crypto import encrypt_payload, decrypt_payload
 from utils.sns_service import sns_service
@@ -63,11 +66,8 @@ def upload_delivery_documents():
         
         # Handle file uploads
         uploaded_files = {}
-        document_fields = [
-            'aadhar_card', 'pan_card', 'dl', 'rc_card', 'bank_passbook'
-        ]
         
-        for field in document_fields:
+        for field in ONBOARDING_DOCUMENT_FIELDS:
             if field in request.files:
                 file = request.files[field]
                 if file and file.filename:
@@ -79,24 +79,7 @@ def upload_delivery_documents():
         
         # Update onboarding record with uploaded documents
         if uploaded_files:
-            for field, file_path in uploaded_files.items():
-                setattr(onboarding, field, file_path)
-            
-            # Update submission status based on what was uploaded
-            if 'aadhar_card' in uploaded_files or 'pan_card' in uploaded_files or 'dl' in uploaded_files:
-                onboarding.documents_submitted = True
-            
-            if 'rc_card' in uploaded_files:
-                onboarding.vehicle_docs_submitted = True
-            
-            if 'bank_passbook' in uploaded_files:
-                onboarding.bank_docs_submitted = True
-            
-            # Update status to pending if documents are submitted
-            if onboarding.documents_submitted and onboarding.vehicle_docs_submitted and onboarding.bank_docs_submitted:
-                onboarding.status = 'pending'
-            
-            onboarding.updated_at = datetime.utcnow()
+            apply_onboarding_documents(onboarding, uploaded_files)
             db.session.commit()
             
             return jsonify({
@@ -112,6 +95,53 @@ def upload_delivery_documents():
         print(f"Document upload error: {str(e)}")
         return jsonify({"success": False, "message": "Internal server error"}), 500
 
+def _onboarding_from_auth_header():
+    """(onboarding, None) for the bearer token's delivery applicant, or (None, error response)"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None, (jsonify({"success": False, "message": "Authorization header required"}), 401)
+    token_validation = verify_auth_token(auth_header.split(' ')[1])
+    if not token_validation["success"]:
+        return None, (jsonify({"success": False, "message": token_validation["message"]}), 401)
+    onboarding = DeliveryOnboarding.query.filter_by(email=token_validation["user"]["email"]).first()
+    if not onboarding:
+        return None, (jsonify({"success": False, "message": "Onboarding record not found. Please complete profile first."}), 404)
+    return onboarding, None
+
+@delivery_bp.route("/documents/direct-upload", methods=["POST"])
+def create_document_upload():
+    """Presigned upload ticket for one onboarding document; the file goes straight to storage"""
+    onboarding, error = _onboarding_from_auth_header()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    field = data.get("field")
+    if field not in ONBOARDING_DOCUMENT_FIELDS:
+        return jsonify({"success": False, "message": f"field must be one of {', '.join(ONBOARDING_DOCUMENT_FIELDS)}"}), 400
+    try:
+        ticket = create_upload_ticket("onboarding_document", onboarding.id, data.get("content_type"), data.get("size"), target=field)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, **ticket}), 200
+
+@delivery_bp.route("/documents/direct-upload/complete", methods=["POST"])
+def complete_document_upload():
+    """Record a directly uploaded onboarding document on the applicant's record"""
+    onboarding, error = _onboarding_from_auth_header()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    try:
+        result = complete_upload("onboarding_document", onboarding.id, data.get("upload_token"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "message": "Document uploaded successfully",
+        "uploaded_files": {result["field"]: result["file_url"]},
+        "onboarding_id": onboarding.id
+    }), 200
+
 @delivery_bp.route("/documents/<path:file_path>", methods=["GET"])
 def view_document(file_path):
     """View uploaded documents"""
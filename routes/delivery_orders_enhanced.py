@@ -6,6 +6,7 @@ from models.delivery_track import DeliveryTrack
 from models.delivery_onboarding import DeliveryOnboarding
 from models.customer import Customer
 from extensions import db
+from services.direct_upload_service import create_upload_ticket, complete_upload
 from datetime import datetime, timedelta
 import json
 import random
@@ -1077,13 +1078,13 @@ def upload_delivery_photo():
             }), 400
         
         # Upload image to S3
-        from utils.s3_service import S3Service
+        from utils.s3_service import get_storage
         from datetime import datetime
         import io
         from werkzeug.datastructures import FileStorage
         
         try:
-            s3_service = S3Service()
+            s3_service = get_storage()
             
             # Generate filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1130,6 +1131,42 @@ def upload_delivery_photo():
             "error": f"Error uploading photo: {str(e)}"
         }), 500
 
+@delivery_orders_enhanced_bp.route("/delivery-photo/direct-upload", methods=["POST"])
+@require_delivery_auth
+def create_delivery_photo_upload():
+    """Presigned upload ticket for a delivery photo; the image goes straight to storage"""
+    data = request.get_json(silent=True) or {}
+    item_id = data.get('item_id')
+    item_type = data.get('item_type')  # 'orders', 'exchanges', 'cancelled_items'
+    if not item_id or item_type not in ('orders', 'exchanges', 'cancelled_items'):
+        return jsonify({
+            "success": False,
+            "error": "Missing required fields: item_id, item_type"
+        }), 400
+    try:
+        ticket = create_upload_ticket(
+            "delivery_photo", request.delivery_guy_id, data.get('content_type', 'image/jpeg'), data.get('size'),
+            target=f"{item_type}:{item_id}",
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, **ticket}), 200
+
+@delivery_orders_enhanced_bp.route("/delivery-photo/direct-upload/complete", methods=["POST"])
+@require_delivery_auth
+def complete_delivery_photo_upload():
+    """Confirm a directly uploaded delivery photo and return its URL"""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = complete_upload("delivery_photo", request.delivery_guy_id, data.get('upload_token'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "message": "Delivery photo uploaded successfully",
+        "photo_url": result["file_url"]
+    }), 200
+
 @delivery_orders_enhanced_bp.route("/cancelled-items/<int:item_id>/out-for-delivery", methods=["PUT"])
 @require_delivery_auth
 def mark_cancelled_item_out_for_delivery(item_id):
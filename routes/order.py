@@ -8,6 +8,8 @@ from services.order_service import (
     cancel_order
 )
 from utils.auth import require_customer_auth, require_admin_auth
+from utils.idempotency import idempotent
+from services.inventory_service import lock_products_for_update
 from utils.crypto import decrypt_payload
 from extensions import db
 
@@ -15,6 +17,7 @@ order_bp = Blueprint("order", __name__)
 
 @order_bp.route("/", methods=["POST"])
 @require_customer_auth
+@idempotent("orders.create")
 def place_order(current_customer):
     """Create a new order"""
     try:
@@ -57,12 +60,14 @@ def get_order(current_customer, order_id):
 @order_bp.route("/customer", methods=["GET"])
 @require_customer_auth
 def get_my_orders(current_customer):
-    """Get all orders for current customer"""
+    """Get order history for current customer (?limit=, ?after=<next_cursor>, ?status=)"""
     try:
         customer_id = current_customer["id"]
         limit = request.args.get("limit", 20, type=int)
+        after = request.args.get("after")
+        status_filter = request.args.get("status")
         
-        res, status = get_customer_orders(customer_id, limit)
+        res, status = get_customer_orders(customer_id, limit, after=after, status=status_filter)
         return jsonify(res), status
     except Exception as e:
         print(f"Get customer orders route error: {str(e)}")
@@ -401,6 +406,9 @@ def process_order_refund(admin_user, order_id):
         total_refund_amount = 0
         processed_items = []
         
+        # Lock every product up front in id order, like checkout, so the two cannot deadlock
+        lock_products_for_update(item.product_id for item in items_to_refund if item.selected_size and item.product_id)
+        
         # Process refund for each item (FULL ORDER REFUND)
         for item in items_to_refund:
             print(f"[ORDER REFUND] Processing item: {item.id}, Product: {item.product_name}, Amount: {item.total_price}")
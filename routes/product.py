@@ -1,5 +1,5 @@
 # routes/product_routes.py
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, Response, stream_with_context, url_for
 from werkzeug.utils import secure_filename
 import os
 from uuid import uuid4
@@ -7,16 +7,36 @@ from services.product_service import (
     create_product,
     get_product_by_id,
     get_all_products,
-    get_customer_products,
+    get_customer_product_dicts,
+    get_customer_products_page,
+    get_product_detail_by_id,
+    get_barcode_sheet_labels,
+    parse_product_fields,
     update_product,
     delete_product,
     regenerate_product_barcode,
 )
 from utils.barcode_image_generator import generate_barcode_image, generate_barcode_sticker_html
 from utils.delivery_barcode_generator import generate_delivery_barcode_image, generate_delivery_barcode_sticker_html
-from services.review_service import get_product_review_stats
+from utils.barcode_renderer import get_barcode_png as get_barcode_png_bytes, DEFAULT_LAYOUT, LAYOUT_VERSIONS
+from utils.parallel_upload import upload_files_concurrently
+from services.image_derivative_service import generate_derivatives_for_files
+from utils.barcode_sheet import warm_sticker_cache, iter_sheet_html, render_sheet_pdf, render_sheet_png
+from services.search_service import search_products
+from services.product_import_service import (
+    detect_import_format, import_products, iter_product_export, DEFAULT_IMPORT_BATCH_SIZE,
+)
+from services.facet_service import parse_facet_filters, get_facet_results
+from services.stock_snapshot_service import get_stock_analytics, DEFAULT_LOW_STOCK_THRESHOLD
+from services.pricing_analytics_service import get_pricing_analytics
+from services.sales_rollup_service import parse_date_range, get_sales_analytics, get_profit_analytics
+from services.order_location_service import (
+    get_order_locations, DEFAULT_LOCATION_LIMIT, DEFAULT_RECENT_ORDERS, DEFAULT_CLUSTER_CELL_SIZE,
+)
 from utils.crypto import encrypt_payload, decrypt_payload
+from utils.catalog_cache import bump_catalog_version
 from extensions import db
+from models.product import Product
 
 product_bp = Blueprint("products", __name__)
 # Serve product images
@@ -37,39 +57,46 @@ def upload_images():
         if not files or all(not f or not getattr(f, "filename", None) for f in files):
             return jsonify({"success": False, "error": "No files provided"}), 400
 
+        allowed_ext = {"png", "jpg", "jpeg", "gif", "webp"}
+        files = [f for f in files if f and getattr(f, "filename", None)]
+        # Validate everything before the first byte goes to storage
+        for f in files:
+            ext = f.filename.rsplit(".", 1)[-1].lower() if "." in f.filename else ""
+            if ext not in allowed_ext:
+                return jsonify({"success": False, "error": f"Unsupported file type: {ext}"}), 400
+            mimetype = f.mimetype or ""
+            if not mimetype.startswith("image/"):
+                return jsonify({"success": False, "error": "Only image files are allowed"}), 400
+
         # Upload to S3 using environment configuration
         try:
-            from utils.s3_service import S3Service
-            s3_service = S3Service()
-            
-            allowed_ext = {"png", "jpg", "jpeg", "gif", "webp"}
-            urls = []
-            
-            for f in files:
-                if not f or not getattr(f, "filename", None):
-                    continue
-                    
-                ext = f.filename.rsplit(".", 1)[-1].lower() if "." in f.filename else ""
-                
-                if ext not in allowed_ext:
-                    return jsonify({"success": False, "error": f"Unsupported file type: {ext}"}), 400
-                    
-                mimetype = f.mimetype or ""
-                if not mimetype.startswith("image/"):
-                    return jsonify({"success": False, "error": "Only image files are allowed"}), 400
-                
-                # Upload to S3 with organized folder structure using environment configuration
+            from utils.s3_service import get_storage
+            s3_service = get_storage()
+
+            def upload(f):
+                # Organized folder structure using environment configuration
                 if product_id:
-                    url = s3_service.upload_product_file(f, product_id, color_name)
-                else:
-                    url = s3_service.upload_file(f, "temp", "image", "product")
-                
-                if url:
-                    urls.append(url)
-                else:
-                    return jsonify({"success": False, "error": f"Failed to upload file: {f.filename}"}), 500
-
-            return jsonify({"success": True, "files": urls})
+                    return s3_service.upload_product_file(f, product_id, color_name)
+                return s3_service.upload_file(f, "temp", "image", "product")
+
+            results = upload_files_concurrently(files, upload)
+            variants = generate_derivatives_for_files(
+                [(r["url"], f) for r, f in zip(results, files) if r["success"]]
+            )
+            for r in results:
+                if r["success"]:
+                    r["image_variants"] = variants.get(r["url"])
+            urls = [r["url"] for r in results if r["success"]]
+            failed = [r for r in results if not r["success"]]
+            if failed:
+                return jsonify({
+                    "success": False,
+                    "error": f"Failed to upload {len(failed)} of {len(results)} files",
+                    "files": urls,
+                    "results": results,
+                }), 502
+
+            return jsonify({"success": True, "files": urls, "results": results})
             
         except ValueError as s3_error:
             print(f"❌ S3 upload failed: {str(s3_error)}")
@@ -91,33 +118,106 @@ def list_products():
     return jsonify({"success": True, "encrypted_data": encrypted})
 
 # GET customer products (filtered for customer view)
+# Paginated mode is enabled by any of: ?cursor=, ?limit=, ?fields=
 @product_bp.route("/customer", methods=["GET"])
 def list_customer_products():
-    products = get_customer_products()
-    response = {"products": [p.to_dict() for p in products]}
+    cursor = request.args.get("cursor")
+    fields_param = request.args.get("fields")
+
+    if cursor is None and "limit" not in request.args and fields_param is None:
+        # Legacy full catalog response
+        response = {"products": get_customer_product_dicts()}
+        encrypted = encrypt_payload(response)
+        return jsonify({"success": True, "encrypted_data": encrypted})
+
+    limit = None
+    if "limit" in request.args:
+        try:
+            limit = int(request.args["limit"])
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be a positive integer"}), 400
+
+    try:
+        fields = parse_product_fields(fields_param)
+        products, next_cursor = get_customer_products_page(cursor=cursor, limit=limit, fields=fields)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    response = {
+        "products": products,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+    }
     encrypted = encrypt_payload(response)
     return jsonify({"success": True, "encrypted_data": encrypted})
 
 
+# SEARCH customer products: ?q=<text>&limit=20&prefix=true
+# The last query word also matches as a prefix so partial input autocompletes.
+@product_bp.route("/search", methods=["GET"])
+def search_customer_products():
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"success": False, "error": "Query parameter 'q' is required"}), 400
+    limit = request.args.get("limit", 20, type=int)
+    prefix = request.args.get("prefix", "true").lower() != "false"
+
+    try:
+        results = search_products(query, limit=limit, prefix=prefix)
+    except Exception as e:
+        print(f"❌ Product search error: {str(e)}")
+        return jsonify({"success": False, "error": "Search failed"}), 500
+
+    response = {
+        "query": query,
+        "ids": [r["id"] for r in results],
+        "results": results,
+    }
+    encrypted = encrypt_payload(response)
+    return jsonify({"success": True, "encrypted_data": encrypted})
+
+
+# FACETED filter over customer products:
+# ?cid=1,2&sid=&color=Red&size=M,L&price=500-1000&is_featured=true&offset=0&limit=100
+# Returns matching ids plus counts for every facet value.
+@product_bp.route("/facets", methods=["GET"])
+def filter_customer_products_by_facets():
+    try:
+        filters = parse_facet_filters(request.args)
+        result = get_facet_results(
+            filters,
+            offset=request.args.get("offset", 0, type=int),
+            limit=request.args.get("limit", 100, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Facet filter error: {str(e)}")
+        return jsonify({"success": False, "error": "Failed to filter products"}), 500
+
+    encrypted = encrypt_payload(result)
+    return jsonify({"success": True, "encrypted_data": encrypted})
+
+
 # GET product by ID (admin)
 @product_bp.route("/<int:pid>", methods=["GET"])
 def get_product(pid):
-    p = get_product_by_id(pid)
+    # Review stats come from the product's aggregate columns; no review queries
+    response = get_product_detail_by_id(pid)
+    p = response["product"] if response else None
     if not p:
         return jsonify({"success": False, "error": "Not found"}), 404
-    stats = get_product_review_stats(p.id)
-    response = {"product": p.to_dict(), "review_stats": stats}
     encrypted = encrypt_payload(response)
     return jsonify({"success": True, "encrypted_data": encrypted})
 
 # GET customer product by ID (filtered for customer view)
 @product_bp.route("/customer/<int:pid>", methods=["GET"])
 def get_customer_product(pid):
-    p = get_product_by_id(pid)
-    if not p or not p.is_active or not p.visibility:
+    # Review stats come from the product's aggregate columns; no review queries
+    response = get_product_detail_by_id(pid)
+    p = response["product"] if response else None
+    if not p or not p["is_active"] or not p["visibility"]:
         return jsonify({"success": False, "error": "Product not found or not available"}), 404
-    stats = get_product_review_stats(p.id)
-    response = {"product": p.to_dict(), "review_stats": stats}
     encrypted = encrypt_payload(response)
     return jsonify({"success": True, "encrypted_data": encrypted})
 
@@ -144,6 +244,49 @@ def create():
         return jsonify({"success": False, "error": "Internal server error"}), 500
 
 
+# BULK IMPORT products (CSV / NDJSON)
+@product_bp.route("/bulk-import", methods=["POST"])
+def bulk_import():
+    # multipart "file" upload, or the raw body with a text/csv / application/x-ndjson content type
+    # ?format=csv|ndjson&batch_size=500
+    try:
+        upload = request.files.get("file")
+        if upload:
+            stream = upload.stream
+            fmt = request.args.get("format") or detect_import_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get("format") or detect_import_format(content_type=request.content_type)
+        if not fmt:
+            return jsonify({"success": False, "error": "Could not detect format; pass ?format=csv|ndjson"}), 400
+
+        report = import_products(
+            stream,
+            fmt,
+            batch_size=request.args.get("batch_size", DEFAULT_IMPORT_BATCH_SIZE, type=int),
+        )
+        return jsonify({"success": True, "report": report})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Bulk import error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# EXPORT products (streamed CSV / NDJSON)
+@product_bp.route("/export", methods=["GET"])
+def export_products():
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"success": False, "error": "format must be one of csv, ndjson"}), 400
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(iter_product_export(fmt)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=products.{fmt}"},
+    )
+
+
 # UPDATE product
 @product_bp.route("/<int:pid>", methods=["PUT"])
 def update(pid):
@@ -197,13 +340,7 @@ def get_barcode_image(pid):
         if not product.barcode:
             return jsonify({"success": False, "error": "Product has no barcode"}), 400
         
-        # Check if barcode image already exists in database
-        if product.barcode_image:
-            response = {"barcode_image": product.barcode_image}
-            encrypted = encrypt_payload(response)
-            return jsonify({"success": True, "encrypted_data": encrypted})
-        
-        # Generate delivery-optimized barcode image
+        # Served from the on-disk sticker cache; no longer stored on the product row
         image_data = generate_delivery_barcode_image(
             product.barcode, 
             product.pname, 
@@ -213,11 +350,10 @@ def get_barcode_image(pid):
         if not image_data:
             return jsonify({"success": False, "error": "Failed to generate barcode image"}), 500
         
-        # Save barcode image to database
-        product.barcode_image = image_data
-        db.session.commit()
-        
-        response = {"barcode_image": image_data}
+        response = {
+            "barcode_image": image_data,
+            "barcode_image_url": url_for("products.get_barcode_png", pid=product.id),
+        }
         encrypted = encrypt_payload(response)
         return jsonify({"success": True, "encrypted_data": encrypted})
         
@@ -225,6 +361,32 @@ def get_barcode_image(pid):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+# BARCODE STICKER AS BINARY PNG (cached on disk, ETag-validated)
+@product_bp.route("/<int:pid>/barcode.png", methods=["GET"])
+def get_barcode_png(pid):
+    # ?layout=delivery|label
+    try:
+        product = db.session.query(Product.barcode, Product.pname).filter(Product.id == pid).first()
+        if not product:
+            return jsonify({"success": False, "error": "Product not found"}), 404
+        if not product.barcode:
+            return jsonify({"success": False, "error": "Product has no barcode"}), 400
+
+        png, etag = get_barcode_png_bytes(
+            product.barcode, product.pname, pid, layout=request.args.get("layout", DEFAULT_LAYOUT)
+        )
+        response = Response(png, mimetype="image/png")
+        response.set_etag(etag)
+        # Name changes alter the sticker under the same URL, so always revalidate
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 # GENERATE BARCODE STICKER HTML FOR PRINTING
 @product_bp.route("/<int:pid>/barcode-sticker", methods=["GET"])
 def get_barcode_sticker(pid):
@@ -249,315 +411,127 @@ def get_barcode_sticker(pid):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+# BATCH BARCODE SHEET (many stickers, paginated for printing)
+MAX_SHEET_LABELS = 5000
+
+@product_bp.route("/barcode-sheet", methods=["POST"])
+def get_barcode_sheet():
+    # {"product_ids": [..]} or {"cid": .., "sid": ..}; optional "copies", "layout",
+    # "format": html|pdf|png and "page" (png only). Body may be encrypted as {"data": ...}
+    try:
+        body = request.get_json(silent=True) or {}
+        data = decrypt_payload(body["data"]) if body.get("data") else body
+        if not data:
+            return jsonify({"success": False, "error": "Invalid request data"}), 400
+
+        layout = data.get("layout") or DEFAULT_LAYOUT
+        if layout not in LAYOUT_VERSIONS:
+            return jsonify({"success": False, "error": f"layout must be one of {', '.join(LAYOUT_VERSIONS)}"}), 400
+        fmt = data.get("format") or "html"
+        if fmt not in ("html", "pdf", "png"):
+            return jsonify({"success": False, "error": "format must be one of html, pdf, png"}), 400
+        copies = int(data.get("copies") or 1)
+        if not 1 <= copies <= 100:
+            return jsonify({"success": False, "error": "copies must be between 1 and 100"}), 400
+
+        product_ids = [int(pid) for pid in (data.get("product_ids") or [])]
+        if not product_ids and not data.get("cid") and not data.get("sid"):
+            return jsonify({"success": False, "error": "Provide product_ids or a cid/sid filter"}), 400
+        labels = get_barcode_sheet_labels(
+            product_ids=product_ids,
+            cid=data.get("cid"),
+            sid=data.get("sid"),
+            limit=None if product_ids else MAX_SHEET_LABELS + 1,
+        )
+        labels = [label for label in labels for _ in range(copies)]
+        if not labels:
+            return jsonify({"success": False, "error": "No products with barcodes matched"}), 404
+        if len(labels) > MAX_SHEET_LABELS:
+            return jsonify({"success": False, "error": f"At most {MAX_SHEET_LABELS} labels per sheet"}), 400
+
+        if fmt == "pdf":
+            pdf = render_sheet_pdf(labels, layout)
+            return Response(pdf, mimetype="application/pdf",
+                            headers={"Content-Disposition": "inline; filename=barcode-sheet.pdf"})
+        if fmt == "png":
+            png = render_sheet_png(labels, int(data.get("page") or 1), layout)
+            return Response(png, mimetype="image/png")
+
+        # HTML references the cached PNGs, so render them all up front in the pool
+        warm_sticker_cache(labels, layout)
+        urls = {pid: url_for("products.get_barcode_png", pid=pid, layout=layout) for _, _, pid in labels}
+        return Response(stream_with_context(iter_sheet_html(labels, urls.get, layout)), mimetype="text/html")
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Barcode sheet error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # GET PRODUCT STOCK ANALYTICS FOR DASHBOARD
 @product_bp.route("/stock-analytics", methods=["GET"])
 def get_product_stock_analytics():
+    # Served from product_stock_snapshot (services/stock_snapshot_service.py)
+    # ?low_stock_threshold=5&status=in_stock|out_of_stock|low_stock
     try:
-        from models.product import Product
-        
-        # Get all active products with their colors and sizes data
-        products = Product.query.filter_by(is_active=True, visibility=True).all()
-        
-        analytics_data = []
-        for product in products:
-            colors_data = product.get_colors_data()
-            if colors_data:  # Only include products that have colors data
-                product_analytics = {
-                    "id": product.id,
-                    "name": product.pname,
-                    "total_stock": 0,
-                    "current_stock": [],
-                    "out_of_stock": []
-                }
-                
-                for color in colors_data:
-                    if isinstance(color, dict) and color.get("name") and color.get("sizeCounts"):
-                        color_name = color["name"]
-                        size_counts = color.get("sizeCounts", {})
-                        
-                        # Process each size and its count
-                        for size, count in size_counts.items():
-                            count_int = int(count or 0)
-                            product_analytics["total_stock"] += count_int
-                            
-                            if count_int > 0:
-                                # Current stock
-                                product_analytics["current_stock"].append({
-                                    "color": color_name,
-                                    "size": size,
-                                    "count": count_int
-                                })
-                            else:
-                                # Out of stock
-                                product_analytics["out_of_stock"].append({
-                                    "color": color_name,
-                                    "size": size,
-                                    "count": 0
-                                })
-                
-                # Only include products that have some data
-                if product_analytics["current_stock"] or product_analytics["out_of_stock"]:
-                    analytics_data.append(product_analytics)
-        
-        response = {"success": True, "data": analytics_data}
+        result = get_stock_analytics(
+            low_stock_threshold=request.args.get("low_stock_threshold", DEFAULT_LOW_STOCK_THRESHOLD, type=int),
+            status=request.args.get("status") or None,
+        )
+        response = {"success": True, **result}
         return jsonify(response)
         
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 # GET PRODUCT PRICING ANALYTICS FOR DASHBOARD
 @product_bp.route("/pricing-analytics", methods=["GET"])
 def get_product_pricing_analytics():
+    # ?group_by=category|subcategory&include_products=false
     try:
-        from models.product import Product
-        
-        # Get all active products with their pricing data
-        products = Product.query.filter_by(is_active=True, visibility=True).all()
-        
-        analytics_data = {
-            "total_products": len(products),
-            "total_original_price": 0,
-            "total_actual_price": 0,
-            "total_discount_amount": 0,
-            "total_final_price": 0,
-            "total_profit_amount": 0,
-            "average_profit_margin": 0,
-            "products": []
-        }
-        
-        for product in products:
-            # Calculate pricing
-            original_price = float(product.price or 0)
-            actual_price = float(product.actual_price or 0)
-            discount_value = float(product.discount_value or 0)
-            
-            # Calculate final price after discount
-            discount_amount = (original_price * discount_value) / 100
-            final_price = original_price - discount_amount
-            
-            # Calculate profit (final_price - actual_price)
-            profit_amount = final_price - actual_price if actual_price > 0 else 0
-            profit_margin = (profit_amount / final_price * 100) if final_price > 0 else 0
-            
-            # Add to totals
-            analytics_data["total_original_price"] += original_price
-            analytics_data["total_actual_price"] += actual_price
-            analytics_data["total_discount_amount"] += discount_amount
-            analytics_data["total_final_price"] += final_price
-            analytics_data["total_profit_amount"] += profit_amount
-            
-            # Product details
-            product_data = {
-                "id": product.id,
-                "name": product.pname,
-                "original_price": round(original_price, 2),
-                "actual_price": round(actual_price, 2),
-                "discount_value": round(discount_value, 2),
-                "discount_amount": round(discount_amount, 2),
-                "final_price": round(final_price, 2),
-                "profit_amount": round(profit_amount, 2),
-                "profit_margin": round(profit_margin, 2),
-                "stock": product.get_total_stock_from_colors() or product.stock or 0
-            }
-            
-            analytics_data["products"].append(product_data)
-        
-        # Calculate average profit margin
-        if analytics_data["total_final_price"] > 0:
-            analytics_data["average_profit_margin"] = round(
-                (analytics_data["total_profit_amount"] / analytics_data["total_final_price"]) * 100, 2
-            )
-        
-        # Round all totals
-        analytics_data["total_original_price"] = round(analytics_data["total_original_price"], 2)
-        analytics_data["total_actual_price"] = round(analytics_data["total_actual_price"], 2)
-        analytics_data["total_discount_amount"] = round(analytics_data["total_discount_amount"], 2)
-        analytics_data["total_final_price"] = round(analytics_data["total_final_price"], 2)
-        analytics_data["total_profit_amount"] = round(analytics_data["total_profit_amount"], 2)
-        
+        analytics_data = get_pricing_analytics(
+            group_by=request.args.get("group_by") or None,
+            include_products=request.args.get("include_products", "true").lower() != "false",
+        )
         response = {"success": True, "data": analytics_data}
         return jsonify(response)
         
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 # GET ORDER SALES ANALYTICS FOR DASHBOARD
+# Answered from the daily rollups; optional ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
 @product_bp.route("/order-sales-analytics", methods=["GET"])
 def get_order_sales_analytics():
     try:
-        from models.order import Order, OrderItem
-        from models.product import Product
-        
-        # Get all delivered orders (not cancelled)
-        delivered_orders = Order.query.filter(
-            Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped'])
-        ).all()
-        
-        analytics_data = {
-            "total_orders": len(delivered_orders),
-            "total_sales_amount": 0,
-            "total_items_sold": 0,
-            "average_order_value": 0,
-            "top_products": [],
-            "recent_orders": []
-        }
-        
-        # Calculate totals
-        for order in delivered_orders:
-            analytics_data["total_sales_amount"] += order.total_amount
-            
-            # Get order items for this order
-            order_items = OrderItem.query.filter_by(order_id=order.id).all()
-            for item in order_items:
-                analytics_data["total_items_sold"] += item.quantity
-        
-        # Calculate average order value
-        if analytics_data["total_orders"] > 0:
-            analytics_data["average_order_value"] = round(
-                analytics_data["total_sales_amount"] / analytics_data["total_orders"], 2
-            )
-        
-        # Get top selling products
-        from sqlalchemy import func
-        top_products_query = db.session.query(
-            Product.pname,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.total_price).label('total_revenue')
-        ).join(OrderItem, Product.id == OrderItem.product_id)\
-         .join(Order, OrderItem.order_id == Order.id)\
-         .filter(Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped']))\
-         .group_by(Product.id, Product.pname)\
-         .order_by(func.sum(OrderItem.quantity).desc())\
-         .limit(10).all()
-        
-        analytics_data["top_products"] = [
-            {
-                "name": product_name,
-                "quantity_sold": int(total_quantity),
-                "revenue": float(total_revenue)
-            }
-            for product_name, total_quantity, total_revenue in top_products_query
-        ]
-        
-        # Get recent orders
-        recent_orders = Order.query.filter(
-            Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped'])
-        ).order_by(Order.created_at.desc()).limit(5).all()
-        
-        analytics_data["recent_orders"] = [
-            {
-                "order_number": order.order_number,
-                "total_amount": order.total_amount,
-                "status": order.status,
-                "created_at": order.created_at.isoformat() if order.created_at else None
-            }
-            for order in recent_orders
-        ]
-        
-        # Round totals
-        analytics_data["total_sales_amount"] = round(analytics_data["total_sales_amount"], 2)
+        start, end = parse_date_range(request.args.get("start_date"), request.args.get("end_date"))
+        analytics_data = get_sales_analytics(start, end)
         
         response = {"success": True, "data": analytics_data}
         return jsonify(response)
         
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 # GET ORDER PROFIT ANALYTICS FOR DASHBOARD
+# Answered from the daily rollups; optional ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
 @product_bp.route("/order-profit-analytics", methods=["GET"])
 def get_order_profit_analytics():
     try:
-        from models.order import Order, OrderItem
-        from models.product import Product
-        
-        # Get all delivered orders (not cancelled)
-        delivered_orders = Order.query.filter(
-            Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped'])
-        ).all()
-        
-        analytics_data = {
-            "total_orders": len(delivered_orders),
-            "total_revenue": 0,
-            "total_cost": 0,
-            "total_profit": 0,
-            "profit_margin": 0,
-            "top_profitable_products": [],
-            "profit_by_order": []
-        }
-        
-        # Calculate profit for each order
-        for order in delivered_orders:
-            order_items = OrderItem.query.filter_by(order_id=order.id).all()
-            order_revenue = 0
-            order_cost = 0
-            
-            for item in order_items:
-                # Get product details
-                product = Product.query.get(item.product_id)
-                if product:
-                    # Revenue from this item
-                    item_revenue = item.total_price
-                    order_revenue += item_revenue
-                    
-                    # Cost for this item (actual_price * quantity)
-                    item_cost = (product.actual_price or 0) * item.quantity
-                    order_cost += item_cost
-            
-            order_profit = order_revenue - order_cost
-            
-            analytics_data["total_revenue"] += order_revenue
-            analytics_data["total_cost"] += order_cost
-            analytics_data["total_profit"] += order_profit
-            
-            # Store profit by order
-            analytics_data["profit_by_order"].append({
-                "order_number": order.order_number,
-                "revenue": round(order_revenue, 2),
-                "cost": round(order_cost, 2),
-                "profit": round(order_profit, 2),
-                "profit_margin": round((order_profit / order_revenue * 100) if order_revenue > 0 else 0, 2)
-            })
-        
-        # Calculate overall profit margin
-        if analytics_data["total_revenue"] > 0:
-            analytics_data["profit_margin"] = round(
-                (analytics_data["total_profit"] / analytics_data["total_revenue"]) * 100, 2
-            )
-        
-        # Get top profitable products
-        from sqlalchemy import func
-        profitable_products_query = db.session.query(
-            Product.pname,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.total_price).label('total_revenue'),
-            func.sum((Product.actual_price * OrderItem.quantity)).label('total_cost')
-        ).join(OrderItem, Product.id == OrderItem.product_id)\
-         .join(Order, OrderItem.order_id == Order.id)\
-         .filter(Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped']))\
-         .group_by(Product.id, Product.pname, Product.actual_price)\
-         .order_by((func.sum(OrderItem.total_price) - func.sum(Product.actual_price * OrderItem.quantity)).desc())\
-         .limit(10).all()
-        
-        analytics_data["top_profitable_products"] = [
-            {
-                "name": product_name,
-                "quantity_sold": int(total_quantity),
-                "revenue": float(total_revenue),
-                "cost": float(total_cost or 0),
-                "profit": float(total_revenue - (total_cost or 0)),
-                "profit_margin": round(((total_revenue - (total_cost or 0)) / total_revenue * 100) if total_revenue > 0 else 0, 2)
-            }
-            for product_name, total_quantity, total_revenue, total_cost in profitable_products_query
-        ]
-        
-        # Round totals
-        analytics_data["total_revenue"] = round(analytics_data["total_revenue"], 2)
-        analytics_data["total_cost"] = round(analytics_data["total_cost"], 2)
-        analytics_data["total_profit"] = round(analytics_data["total_profit"], 2)
+        start, end = parse_date_range(request.args.get("start_date"), request.args.get("end_date"))
+        analytics_data = get_profit_analytics(start, end)
         
         response = {"success": True, "data": analytics_data}
         return jsonify(response)
         
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -599,99 +573,24 @@ def verify_barcode(barcode_number):
 def get_customer_order_locations():
     """
     Get customer order locations for map visualization
-    Returns addresses and order counts for mapping
+    Served from order_location_rollup (services/order_location_service.py)
+    ?limit=200&recent=5&cluster=grid&cell_size=0.5
     """
     try:
-        from models.order import Order
-        from models.customer import Customer
-        from sqlalchemy import func
-        
-        # Get all delivered orders with customer info
-        delivered_orders = Order.query.filter(
-            Order.status.in_(['delivered', 'confirmed', 'processing', 'shipped'])
-        ).join(Customer).all()
-        
-        # Group orders by delivery address
-        address_orders = {}
-        for order in delivered_orders:
-            address = order.delivery_address
-            if address and address.strip():
-                # Parse address if it's JSON
-                try:
-                    import json
-                    if address.startswith('{'):
-                        address_data = json.loads(address)
-                        # Create a readable address string
-                        address_parts = []
-                        if address_data.get('address_line1'):
-                            address_parts.append(address_data['address_line1'])
-                        if address_data.get('address_line2'):
-                            address_parts.append(address_data['address_line2'])
-                        if address_data.get('city'):
-                            address_parts.append(address_data['city'])
-                        if address_data.get('state'):
-                            address_parts.append(address_data['state'])
-                        if address_data.get('postal_code'):
-                            address_parts.append(address_data['postal_code'])
-                        address = ', '.join(address_parts) if address_parts else order.delivery_address
-                except:
-                    # If parsing fails, use original address
-                    pass
-                
-                if address not in address_orders:
-                    address_orders[address] = {
-                        'address': address,
-                        'order_count': 0,
-                        'total_amount': 0,
-                        'customers': set(),
-                        'recent_orders': []
-                    }
-                
-                address_orders[address]['order_count'] += 1
-                address_orders[address]['total_amount'] += order.total_amount
-                address_orders[address]['customers'].add(order.customer_id)
-                
-                # Add recent order info
-                address_orders[address]['recent_orders'].append({
-                    'order_id': order.id,
-                    'order_number': order.order_number,
-                    'customer_name': order.customer.name if order.customer and order.customer.name else (order.customer.username if order.customer else "Unknown"),
-                    'total_amount': order.total_amount,
-                    'status': order.status,
-                    'created_at': order.created_at.isoformat() if order.created_at else None
-                })
-        
-        # Convert to list and sort by order count
-        locations_data = []
-        for address, data in address_orders.items():
-            locations_data.append({
-                'address': data['address'],
-                'order_count': data['order_count'],
-                'total_amount': round(data['total_amount'], 2),
-                'unique_customers': len(data['customers']),
-                'recent_orders': data['recent_orders'][-5:]  # Last 5 orders
-            })
-        
-        # Sort by order count (descending)
-        locations_data.sort(key=lambda x: x['order_count'], reverse=True)
-        
-        # Calculate summary stats
-        total_locations = len(locations_data)
-        total_orders = sum(loc['order_count'] for loc in locations_data)
-        total_amount = sum(loc['total_amount'] for loc in locations_data)
-        
-        analytics_data = {
-            "total_locations": total_locations,
-            "total_orders": total_orders,
-            "total_amount": round(total_amount, 2),
-            "locations": locations_data
-        }
-        
+        analytics_data = get_order_locations(
+            limit=request.args.get("limit", DEFAULT_LOCATION_LIMIT, type=int),
+            recent=request.args.get("recent", DEFAULT_RECENT_ORDERS, type=int),
+            cluster=request.args.get("cluster") or None,
+            cell_size=request.args.get("cell_size", DEFAULT_CLUSTER_CELL_SIZE, type=float),
+        )
+
         return jsonify({
             "success": True,
             "data": analytics_data
         }), 200
 
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_customer_order_locations: {str(e)}")
         return jsonify({
@@ -7,6 +7,7 @@ from services.razorpay_service import (
 )
 from services.wallet_service import add_money_to_wallet
 from utils.auth import require_customer_auth
+from utils.idempotency import idempotent
 from utils.crypto import decrypt_payload
 
 razorpay_bp = Blueprint("razorpay", __name__)
@@ -39,6 +40,7 @@ def create_order(current_customer):
 
 @razorpay_bp.route("/verify-payment", methods=["POST"])
 @require_customer_auth
+@idempotent("razorpay.verify_payment")
 def verify_payment(current_customer):
     """Verify Razorpay payment and add money to wallet"""
     try:
@@ -6,6 +6,8 @@ from werkzeug.utils import secure_filename
 from utils.crypto import encrypt_payload, decrypt_payload
 from utils.auth import require_customer_auth, require_admin_auth
 from utils.s3_service import s3_service
+from services.image_derivative_service import generate_derivatives_for_files
+from services.direct_upload_service import create_upload_ticket, complete_upload
 from services.review_service import (
     create_review,
     list_reviews_for_product,
@@ -111,8 +113,18 @@ def upload_media(current_customer):
         if not result['images'] and not result['videos']:
             return jsonify({"success": False, "error": "Failed to upload files"}), 500
 
+        # upload_multiple_files keeps request order, so image URLs line up with the image files
+        image_files = [
+            f for f in files
+            if f and getattr(f, "filename", None) and f.filename.rsplit(".", 1)[-1].lower() in image_ext
+        ]
+        image_variants = {}
+        if len(image_files) == len(result['images']):
+            image_variants = generate_derivatives_for_files(list(zip(result['images'], image_files)))
+
         enc = encrypt_payload({
             "images": result['images'], 
+            "image_variants": image_variants,
             "videos": result['videos']
         })
         return jsonify({"success": True, "encrypted_data": enc})
@@ -122,6 +134,34 @@ def upload_media(current_customer):
         return jsonify({"success": False, "error": "Failed to upload files to S3"}), 500
 
 
+# Direct-to-storage video upload: ticket first, then the client POSTs the
+# file to `upload.url` with `upload.fields`, then calls /complete
+@review_bp.route("/direct-upload", methods=["POST"])
+@require_customer_auth
+def create_review_upload(current_customer):
+    data = request.get_json(silent=True) or {}
+    review_id = data.get("review_id")
+    try:
+        ticket = create_upload_ticket(
+            "review_video", current_customer["id"], data.get("content_type"), data.get("size"),
+            target=int(review_id) if review_id else None,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "encrypted_data": encrypt_payload(ticket)})
+
+
+@review_bp.route("/direct-upload/complete", methods=["POST"])
+@require_customer_auth
+def complete_review_upload(current_customer):
+    data = request.get_json(silent=True) or {}
+    try:
+        result = complete_upload("review_video", current_customer["id"], data.get("upload_token"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "encrypted_data": encrypt_payload({"videos": [result["file_url"]], **result})})
+
+
 # Note: Media serving is now handled by S3 directly via public URLs
 # The image_urls and video_urls fields in the database now contain full S3 URLs
 # Frontend can access media directly using the URLs from the API response
@@ -0,0 +1,59 @@
+# routes/storage.py
+from flask import Blueprint, request, jsonify, send_from_directory
+from utils.s3_service import get_storage, LocalDiskBackend
+
+storage_bp = Blueprint("storage", __name__)
+
+
+def _local_backend():
+    backend = get_storage().backend
+    return backend if isinstance(backend, LocalDiskBackend) else None
+
+
+# Serve media stored by the local-disk backend (STORAGE_BACKEND=local);
+# with S3 the public bucket URLs are used directly
+@storage_bp.route("/files/<path:key>", methods=["GET"])
+def serve_local_file(key):
+    backend = _local_backend()
+    if not backend:
+        return jsonify({"success": False, "error": "Not found"}), 404
+    return send_from_directory(backend.base_dir, key)
+
+
+class _SizeLimitedStream:
+    """Read-through wrapper that fails once more than max_bytes have been read"""
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.remaining = max_bytes
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.remaining -= len(chunk)
+        if self.remaining < 0:
+            raise ValueError("File exceeds the allowed size")
+        return chunk
+
+
+# Local stand-in for the S3 presigned POST form (see LocalDiskBackend.presign_post)
+@storage_bp.route("/direct-upload", methods=["POST"])
+def local_direct_upload():
+    backend = _local_backend()
+    if not backend:
+        return jsonify({"success": False, "error": "Not found"}), 404
+    try:
+        claims = backend.verify_policy(request.form.get("policy", ""))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 403
+
+    file = request.files.get("file")
+    if request.form.get("key") != claims["key"] or not file:
+        return jsonify({"success": False, "error": "Upload does not match its policy"}), 403
+    if request.form.get("Content-Type") != claims["content_type"]:
+        return jsonify({"success": False, "error": "Content-Type does not match its policy"}), 403
+
+    try:
+        backend.put_fileobj(_SizeLimitedStream(file.stream, claims["max_bytes"]), claims["key"], claims["content_type"])
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return "", 204
@@ -8,6 +8,7 @@ from services.wallet_service import (
     refund_to_wallet
 )
 from utils.auth import require_customer_auth
+from utils.idempotency import idempotent
 from utils.crypto import decrypt_payload
 
 wallet_bp = Blueprint("wallet", __name__)
@@ -26,6 +27,7 @@ def get_balance(current_customer):
 
 @wallet_bp.route("/add-money", methods=["POST"])
 @require_customer_auth
+@idempotent("wallet.add_money")
 def add_money(current_customer):
     """Add money to customer wallet"""
     try:
@@ -50,6 +52,7 @@ def add_money(current_customer):
 
 @wallet_bp.route("/deduct-money", methods=["POST"])
 @require_customer_auth
+@idempotent("wallet.deduct_money")
 def deduct_money(current_customer):
     """Deduct money from customer wallet"""
     try:
@@ -88,6 +91,7 @@ def get_transactions(current_customer):
 
 @wallet_bp.route("/refund", methods=["POST"])
 @require_customer_auth
+@idempotent("wallet.refund")
 def refund_money(current_customer):
     """Refund money to customer wallet"""
     try:
@@ -0,0 +1,233 @@
+# services/admin_order_query_service.py
+"""
+Paginated, filterable order grid for the admin panel (GET /api/admin/orders).
+
+Pages are keyset-paginated on (sort column, id), so any page costs one
+index range scan however many orders exist; the cursor carries the last
+row's sort value and id. Items and customers are only loaded when
+projected, each with one batched query for the whole page; coupons are
+joined into the page query.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db
+from models.order import Order
+from models.customer import Customer
+
+ADMIN_ORDERS_DEFAULT_LIMIT = 50
+ADMIN_ORDERS_MAX_LIMIT = 200
+
+# Sortable columns; all are NOT NULL in practice so keyset comparisons hold.
+# Each has a (column, id) index (order_number is unique) so a page is one range scan.
+ADMIN_ORDER_SORTS = {
+    "id": Order.id,
+    "created_at": Order.created_at,
+    "updated_at": Order.updated_at,
+    "total_amount": Order.total_amount,
+    "order_number": Order.order_number,
+}
+
+# Projectable keys: every Order.as_dict key plus the related collections
+ADMIN_ORDER_RELATED_FIELDS = ("customer", "items")
+ADMIN_ORDER_FIELDS = (
+    "id", "customer_id", "order_number", "status", "delivery_address", "delivery_type",
+    "scheduled_time", "delivery_fee", "payment_method", "payment_id", "payment_status",
+    "subtotal", "delivery_fee_amount", "platform_fee", "discount_amount", "total_amount",
+    "created_at", "updated_at", "estimated_delivery", "delivery_guy_id", "assigned_at",
+    "delivery_notes", "is_exchange_delivery", "coupon_id", "coupon_code",
+) + ADMIN_ORDER_RELATED_FIELDS
+
+# Query-string keys that switch GET /api/admin/orders into paginated mode
+ADMIN_ORDER_QUERY_PARAMS = (
+    "cursor", "limit", "fields", "sort", "order", "status", "payment_status",
+    "date_from", "date_to", "delivery_guy_id", "customer_id", "customer_email",
+    "order_number", "include_total",
+)
+
+
+def _split(value):
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def _parse_datetime(value, name, end_of_day=False):
+    """ISO date or datetime; a bare date used as an upper bound covers the whole day"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def parse_admin_order_query(args):
+    """Validate grid query-string arguments into keyword arguments for query_admin_orders"""
+    sort = args.get("sort") or "id"
+    if sort not in ADMIN_ORDER_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(ADMIN_ORDER_SORTS)}")
+    direction = (args.get("order") or "desc").lower()
+    if direction not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+
+    fields = _split(args.get("fields")) or list(ADMIN_ORDER_FIELDS)
+    unknown = [f for f in fields if f not in ADMIN_ORDER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # id is always needed to continue pagination
+    if "id" not in fields:
+        fields.insert(0, "id")
+
+    filters = {
+        "status": _split(args.get("status")),
+        "payment_status": _split(args.get("payment_status")),
+        "order_number": (args.get("order_number") or "").strip() or None,
+        "customer_email": (args.get("customer_email") or "").strip() or None,
+    }
+    if args.get("date_from"):
+        filters["date_from"] = _parse_datetime(args["date_from"], "date_from")
+    if args.get("date_to"):
+        filters["date_to"] = _parse_datetime(args["date_to"], "date_to", end_of_day=True)
+    if args.get("customer_id"):
+        filters["customer_id"] = _parse_int(args["customer_id"], "customer_id")
+    delivery_guy_id = args.get("delivery_guy_id")
+    if delivery_guy_id:
+        # "none" lists orders that still need a delivery partner
+        filters["delivery_guy_id"] = None if delivery_guy_id == "none" else _parse_int(delivery_guy_id, "delivery_guy_id")
+
+    limit = args.get("limit")
+    return {
+        "filters": filters,
+        "sort": sort,
+        "direction": direction,
+        "cursor": args.get("cursor"),
+        "limit": _parse_int(limit, "limit") if limit else ADMIN_ORDERS_DEFAULT_LIMIT,
+        "fields": fields,
+        "include_total": (args.get("include_total") or "").lower() in ("1", "true", "yes"),
+    }
+
+
+def _filtered_query(filters):
+    query = Order.query
+    if filters.get("status"):
+        query = query.filter(Order.status.in_(filters["status"]))
+    if filters.get("payment_status"):
+        query = query.filter(Order.payment_status.in_(filters["payment_status"]))
+    if filters.get("date_from"):
+        query = query.filter(Order.created_at >= filters["date_from"])
+    if filters.get("date_to"):
+        query = query.filter(Order.created_at < filters["date_to"])
+    if "delivery_guy_id" in filters:
+        query = query.filter(Order.delivery_guy_id == filters["delivery_guy_id"]
+                             if filters["delivery_guy_id"] is not None else Order.delivery_guy_id.is_(None))
+    if filters.get("customer_id"):
+        query = query.filter(Order.customer_id == filters["customer_id"])
+    if filters.get("customer_email"):
+        customer_ids = db.session.query(Customer.id).filter(Customer.email == filters["customer_email"])
+        query = query.filter(Order.customer_id.in_(customer_ids.scalar_subquery()))
+    if filters.get("order_number"):
+        query = query.filter(Order.order_number.like(f"{_escape_like(filters['order_number'])}%", escape="\\"))
+    return query
+
+
+def _cursor_value(order, sort):
+    value = getattr(order, sort)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_admin_order_cursor(order, sort, direction):
+    """Opaque cursor pointing just after `order` in the given sort"""
+    payload = {"s": sort, "d": direction, "v": _cursor_value(order, sort), "id": order.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def decode_admin_order_cursor(cursor, sort, direction):
+    """(last sort value, last id) from a cursor issued for the same sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
+        if payload["s"] != sort or payload["d"] != direction:
+            raise ValueError
+        value = payload["v"]
+        if sort in ("created_at", "updated_at") and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, int(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def serialize_admin_order(order, fields, customers):
+    """Projected order dict; `customers` memoizes serialized customers across a page"""
+    data = order.as_dict()
+    result = {key: data[key] for key in fields if key in data}
+    if "customer" in fields:
+        customer = order.customer
+        if customer is None:
+            result["customer"] = None
+        else:
+            # Customer.as_dict decrypts several columns; do it once per customer per page
+            if customer.id not in customers:
+                customers[customer.id] = customer.as_dict()
+            result["customer"] = customers[customer.id]
+    if "items" in fields:
+        result["items"] = [item.as_dict() for item in order.items]
+    return result
+
+
+def query_admin_orders(filters=None, sort="id", direction="desc", cursor=None,
+                       limit=ADMIN_ORDERS_DEFAULT_LIMIT, fields=ADMIN_ORDER_FIELDS, include_total=False):
+    """
+    One page of the admin order grid.
+    Returns (orders as projected dicts, next_cursor or None, total or None).
+    """
+    filters = filters or {}
+    limit = max(1, min(int(limit), ADMIN_ORDERS_MAX_LIMIT))
+    column = ADMIN_ORDER_SORTS[sort]
+    query = _filtered_query(filters)
+    total = query.order_by(None).with_entities(func.count(Order.id)).scalar() if include_total else None
+
+    if cursor:
+        value, last_id = decode_admin_order_cursor(cursor, sort, direction)
+        if sort == "id":
+            query = query.filter(Order.id < last_id if direction == "desc" else Order.id > last_id)
+        elif direction == "desc":
+            query = query.filter(or_(column < value, and_(column == value, Order.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, Order.id > last_id)))
+
+    # as_dict always reads coupon.code, so the coupon is joined in unconditionally
+    options = [joinedload(Order.coupon)]
+    if "customer" in fields:
+        options.append(selectinload(Order.customer))
+    if "items" in fields:
+        options.append(selectinload(Order.items))
+    query = query.options(*options)
+
+    if direction == "desc":
+        query = query.order_by(column.desc(), Order.id.desc()) if sort != "id" else query.order_by(Order.id.desc())
+    else:
+        query = query.order_by(column.asc(), Order.id.asc()) if sort != "id" else query.order_by(Order.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    orders = query.limit(limit + 1).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    customers = {}
+    orders_data = [serialize_admin_order(order, fields, customers) for order in orders]
+    next_cursor = encode_admin_order_cursor(orders[-1], sort, direction) if has_more and orders else None
+    return orders_data, next_cursor, total
@@ -6,6 +6,9 @@ from models.category import Category
 from extensions import db
 from utils.crypto import encrypt_payload, decrypt_payload
 from utils.s3_service import s3_service
+from utils.catalog_cache import cached, bump_catalog_version
+from services.image_derivative_service import generate_derivatives_for_files, set_image_variants, category_image_urls
+from models.image_derivative import parse_variants_map
 import json
 
 # Image upload configuration
@@ -21,6 +24,8 @@ def save_category_image(file, category_id):
     if file and file.filename and allowed_file(file.filename):
         # Upload to S3
         s3_url = s3_service.upload_file(file, category_id, "category")
+        if s3_url:
+            generate_derivatives_for_files([(s3_url, file)])
         return s3_url
     
     return None
@@ -32,21 +37,26 @@ def delete_category_image(image_url):
     
     s3_service.delete_file(image_url)
 
+def _build_categories_data():
+    categories = Category.query.order_by(Category.id.desc()).all()
+    categories_data = []
+    
+    for category in categories:
+        category_dict = {
+            "id": category.id,
+            "name": category.category_name,
+            "description": category.description,
+            "category_count": category.category_count,
+            "image": category.image,
+            "image_variants": parse_variants_map(category.image_variants)
+        }
+        categories_data.append(category_dict)
+    return categories_data
+
 def get_all_categories():
     """Get all categories with encryption"""
     try:
-        categories = Category.query.order_by(Category.id.desc()).all()
-        categories_data = []
-        
-        for category in categories:
-            category_dict = {
-                "id": category.id,
-                "name": category.category_name,
-                "description": category.description,
-                "category_count": category.category_count,
-                "image": category.image
-            }
-            categories_data.append(category_dict)
+        categories_data = cached(("categories",), _build_categories_data)
         
         # Encrypt the response data
         encrypted_data = encrypt_payload({
@@ -76,7 +86,8 @@ def get_category_by_id(category_id):
             "name": category.category_name,
             "description": category.description,
             "category_count": category.category_count,
-            "image": category.image
+            "image": category.image,
+            "image_variants": parse_variants_map(category.image_variants)
         }
         
         # Encrypt the response data
@@ -127,7 +138,9 @@ def create_category(encrypted_data, file=None):
             image_url = save_category_image(file, new_category.id)
             if image_url:
                 new_category.image = image_url
+                set_image_variants(new_category, category_image_urls(new_category))
         
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -136,7 +149,8 @@ def create_category(encrypted_data, file=None):
             "name": new_category.category_name,
             "description": new_category.description,
             "category_count": new_category.category_count,
-            "image": new_category.image
+            "image": new_category.image,
+            "image_variants": parse_variants_map(new_category.image_variants)
         }
         
         encrypted_response = encrypt_payload({
@@ -190,11 +204,13 @@ def update_category(category_id, encrypted_data, file=None):
             image_url = save_category_image(file, category.id)
             if image_url:
                 category.image = image_url
+                set_image_variants(category, category_image_urls(category))
         
         # Update category
         category.category_name = name
         category.description = description
         
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -203,7 +219,8 @@ def update_category(category_id, encrypted_data, file=None):
             "name": category.category_name,
             "description": category.description,
             "category_count": category.category_count,
-            "image": category.image
+            "image": category.image,
+            "image_variants": parse_variants_map(category.image_variants)
         }
         
         encrypted_response = encrypt_payload({
@@ -239,6 +256,7 @@ def delete_category(category_id):
             delete_category_image(category.image)
         
         db.session.delete(category)
+        bump_catalog_version()
         db.session.commit()
         
         return {
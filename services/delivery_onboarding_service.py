@@ -399,6 +399,29 @@ def delivered_order_by_delivery_guy(delivery_guy_id, order_id, delivered_reason)
         return {"success": False, "message": "Failed to deliver order"}
 
 
+ONBOARDING_DOCUMENT_FIELDS = ['aadhar_card', 'pan_card', 'dl', 'rc_card', 'bank_passbook']
+
+def apply_onboarding_documents(onboarding, uploaded_files):
+    """Store {field: url} documents on the onboarding record and update submission flags. Caller commits."""
+    for field, file_path in uploaded_files.items():
+        setattr(onboarding, field, file_path)
+    
+    # Update submission status based on what was uploaded
+    if 'aadhar_card' in uploaded_files or 'pan_card' in uploaded_files or 'dl' in uploaded_files:
+        onboarding.documents_submitted = True
+    
+    if 'rc_card' in uploaded_files:
+        onboarding.vehicle_docs_submitted = True
+    
+    if 'bank_passbook' in uploaded_files:
+        onboarding.bank_docs_submitted = True
+    
+    # Update status to pending if documents are submitted
+    if onboarding.documents_submitted and onboarding.vehicle_docs_submitted and onboarding.bank_docs_submitted:
+        onboarding.status = 'pending'
+    
+    onboarding.updated_at = datetime.utcnow()
+
 def upload_file(file, folder="onboarding"):
     """Upload file to S3 and return URL"""
     try:
@@ -406,8 +429,8 @@ def upload_file(file, folder="onboarding"):
             return None
         
         # Import S3 service
-        from utils.s3_service import S3Service
-        s3_service = S3Service()
+        from utils.s3_service import get_storage
+        s3_service = get_storage()
         
         # Determine file type based on folder
         if folder == "onboarding/profile":
@@ -0,0 +1,153 @@
+# services/direct_upload_service.py
+"""
+Direct-to-storage uploads for large media.
+
+Instead of streaming a file through a Flask worker, the client asks for an
+upload ticket, POSTs the file straight to storage with the returned form,
+then calls the matching /complete endpoint. The ticket's signed
+upload_token pins the kind, owner, key and target, so completion cannot
+be pointed at someone else's file or record. Completion checks the stored
+object's size and type before recording its URL on the owning model.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+import jwt
+from config import Config
+from extensions import db
+from utils.s3_service import get_storage
+
+DIRECT_UPLOAD_EXPIRES_IN = 15 * 60  # seconds a ticket stays valid
+
+IMAGE_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+DOCUMENT_TYPES = {**IMAGE_TYPES, "application/pdf": "pdf"}
+VIDEO_TYPES = {"video/mp4": "mp4", "video/webm": "webm", "video/quicktime": "mov", "video/x-msvideo": "avi"}
+
+
+def _record_review_video(owner_id, target, file_url):
+    """Append the video to the customer's review when a review_id was given"""
+    from models.review import ProductReview
+    from services.review_service import add_media_to_review
+    if not target:
+        return {}
+    # Row lock so concurrent replays of the same completion see each other's append
+    review = ProductReview.query.filter_by(id=int(target)).with_for_update().first()
+    if not review or review.customer_id != int(owner_id):
+        raise ValueError("Review not found")
+    current_videos = [u.strip() for u in (review.video_urls or "").split(",") if u.strip()]
+    if file_url in current_videos:
+        # The ticket stays valid until it expires; a replayed completion must not append twice
+        db.session.commit()
+        return {"review_id": review.id}
+    add_media_to_review(review.id, videos=[file_url])
+    return {"review_id": review.id}
+
+
+def _record_onboarding_document(owner_id, target, file_url):
+    from models.delivery_onboarding import DeliveryOnboarding
+    from services.delivery_onboarding_service import apply_onboarding_documents
+    onboarding = DeliveryOnboarding.query.get(int(owner_id))
+    if not onboarding:
+        raise ValueError("Onboarding record not found")
+    apply_onboarding_documents(onboarding, {target: file_url})
+    db.session.commit()
+    return {"onboarding_id": onboarding.id, "field": target}
+
+
+def _record_nothing(owner_id, target, file_url):
+    # Delivery photos have no column of their own; the client attaches the URL
+    return {}
+
+
+DIRECT_UPLOAD_KINDS = {
+    "review_video": {
+        "folder": lambda storage: storage.video_folder,
+        "content_types": VIDEO_TYPES,
+        "max_bytes": 200 * 1024 * 1024,
+        "record": _record_review_video,
+    },
+    "onboarding_document": {
+        "folder": lambda storage: storage.delivery_onboarding_folder,
+        "content_types": DOCUMENT_TYPES,
+        "max_bytes": 10 * 1024 * 1024,
+        "record": _record_onboarding_document,
+    },
+    "delivery_photo": {
+        "folder": lambda storage: f"{storage.document_folder}delivery_photos/",
+        "content_types": IMAGE_TYPES,
+        "max_bytes": 10 * 1024 * 1024,
+        "record": _record_nothing,
+    },
+}
+
+
+def create_upload_ticket(kind, owner_id, content_type, size, target=None):
+    """
+    Presigned form for one upload plus the token that completes it.
+    `target` identifies what the file is for (review id, document field, item).
+    """
+    spec = DIRECT_UPLOAD_KINDS[kind]
+    if content_type not in spec["content_types"]:
+        raise ValueError(f"Unsupported content type: {content_type}")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValueError("size must be an integer number of bytes")
+    if size < 1 or size > spec["max_bytes"]:
+        raise ValueError(f"size must be between 1 and {spec['max_bytes']} bytes")
+
+    storage = get_storage()
+    extension = spec["content_types"][content_type]
+    key = f"{spec['folder'](storage)}{owner_id}/{uuid.uuid4().hex}.{extension}"
+    upload = storage.backend.presign_post(key, content_type, spec["max_bytes"], DIRECT_UPLOAD_EXPIRES_IN)
+    token = jwt.encode({
+        "purpose": "direct_upload",
+        "kind": kind,
+        "owner": str(owner_id),
+        "target": target,
+        "key": key,
+        "content_type": content_type,
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=DIRECT_UPLOAD_EXPIRES_IN),
+    }, Config.SECRET_KEY, algorithm="HS256")
+    return {
+        "upload": upload,
+        "key": key,
+        "file_url": storage.public_url(key),
+        "upload_token": token,
+        "expires_in": DIRECT_UPLOAD_EXPIRES_IN,
+        "max_bytes": spec["max_bytes"],
+    }
+
+
+def complete_upload(kind, owner_id, upload_token):
+    """Verify the uploaded object and record it on its owner; returns the file URL and owner details"""
+    try:
+        claims = jwt.decode(upload_token or "", Config.SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise ValueError("Upload token expired")
+    except jwt.InvalidTokenError:
+        raise ValueError("Invalid upload token")
+    if claims.get("purpose") != "direct_upload" or claims.get("kind") != kind or claims.get("owner") != str(owner_id):
+        raise ValueError("Invalid upload token")
+
+    spec = DIRECT_UPLOAD_KINDS[kind]
+    storage = get_storage()
+    stat = storage.backend.stat(claims["key"])
+    if stat is None:
+        raise ValueError("File has not been uploaded yet")
+    size, stored_type = stat
+    if size > spec["max_bytes"] or (stored_type and stored_type != claims["content_type"]):
+        # The presign conditions should make this impossible; never keep a mismatch
+        storage.backend.delete(claims["key"])
+        raise ValueError("Uploaded file does not match the upload ticket")
+
+    file_url = storage.public_url(claims["key"])
+    try:
+        recorded = spec["record"](owner_id, claims.get("target"), file_url)
+    except ValueError:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        raise ValueError(f"Could not record upload: {str(e)}")
+    print(f"✅ Direct upload completed ({kind}): {file_url}")
+    return {"file_url": file_url, "key": claims["key"], "size": size, **recorded}
@@ -0,0 +1,275 @@
+# services/facet_service.py
+"""
+In-memory facet engine for the storefront.
+
+Every customer-visible product gets a bit position; each facet value
+(category, subcategory, in-stock color / size, final-price bucket, flag) is a
+Python int used as a bitmap over those positions. Filtering is AND across
+facets and OR within a facet; facet counts are popcounts of the intersections.
+
+The index is rebuilt when the catalog version changes or after
+FACET_INDEX_MAX_AGE seconds, which bounds staleness of stock-based facets
+(checkout does not bump the catalog version). A rebuild publishes one
+immutable snapshot with a single assignment, so lock-free readers never
+mix ids from one build with bitmaps from another.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from extensions import db
+from models.product import Product
+from models.product_variant import ProductVariant
+from utils.catalog_cache import get_catalog_version
+
+FACET_INDEX_MAX_AGE = float(os.getenv("FACET_INDEX_MAX_AGE", "60"))
+FACET_MAX_LIMIT = 500
+
+# Final price (after discount) buckets: (label, lower inclusive, upper exclusive)
+PRICE_BUCKETS = [
+    ("0-500", 0, 500),
+    ("500-1000", 500, 1000),
+    ("1000-2000", 1000, 2000),
+    ("2000-5000", 2000, 5000),
+    ("5000+", 5000, None),
+]
+FLAG_FACETS = ("is_featured", "is_trending", "is_latest", "is_new")
+FACETS = ("cid", "sid", "color", "size", "price") + FLAG_FACETS
+
+# ids: bit position -> product id (id desc, same as the listing order)
+# bitmaps: facet -> {value: bitmap}
+FacetSnapshot = namedtuple("FacetSnapshot", ["ids", "bitmaps", "all_bits", "version", "built_at"])
+_EMPTY_SNAPSHOT = FacetSnapshot([], {}, 0, None, 0.0)
+
+
+def _positions_to_bitmap(positions, size):
+    # Building through a bytearray keeps this linear; OR-ing 1 << i into a
+    # growing int is quadratic for large catalogs
+    buf = bytearray((size + 7) // 8)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _json_stock(colors_json, size_json):
+    """Yield ((color, size), stock) from raw colors / size JSON columns"""
+    try:
+        colors = json.loads(colors_json) if colors_json else []
+        if colors:
+            for color in colors:
+                if isinstance(color, dict) and color.get("name"):
+                    for size, count in (color.get("sizeCounts") or {}).items():
+                        yield (color["name"], str(size)), int(count or 0)
+        elif size_json and size_json.strip().startswith("{"):
+            for size, count in json.loads(size_json).items():
+                yield ("", str(size)), int(count or 0)
+    except (ValueError, TypeError, AttributeError):
+        return
+
+
+def _price_bucket(price, discount_value):
+    price = float(price or 0)
+    final_price = price - (price * (discount_value or 0) / 100)
+    for label, low, high in PRICE_BUCKETS:
+        if final_price >= low and (high is None or final_price < high):
+            return label
+    return PRICE_BUCKETS[0][0]
+
+
+class FacetIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot = _EMPTY_SNAPSHOT
+
+    def _is_stale(self):
+        snapshot = self.snapshot
+        if snapshot.version is None:
+            return True
+        if time.monotonic() - snapshot.built_at > FACET_INDEX_MAX_AGE:
+            return True
+        return get_catalog_version() != snapshot.version
+
+    def ensure_fresh(self):
+        if not self._is_stale():
+            return
+        with self._lock:
+            if self._is_stale():
+                self.rebuild()
+
+    def rebuild(self):
+        """Build all facet bitmaps from the database"""
+        version = get_catalog_version()
+        rows = db.session.query(
+            Product.id,
+            Product.cid,
+            Product.sid,
+            Product.price,
+            Product.discount_value,
+            Product.is_featured,
+            Product.is_trending,
+            Product.is_latest,
+            Product.is_new,
+        ).filter(
+            Product.is_active == True,
+            Product.visibility == True,
+        ).order_by(Product.id.desc()).all()
+
+        ids = [row.id for row in rows]
+        position = {pid: i for i, pid in enumerate(ids)}
+        positions = {facet: {} for facet in FACETS}  # facet -> {value: set(bit positions)}
+
+        def add(facet, value, i):
+            if value is None or value == "":
+                return
+            positions[facet].setdefault(value, set()).add(i)
+
+        for i, row in enumerate(rows):
+            add("cid", row.cid, i)
+            add("sid", row.sid, i)
+            add("price", _price_bucket(row.price, row.discount_value), i)
+            for flag in FLAG_FACETS:
+                if getattr(row, flag):
+                    add(flag, "true", i)
+
+        # Color / size availability comes from product_variant stock
+        with_variants = set()
+        variant_rows = db.session.query(
+            ProductVariant.product_id,
+            ProductVariant.color,
+            ProductVariant.size,
+            ProductVariant.stock,
+        ).all()
+        for product_id, color, size, stock in variant_rows:
+            with_variants.add(product_id)
+            i = position.get(product_id)
+            if i is None or stock <= 0:
+                continue
+            add("color", color, i)
+            add("size", size, i)
+
+        # Products not backfilled into product_variant yet fall back to their JSON
+        missing = [pid for pid in ids if pid not in with_variants]
+        for start in range(0, len(missing), 1000):
+            chunk = missing[start:start + 1000]
+            json_rows = db.session.query(Product.id, Product.colors, Product.size).filter(
+                Product.id.in_(chunk),
+                db.or_(Product.colors.isnot(None), Product.size.isnot(None)),
+            )
+            for product_id, colors_json, size_json in json_rows:
+                i = position[product_id]
+                for (color, size), stock in _json_stock(colors_json, size_json):
+                    if stock > 0:
+                        add("color", color, i)
+                        add("size", size, i)
+
+        bitmaps = {
+            facet: {value: _positions_to_bitmap(bits, len(ids)) for value, bits in values.items()}
+            for facet, values in positions.items()
+        }
+        self.snapshot = FacetSnapshot(ids, bitmaps, (1 << len(ids)) - 1, version, time.monotonic())
+        print(f"[FACETS] Index rebuilt: {len(ids)} products")
+
+    @staticmethod
+    def _facet_mask(snapshot, facet, values):
+        mask = 0
+        facet_bitmaps = snapshot.bitmaps.get(facet, {})
+        for value in values:
+            if facet in FLAG_FACETS and value == "false":
+                # Only "true" is stored; "false" is its complement
+                mask |= snapshot.all_bits & ~facet_bitmaps.get("true", 0)
+            else:
+                mask |= facet_bitmaps.get(value, 0)
+        return mask
+
+    @staticmethod
+    def _ids_for(ids, mask, offset, limit):
+        # Walk the set bits via the binary string; O(n) instead of O(k * n)
+        bits = bin(mask)[:1:-1]
+        result = []
+        pos = bits.find("1")
+        skipped = 0
+        while pos != -1 and len(result) < limit:
+            if skipped < offset:
+                skipped += 1
+            else:
+                result.append(ids[pos])
+            pos = bits.find("1", pos + 1)
+        return result
+
+    def query(self, filters, offset=0, limit=100):
+        """
+        filters: {facet: [values]} -- OR within a facet, AND across facets.
+        Returns (ids page, total, facet counts). Counts for a facet ignore that
+        facet's own filter so the UI can show alternatives.
+        """
+        self.ensure_fresh()
+        # Read the snapshot once; a concurrent rebuild swaps in a new one
+        snapshot = self.snapshot
+        ids, bitmaps, all_bits = snapshot.ids, snapshot.bitmaps, snapshot.all_bits
+
+        masks = {facet: self._facet_mask(snapshot, facet, values) for facet, values in filters.items() if values}
+        combined = all_bits
+        for mask in masks.values():
+            combined &= mask
+
+        counts = {}
+        for facet in FACETS:
+            base = all_bits
+            for other, mask in masks.items():
+                if other != facet:
+                    base &= mask
+            counts[facet] = {
+                str(value): (base & bitmap).bit_count()
+                for value, bitmap in bitmaps.get(facet, {}).items()
+            }
+
+        page = self._ids_for(ids, combined, offset, limit) if ids else []
+        return page, combined.bit_count(), counts
+
+
+facet_index = FacetIndex()
+
+
+def parse_facet_filters(args):
+    """Read facet filters from request args (comma separated values per facet)"""
+    filters = {}
+    for facet in FACETS:
+        raw = args.get(facet)
+        if raw is None or raw == "":
+            continue
+        values = [v.strip() for v in str(raw).split(",") if v.strip()]
+        if facet in ("cid", "sid"):
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                raise ValueError(f"Invalid {facet} value")
+        elif facet in FLAG_FACETS:
+            flag = values[-1].lower() if values else ""
+            if flag in ("1", "true", "yes"):
+                values = ["true"]
+            elif flag in ("0", "false", "no"):
+                values = ["false"]
+            else:
+                raise ValueError(f"Invalid {facet} value; expected true or false")
+        elif facet == "price":
+            known = {label for label, _, _ in PRICE_BUCKETS}
+            if any(v not in known for v in values):
+                raise ValueError(f"Invalid price bucket; expected one of {sorted(known)}")
+        filters[facet] = values
+    return filters
+
+
+def get_facet_results(filters, offset=0, limit=100):
+    """Filter customer products by facets; returns matching ids plus counts for every facet value"""
+    offset = max(0, int(offset or 0))
+    limit = max(1, min(int(limit or 100), FACET_MAX_LIMIT))
+    ids, total, counts = facet_index.query(filters, offset=offset, limit=limit)
+    return {
+        "ids": ids,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "facets": counts,
+        "price_buckets": [label for label, _, _ in PRICE_BUCKETS],
+    }
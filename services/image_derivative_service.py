@@ -0,0 +1,209 @@
+# services/image_derivative_service.py
+"""
+Thumbnail / WebP derivatives for product, category, widget and review images.
+
+Derivatives are generated when an image is uploaded (or later by
+migrations/backfill_image_derivatives.py), stored next to the original and
+recorded in the image_derivative table. Rows that reference images keep a
+denormalized `image_variants` JSON column, so serializing them needs no
+extra queries; set_image_variants() refreshes it whenever the row's image
+URLs change.
+"""
+import hashlib
+import json
+from extensions import db
+from models.image_derivative import ImageDerivative
+from models.product import Product
+from models.category import Category
+from models.widget import Widget
+from models.review import ProductReview
+from utils.image_derivatives import (
+    build_derivatives_many, derivative_key, variant_name, DERIVATIVE_WIDTHS, FULL_SIZE_VARIANT,
+)
+from utils.parallel_upload import map_concurrently
+from utils.catalog_cache import bump_catalog_version
+
+BACKFILL_BATCH_SIZE = 50
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _get_storage():
+    from utils.s3_service import get_storage
+    return get_storage()
+
+
+def _complete_variants(uploaded):
+    """Widths the original was too narrow for fall back to the full-size WebP"""
+    variants = {FULL_SIZE_VARIANT: uploaded[FULL_SIZE_VARIANT]}
+    for width in DERIVATIVE_WIDTHS:
+        name = variant_name(width)
+        variants[name] = uploaded.get(name, uploaded[FULL_SIZE_VARIANT])
+    return variants
+
+
+def generate_image_derivatives(originals):
+    """
+    Build, store and record derivatives for [(url, image bytes)].
+    Returns {url: variants} for the images that succeeded; failures are
+    logged and skipped so they never fail the upload that triggered them.
+    """
+    originals = [(url, data) for url, data in originals if url and data]
+    if not originals:
+        return {}
+    storage = _get_storage()
+    built = build_derivatives_many([data for _, data in originals])
+
+    uploads = []
+    for (url, _), derivatives in zip(originals, built):
+        key = storage.key_from_url(url)
+        if not derivatives or not key:
+            continue
+        for variant, webp in derivatives.items():
+            uploads.append((url, variant, derivative_key(key, variant), webp))
+
+    def upload(item):
+        url, variant, key, webp = item
+        try:
+            return url, variant, storage.upload_bytes(webp, key, "image/webp")
+        except Exception as e:
+            print(f"[IMAGE DERIVATIVES] Upload of {key} failed: {str(e)}")
+            return url, variant, None
+
+    uploaded = {}
+    failed = set()
+    for url, variant, derivative_url in map_concurrently(upload, uploads):
+        if derivative_url:
+            uploaded.setdefault(url, {})[variant] = derivative_url
+        else:
+            failed.add(url)
+
+    results = {
+        url: _complete_variants(variants)
+        for url, variants in uploaded.items()
+        if url not in failed and FULL_SIZE_VARIANT in variants
+    }
+    if not results:
+        return {}
+    try:
+        # Own transaction: derivatives exist in storage whatever happens to the
+        # caller's unit of work, and this must not commit it early
+        table = ImageDerivative.__table__
+        hashes = [url_hash(url) for url in results]
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.url_hash.in_(hashes)))
+            connection.execute(table.insert(), [
+                {"url_hash": url_hash(url), "source_url": url, "variants": json.dumps(variants)}
+                for url, variants in results.items()
+            ])
+    except Exception as e:
+        print(f"[IMAGE DERIVATIVES] Could not record derivatives: {str(e)}")
+        return {}
+    print(f"[IMAGE DERIVATIVES] Generated derivatives for {len(results)} of {len(originals)} images")
+    return results
+
+
+def generate_derivatives_for_files(uploads):
+    """generate_image_derivatives for [(url, FileStorage)] straight after an upload"""
+    originals = []
+    for url, file in uploads:
+        try:
+            file.seek(0)
+            originals.append((url, file.read()))
+        except Exception as e:
+            print(f"[IMAGE DERIVATIVES] Could not re-read {getattr(file, 'filename', url)}: {str(e)}")
+    return generate_image_derivatives(originals)
+
+
+def resolve_image_variants(urls):
+    """{url: variants} for the given image URLs that have derivatives, in one query"""
+    urls = [u for u in dict.fromkeys(urls) if u]
+    if not urls:
+        return {}
+    rows = db.session.query(ImageDerivative.source_url, ImageDerivative.variants).filter(
+        ImageDerivative.url_hash.in_([url_hash(u) for u in urls])
+    ).all()
+    return {source_url: json.loads(variants) for source_url, variants in rows}
+
+
+def set_image_variants(obj, urls):
+    """Point obj.image_variants at the derivatives of exactly `urls`; caller commits"""
+    variants = resolve_image_variants(urls)
+    obj.image_variants = json.dumps(variants) if variants else None
+
+
+def product_image_urls(product):
+    return [u.strip() for u in (product.image or "").split(",") if u.strip()]
+
+
+def review_image_urls(review):
+    return [u.strip() for u in (review.image_urls or "").split(",") if u.strip()]
+
+
+def category_image_urls(category):
+    return [category.image] if category.image else []
+
+
+def widget_image_urls(widget):
+    try:
+        images = json.loads(widget.images) if widget.images else []
+    except (TypeError, ValueError):
+        return []
+    return [u for u in images if isinstance(u, str)] if isinstance(images, list) else []
+
+
+IMAGE_OWNERS = {
+    "product": (Product, Product.id, product_image_urls),
+    "category": (Category, Category.id, category_image_urls),
+    "widget": (Widget, Widget.id, widget_image_urls),
+    "review": (ProductReview, ProductReview.id, review_image_urls),
+}
+
+
+def _fetch_original(url):
+    try:
+        return url, _get_storage().read_file(url)
+    except Exception as e:
+        print(f"[IMAGE DERIVATIVES] Could not download {url}: {str(e)}")
+        return url, None
+
+
+def backfill_image_derivatives(owners=None, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Generate missing derivatives for images already referenced by rows and
+    refresh those rows' image_variants. Walks each table by id in batches.
+    """
+    storage = _get_storage()
+    report = {}
+    for owner in owners or IMAGE_OWNERS:
+        model, id_column, urls_of = IMAGE_OWNERS[owner]
+        stats = {"rows": 0, "images": 0, "generated": 0}
+        last_id = 0
+        while True:
+            rows = model.query.filter(id_column > last_id).order_by(id_column.asc()).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            row_urls = {row.id: urls_of(row) for row in rows}
+            all_urls = list(dict.fromkeys(u for urls in row_urls.values() for u in urls))
+            known = resolve_image_variants(all_urls)
+            missing = [u for u in all_urls if u not in known and storage.key_from_url(u)]
+            generated = generate_image_derivatives(map_concurrently(_fetch_original, missing))
+            known.update(generated)
+
+            for row in rows:
+                variants = {u: known[u] for u in row_urls[row.id] if u in known}
+                row.image_variants = json.dumps(variants) if variants else None
+            if owner == "product":
+                bump_catalog_version()
+            db.session.commit()
+
+            stats["rows"] += len(rows)
+            stats["images"] += len(all_urls)
+            stats["generated"] += len(generated)
+        report[owner] = stats
+        print(f"[IMAGE DERIVATIVES] {owner}: {stats['generated']} generated across "
+              f"{stats['images']} images in {stats['rows']} rows")
+    return report
@@ -0,0 +1,223 @@
+# services/inventory_service.py
+"""
+Variant inventory backed by the product_variant table.
+
+Stock changes are single conditional UPDATE statements so concurrent
+checkouts only contend on the row lock of the variant they touch instead of
+rewriting the whole Product.colors JSON blob.
+
+Lock order is always product row, then its variant rows, and products in
+id order; callers touching several products lock them up front with
+lock_products_for_update().
+
+Variant names are matched exactly (utf8mb4_bin on MySQL) after stripping
+surrounding whitespace, see variant_key().
+"""
+from models.product import Product
+from models.product_variant import ProductVariant, COLOR_MAX_LENGTH, SIZE_MAX_LENGTH
+from extensions import db
+from services.stock_snapshot_service import apply_snapshot_delta
+from sqlalchemy import case
+from sqlalchemy.orm.attributes import set_committed_value
+from collections import defaultdict
+
+
+class InvalidVariantError(ValueError):
+    """A colors/size entry that cannot be stored as a product_variant row"""
+
+
+def variant_key(color, size):
+    """
+    (color, size) as stored in product_variant. Surrounding whitespace is
+    dropped because MySQL ignores trailing spaces in comparisons even under
+    a binary collation, so "Red" and "Red " would collide on the unique key.
+    """
+    return str(color or "").strip(), str(size).strip()
+
+
+def _expire_loaded_variants(product_id):
+    """Drop cached stock values for variants of `product_id` held in the session"""
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, ProductVariant) and obj.product_id == product_id:
+            db.session.expire(obj, ["stock"])
+
+
+def _expire_loaded_product_totals(product_id):
+    product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+    if product is not None:
+        db.session.expire(product, ["stock", "quantity"])
+
+
+def _lock_product_row(product_id):
+    """Take the product row lock before touching its variants (see module lock order)"""
+    db.session.query(Product.id).filter(Product.id == product_id).with_for_update().first()
+
+
+def adjust_product_totals(product_id, delta):
+    """Atomically shift Product.stock/quantity by `delta`, never going below zero"""
+    # quantity is kept aligned with stock for storefront consistency; each column
+    # is derived from its own value so the result does not depend on SET ordering
+    Product.query.filter(Product.id == product_id).update(
+        {
+            Product.stock: case((Product.stock + delta < 0, 0), else_=Product.stock + delta),
+            Product.quantity: case((Product.quantity + delta < 0, 0), else_=Product.quantity + delta),
+        },
+        synchronize_session=False,
+    )
+    _expire_loaded_product_totals(product_id)
+
+
+def reserve_variant(product_id, color, size, quantity=1):
+    """
+    Decrement a variant's stock with a single conditional UPDATE.
+    Returns True when the reservation succeeded, False on insufficient stock
+    or unknown variant.
+    """
+    quantity = int(quantity)
+    if quantity <= 0:
+        return False
+    color, size = variant_key(color, size)
+    _lock_product_row(product_id)
+    updated = ProductVariant.query.filter(
+        ProductVariant.product_id == product_id,
+        ProductVariant.color == color,
+        ProductVariant.size == size,
+        ProductVariant.stock >= quantity,
+    ).update({ProductVariant.stock: ProductVariant.stock - quantity}, synchronize_session=False)
+    if updated != 1:
+        return False
+    _expire_loaded_variants(product_id)
+    adjust_product_totals(product_id, -quantity)
+    apply_snapshot_delta(product_id, color, size, -quantity)
+    return True
+
+
+def release_variant(product_id, color, size, quantity=1):
+    """Atomically add stock back to a variant. Returns False if the variant does not exist."""
+    quantity = int(quantity)
+    if quantity <= 0:
+        return False
+    color, size = variant_key(color, size)
+    _lock_product_row(product_id)
+    updated = ProductVariant.query.filter(
+        ProductVariant.product_id == product_id,
+        ProductVariant.color == color,
+        ProductVariant.size == size,
+    ).update({ProductVariant.stock: ProductVariant.stock + quantity}, synchronize_session=False)
+    if updated != 1:
+        return False
+    _expire_loaded_variants(product_id)
+    adjust_product_totals(product_id, quantity)
+    apply_snapshot_delta(product_id, color, size, quantity)
+    return True
+
+
+def lock_products_for_update(product_ids):
+    """
+    Load and row-lock the given products and all their variants with one
+    SELECT ... FOR UPDATE each. Locks are always taken in id order so
+    concurrent checkouts queue behind each other instead of deadlocking.
+    Returns {product_id: Product} with `variants` populated from the locked rows.
+    """
+    ids = sorted({int(pid) for pid in product_ids})
+    if not ids:
+        return {}
+    products = Product.query.filter(Product.id.in_(ids))\
+        .order_by(Product.id.asc())\
+        .populate_existing()\
+        .with_for_update()\
+        .all()
+    variants = ProductVariant.query.filter(ProductVariant.product_id.in_(ids))\
+        .order_by(ProductVariant.id.asc())\
+        .populate_existing()\
+        .with_for_update()\
+        .all()
+    by_product = defaultdict(list)
+    for variant in variants:
+        by_product[variant.product_id].append(variant)
+    for product in products:
+        set_committed_value(product, "variants", by_product[product.id])
+    return {product.id: product for product in products}
+
+
+def reserve_locked_variant(product, color, size, quantity, snapshot_deltas):
+    """
+    In-memory counterpart of reserve_variant() for a product loaded by
+    lock_products_for_update(): the rows are already locked, so stock is
+    checked and decremented on the loaded objects and written by the next
+    flush. Snapshot deltas are accumulated in `snapshot_deltas` for one
+    batched apply_snapshot_deltas() call. Returns False on insufficient
+    stock or unknown variant.
+    """
+    quantity = int(quantity)
+    if quantity <= 0:
+        return False
+    key = variant_key(color, size)
+    variant = next((v for v in product.variants if variant_key(v.color, v.size) == key), None)
+    if variant is None or (variant.stock or 0) < quantity:
+        return False
+    variant.stock = variant.stock - quantity
+    product.stock = max(0, (product.stock or 0) - quantity)
+    product.quantity = max(0, (product.quantity or 0) - quantity)
+    snapshot_deltas[(product.id, key[0], key[1])] -= quantity
+    return True
+
+
+def variant_counts_from_json(product):
+    """Extract {(color, size): stock} from the product's colors/size JSON columns"""
+    colors = product.load_colors_json()
+    return variant_counts_from_data(colors, None if colors else product.load_sizes_json())
+
+
+def variant_counts_from_data(colors, sizes):
+    """
+    {(color, size): stock} from already parsed colors list / sizes dict, keyed
+    by variant_key(). Raises InvalidVariantError for names longer than the
+    product_variant columns.
+    """
+    counts = {}
+    if colors:
+        for color in colors:
+            if isinstance(color, dict) and variant_key(color.get("name"), "")[0]:
+                for size, count in (color.get("sizeCounts") or {}).items():
+                    _add_variant_count(counts, color["name"], size, count)
+    else:
+        for size, count in (sizes or {}).items():
+            _add_variant_count(counts, "", size, count)
+    return counts
+
+
+def _add_variant_count(counts, color, size, count):
+    key = variant_key(color, size)
+    if len(key[0]) > COLOR_MAX_LENGTH:
+        raise InvalidVariantError(f"Color name '{key[0]}' is longer than {COLOR_MAX_LENGTH} characters")
+    if len(key[1]) > SIZE_MAX_LENGTH:
+        raise InvalidVariantError(f"Size '{key[1]}' is longer than {SIZE_MAX_LENGTH} characters")
+    # First entry wins for names that only differ in whitespace, as in Product.get_color_size_stock
+    if key not in counts:
+        counts[key] = int(count or 0)
+
+
+def sync_product_variants(product):
+    """
+    Make product_variant rows mirror the product's colors/size JSON.
+    Used when admins edit stock explicitly and by the backfill migration.
+    The caller owns the transaction.
+    """
+    counts = variant_counts_from_json(product)
+    existing = {variant_key(v.color, v.size): v for v in product.variants}
+
+    for key, stock in counts.items():
+        variant = existing.pop(key, None)
+        if variant is None:
+            product.variants.append(ProductVariant(color=key[0], size=key[1], stock=stock))
+            continue
+        if (variant.color, variant.size) != key:
+            variant.color, variant.size = key
+        if variant.stock != stock:
+            variant.stock = stock
+
+    # Variants no longer present in the JSON are removed (delete-orphan)
+    for variant in existing.values():
+        product.variants.remove(variant)
+    return len(counts)
@@ -349,35 +349,17 @@ def admin_process_refund(
                 quantity_to_restore = item.quantity_cancel or 0
                 print(f"[REFUND DEBUG] Adding {quantity_to_restore} back to {item.selected_color} {item.selected_size} for product {item.product_id}")
                 from models.product import Product
-                import json
                 product = Product.query.get(item.product_id)
                 if product and hasattr(product, 'colors'):
                     try:
-                        # Parse colors JSON if present
-                        if product.colors and isinstance(product.colors, str):
-                            colors_data = json.loads(product.colors)
-                        else:
-                            colors_data = product.get_colors_data()
-                        
-                        # Find the selected color and add back to its size count
-                        color_found = False
-                        for color_data in colors_data:
-                            if color_data.get('name') == item.selected_color:
-                                color_found = True
-                                if item.selected_size in color_data.get('sizeCounts', {}):
-                                    current_count = color_data['sizeCounts'][item.selected_size]
-                                    color_data['sizeCounts'][item.selected_size] = current_count + quantity_to_restore
-                                    print(f"[REFUND DEBUG] Updated {item.selected_color} {item.selected_size} count: {current_count} -> {color_data['sizeCounts'][item.selected_size]} (restored {quantity_to_restore})")
-                                else:
-                                    print(f"[REFUND DEBUG] Warning: {item.selected_size} not found in {item.selected_color} sizes")
-                                break
-                        
-                        if color_found:
-                            # Update the product's colors column
-                            product.colors = json.dumps(colors_data)
+                        # Atomic restock via product_variant (falls back to colors JSON)
+                        success, message = product.add_color_size_stock(
+                            item.selected_color, item.selected_size, quantity_to_restore
+                        )
+                        if success:
                             print(f"[REFUND DEBUG] Stock updated successfully - restored {quantity_to_restore} units")
                         else:
-                            print(f"[REFUND DEBUG] Color {item.selected_color} not found in product colors")
+                            print(f"[REFUND DEBUG] {message}")
                             
                     except Exception as e:
                         print(f"[REFUND DEBUG] Error updating product stock: {e}")
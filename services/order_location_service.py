@@ -0,0 +1,367 @@
+# services/order_location_service.py
+"""
+Geo aggregation for the customer order locations map.
+
+Each order gets a normalized location_key when it is created (postal code,
+else city/state, else a hash of the raw address). order_location_rollup
+keeps order count / amount / coordinate sums per location for orders in a
+sales status, and order_location_customer keeps per-customer order counts
+for unique customer figures. Both are maintained by the same kind of
+flush hook as the sales rollups (services/sales_rollup_service.py);
+rebuild_order_locations() recomputes them and backfills location_key.
+"""
+import hashlib
+import json
+import math
+import re
+from collections import defaultdict
+from sqlalchemy import event, func, select, union_all, update
+from extensions import db
+from models.order import Order
+from models.customer import Customer
+from models.order_location import OrderLocationRollup, OrderLocationCustomer
+from services.sales_rollup_service import SALES_STATUSES, stored_value
+from utils.db_upsert import upsert_increment
+
+DEFAULT_LOCATION_LIMIT = 200
+MAX_LOCATION_LIMIT = 1000
+DEFAULT_RECENT_ORDERS = 5
+MAX_RECENT_ORDERS = 20
+DEFAULT_CLUSTER_CELL_SIZE = 0.5  # degrees
+REBUILD_BATCH_SIZE = 2000
+
+_PENDING_KEY = "order_location_deltas"
+
+
+def _parse_address(raw):
+    if isinstance(raw, dict):
+        return raw
+    if raw and str(raw).strip().startswith("{"):
+        try:
+            data = json.loads(raw)
+            return data if isinstance(data, dict) else {}
+        except ValueError:
+            return {}
+    return {}
+
+
+def _coordinate(value, limit):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if -limit <= number <= limit and not math.isnan(number) else None
+
+
+def normalize_location(raw_address):
+    """Location key, display fields and optional coordinates for a delivery address"""
+    if not raw_address or not str(raw_address).strip():
+        return None
+    data = _parse_address(raw_address)
+    postal = data.get("postal_code") or data.get("zip_code") or data.get("pincode")
+    postal = re.sub(r"\s+", "", str(postal)).upper()[:20] if postal else None
+    city = str(data.get("city") or "").strip() or None
+    state = str(data.get("state") or "").strip() or None
+
+    if postal:
+        key = f"pin:{postal}"
+    elif city:
+        key = f"city:{city.lower()}|{(state or '').lower()}"[:64]
+    else:
+        text = re.sub(r"\s+", " ", str(raw_address).strip().lower())
+        key = "addr:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:32]
+
+    label_parts = [part for part in (city, state, postal) if part]
+    return {
+        "location_key": key,
+        "address": (", ".join(label_parts) if label_parts else str(raw_address).strip())[:255],
+        "city": city[:100] if city else None,
+        "state": state[:100] if state else None,
+        "postal_code": postal,
+        "lat": _coordinate(data.get("lat", data.get("latitude")), 90),
+        "lng": _coordinate(data.get("lng", data.get("longitude")), 180),
+    }
+
+
+def _new_deltas():
+    return (
+        defaultdict(lambda: {"order_count": 0, "total_amount": 0.0, "lat_sum": 0.0, "lng_sum": 0.0, "geo_count": 0}),
+        defaultdict(int),
+        {},
+    )
+
+
+def _add_contribution(deltas, location, customer_id, amount, sign):
+    location_deltas, customer_deltas, info = deltas
+    key = location["location_key"]
+    delta = location_deltas[key]
+    delta["order_count"] += sign
+    delta["total_amount"] += sign * float(amount or 0)
+    if location["lat"] is not None and location["lng"] is not None:
+        delta["lat_sum"] += sign * location["lat"]
+        delta["lng_sum"] += sign * location["lng"]
+        delta["geo_count"] += sign
+    customer_deltas[(key, customer_id)] += sign
+    info.setdefault(key, location)
+
+
+def _collect_deltas(session):
+    deltas = _new_deltas()
+    for obj in session.new:
+        if isinstance(obj, Order):
+            location = normalize_location(obj.delivery_address)
+            if location and not obj.location_key:
+                obj.location_key = location["location_key"]
+            if location and (obj.status or "pending") in SALES_STATUSES:
+                _add_contribution(deltas, location, obj.customer_id, obj.total_amount, 1)
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Order):
+            continue
+        deleted = obj in session.deleted
+        old_status, old_amount = stored_value(obj, "status"), stored_value(obj, "total_amount")
+        if not deleted and old_status == obj.status and old_amount == obj.total_amount:
+            continue
+        location = normalize_location(obj.delivery_address)
+        if not location:
+            continue
+        # Orders without a stored key predate the backfill and were never counted
+        if obj.location_key and old_status in SALES_STATUSES:
+            _add_contribution(deltas, location, obj.customer_id, old_amount, -1)
+        if not obj.location_key:
+            obj.location_key = location["location_key"]
+        if not deleted and obj.status in SALES_STATUSES:
+            _add_contribution(deltas, location, obj.customer_id, obj.total_amount, 1)
+    return deltas
+
+
+def _apply_deltas(connection, deltas):
+    location_deltas, customer_deltas, info = deltas
+    rollup_table = OrderLocationRollup.__table__
+    customer_table = OrderLocationCustomer.__table__
+    for key, delta in location_deltas.items():
+        if not delta["order_count"] and abs(delta["total_amount"]) < 1e-9:
+            continue
+        location = info[key]
+        upsert_increment(
+            connection, rollup_table, {"location_key": key}, delta,
+            insert_only={name: location[name] for name in ("address", "city", "state", "postal_code")},
+        )
+    for (key, customer_id), count in customer_deltas.items():
+        if count:
+            upsert_increment(
+                connection, customer_table,
+                {"location_key": key, "customer_id": customer_id},
+                {"order_count": count},
+            )
+
+
+@event.listens_for(db.session, "before_flush")
+def _collect_location_deltas(session, flush_context, instances):
+    session.info.pop(_PENDING_KEY, None)
+    with session.no_autoflush:
+        deltas = _collect_deltas(session)
+    if deltas[0]:
+        session.info[_PENDING_KEY] = deltas
+
+
+@event.listens_for(db.session, "after_flush")
+def _write_location_deltas(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _apply_deltas(session.connection(), pending)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_location_deltas(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def apply_order_location_status_change(order_ids, old_status, new_status):
+    """Counterpart of apply_order_status_change() for set-based status UPDATEs"""
+    old_in, new_in = old_status in SALES_STATUSES, new_status in SALES_STATUSES
+    if not order_ids or old_in == new_in:
+        return
+    sign = 1 if new_in else -1
+    deltas = _new_deltas()
+    rows = db.session.query(Order.customer_id, Order.total_amount, Order.delivery_address, Order.location_key)\
+        .filter(Order.id.in_(order_ids)).all()
+    for customer_id, amount, raw_address, location_key in rows:
+        location = normalize_location(raw_address)
+        if location and location_key:
+            _add_contribution(deltas, location, customer_id, amount, sign)
+    _apply_deltas(db.session.connection(), deltas)
+
+
+def rebuild_order_locations(batch_size=REBUILD_BATCH_SIZE):
+    """Backfill Order.location_key and recompute both location tables"""
+    try:
+        deltas = _new_deltas()
+        last_id = 0
+        processed = 0
+        while True:
+            rows = db.session.query(
+                Order.id, Order.customer_id, Order.status, Order.total_amount,
+                Order.delivery_address, Order.location_key, Order.updated_at,
+            ).filter(Order.id > last_id).order_by(Order.id.asc()).limit(batch_size).all()
+            if not rows:
+                break
+            key_updates = []
+            for order_id, customer_id, status, amount, raw_address, location_key, updated_at in rows:
+                location = normalize_location(raw_address)
+                if not location:
+                    continue
+                if location_key != location["location_key"]:
+                    # Pass updated_at through so its onupdate does not restamp historical orders
+                    key_updates.append({"id": order_id, "location_key": location["location_key"],
+                                        "updated_at": updated_at})
+                if status in SALES_STATUSES:
+                    _add_contribution(deltas, location, customer_id, amount, 1)
+            if key_updates:
+                # Bulk UPDATE by primary key; does not go through the flush hooks
+                db.session.execute(update(Order), key_updates)
+                db.session.commit()
+            processed += len(rows)
+            last_id = rows[-1][0]
+
+        OrderLocationRollup.query.delete(synchronize_session=False)
+        OrderLocationCustomer.query.delete(synchronize_session=False)
+        _apply_deltas(db.session.connection(), deltas)
+        db.session.commit()
+        print(f"[ORDER LOCATIONS] Rebuilt {len(deltas[0])} locations from {processed} orders")
+        return processed
+    except Exception as e:
+        print(f"[ORDER LOCATIONS] Rebuild failed: {str(e)}")
+        db.session.rollback()
+        raise
+
+
+def _recent_orders_by_location(location_keys, per_location):
+    """Latest orders per location in one round trip (UNION ALL of index-backed LIMIT queries)"""
+    if not location_keys or per_location <= 0:
+        return {}
+    customer_name = func.coalesce(Customer.name, Customer.username)
+    selects = []
+    for key in location_keys:
+        limited = select(
+            Order.location_key,
+            Order.id,
+            Order.order_number,
+            customer_name.label("customer_name"),
+            Order.total_amount,
+            Order.status,
+            Order.created_at,
+        ).outerjoin(Customer, Customer.id == Order.customer_id)\
+            .where(Order.location_key == key, Order.status.in_(SALES_STATUSES))\
+            .order_by(Order.id.desc())\
+            .limit(per_location)\
+            .subquery()
+        selects.append(select(limited))
+
+    recent = defaultdict(list)
+    for row in db.session.execute(union_all(*selects)):
+        recent[row.location_key].append({
+            "order_id": row.id,
+            "order_number": row.order_number,
+            "customer_name": row.customer_name or "Unknown",
+            "total_amount": row.total_amount,
+            "status": row.status,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        })
+    return recent
+
+
+def _grid_clusters(cell_size):
+    rows = db.session.query(
+        OrderLocationRollup.lat_sum,
+        OrderLocationRollup.lng_sum,
+        OrderLocationRollup.geo_count,
+        OrderLocationRollup.order_count,
+        OrderLocationRollup.total_amount,
+    ).filter(OrderLocationRollup.geo_count > 0, OrderLocationRollup.order_count > 0).all()
+
+    cells = {}
+    for lat_sum, lng_sum, geo_count, order_count, total_amount in rows:
+        lat, lng = lat_sum / geo_count, lng_sum / geo_count
+        cell_key = (math.floor(lat / cell_size), math.floor(lng / cell_size))
+        cell = cells.setdefault(cell_key, {"lat_sum": 0.0, "lng_sum": 0.0, "geo_count": 0,
+                                           "order_count": 0, "total_amount": 0.0, "locations": 0})
+        cell["lat_sum"] += lat_sum
+        cell["lng_sum"] += lng_sum
+        cell["geo_count"] += geo_count
+        cell["order_count"] += order_count
+        cell["total_amount"] += total_amount
+        cell["locations"] += 1
+
+    clusters = [
+        {
+            "lat": round(cell["lat_sum"] / cell["geo_count"], 6),
+            "lng": round(cell["lng_sum"] / cell["geo_count"], 6),
+            "order_count": cell["order_count"],
+            "total_amount": round(cell["total_amount"], 2),
+            "locations": cell["locations"],
+        }
+        for cell in cells.values()
+    ]
+    clusters.sort(key=lambda c: c["order_count"], reverse=True)
+    return clusters
+
+
+def get_order_locations(limit=DEFAULT_LOCATION_LIMIT, recent=DEFAULT_RECENT_ORDERS, cluster=None,
+                        cell_size=DEFAULT_CLUSTER_CELL_SIZE):
+    """Top locations by order count with recent orders, plus optional grid clusters"""
+    limit = max(1, min(int(limit), MAX_LOCATION_LIMIT))
+    recent = max(0, min(int(recent), MAX_RECENT_ORDERS))
+    if cluster not in (None, "grid"):
+        raise ValueError("cluster must be 'grid'")
+    if cluster and not (0 < float(cell_size) <= 45):
+        raise ValueError("cell_size must be between 0 and 45 degrees")
+
+    active = OrderLocationRollup.order_count > 0
+    total_locations, total_orders, total_amount = db.session.query(
+        func.count(OrderLocationRollup.location_key),
+        func.sum(OrderLocationRollup.order_count),
+        func.sum(OrderLocationRollup.total_amount),
+    ).filter(active).one()
+
+    locations = OrderLocationRollup.query.filter(active)\
+        .order_by(OrderLocationRollup.order_count.desc(), OrderLocationRollup.location_key.asc())\
+        .limit(limit).all()
+    keys = [loc.location_key for loc in locations]
+
+    unique_customers = dict(db.session.query(
+        OrderLocationCustomer.location_key, func.count(OrderLocationCustomer.customer_id)
+    ).filter(
+        OrderLocationCustomer.location_key.in_(keys),
+        OrderLocationCustomer.order_count > 0,
+    ).group_by(OrderLocationCustomer.location_key).all()) if keys else {}
+
+    recent_orders = _recent_orders_by_location(keys, recent)
+
+    locations_data = []
+    for loc in locations:
+        lat, lng = loc.centroid()
+        locations_data.append({
+            "location_key": loc.location_key,
+            "address": loc.address,
+            "city": loc.city,
+            "state": loc.state,
+            "postal_code": loc.postal_code,
+            "lat": round(lat, 6) if lat is not None else None,
+            "lng": round(lng, 6) if lng is not None else None,
+            "order_count": loc.order_count,
+            "total_amount": round(loc.total_amount, 2),
+            "unique_customers": int(unique_customers.get(loc.location_key, 0)),
+            "recent_orders": recent_orders.get(loc.location_key, []),
+        })
+
+    analytics_data = {
+        "total_locations": int(total_locations or 0),
+        "total_orders": int(total_orders or 0),
+        "total_amount": round(float(total_amount or 0), 2),
+        "locations": locations_data,
+    }
+    if cluster == "grid":
+        analytics_data["cell_size"] = float(cell_size)
+        analytics_data["clusters"] = _grid_clusters(float(cell_size))
+    return analytics_data
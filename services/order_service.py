@@ -6,8 +6,24 @@ from models.coupons import Coupon
 from models.transaction import Transaction
 from extensions import db
 from utils.crypto import encrypt_payload, decrypt_payload
+from services.inventory_service import lock_products_for_update, reserve_locked_variant
+from services.stock_snapshot_service import apply_snapshot_deltas
+from services.sales_rollup_service import apply_items_inserted
+from services.order_state_machine import FINAL_ITEM_STATUSES, item_status_values, update_items_of_orders
+from sqlalchemy import func, insert
+from sqlalchemy.orm import joinedload, selectinload
+from collections import defaultdict
 from datetime import datetime, timedelta
+import base64
 import json
+import uuid
+
+CUSTOMER_ORDERS_DEFAULT_LIMIT = 20
+CUSTOMER_ORDERS_MAX_LIMIT = 50
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a cart line cannot be reserved from product_variant stock"""
 
 def increment_coupon_usage(coupon_id: int):
     """Increment the usage count for a coupon"""
@@ -59,7 +75,9 @@ def create_order(customer_id: int, order_data: dict):
         # Create order
         order = Order(
             customer_id=customer_id,
-            order_number="",  # Will be generated after commit
+            # Unique placeholder until the id-based number is generated, so
+            # concurrent checkouts never collide on the unique index
+            order_number=f"TMP{uuid.uuid4().hex}",
             status="pending",
             delivery_address=json.dumps(delivery_address),
             delivery_type=delivery_type,  # Fixed: use delivery_type
@@ -92,6 +110,11 @@ def create_order(customer_id: int, order_data: dict):
                 print(f"[ORDER SERVICE] Invalid scheduled_time format: {scheduled_time}")
                 order.estimated_delivery = datetime.utcnow() + timedelta(days=1)
         
+        # Lock every product (and its variants) in the cart up front, in id order
+        products = lock_products_for_update(
+            item_data["product_id"] for item_data in items if item_data.get("product_id")
+        )
+
         print(f"[ORDER SERVICE] Creating order object...")
         db.session.add(order)
         db.session.flush()  # Get the order ID
@@ -100,95 +123,77 @@ def create_order(customer_id: int, order_data: dict):
         order.order_number = order.generate_order_number()
         print(f"[ORDER SERVICE] Order created with ID: {order.id}, Number: {order.order_number}")
         
-        # Create order items
+        # Reserve stock in memory on the locked rows and build the item rows
         print(f"[ORDER SERVICE] Creating {len(items)} order items...")
-        item_sizes_log = []
+        item_rows = []
+        snapshot_deltas = defaultdict(int)
+        now = datetime.utcnow()
         for item_data in items:
-            product = Product.query.get(item_data["product_id"])
+            product = products.get(int(item_data["product_id"])) if item_data.get("product_id") else None
             if not product:
-                print(f"[ORDER SERVICE] Product {item_data['product_id']} not found, skipping")
+                print(f"[ORDER SERVICE] Product {item_data.get('product_id')} not found, skipping")
                 continue
             
-            # Debug: Show what size and color data we're receiving (reduced logging)
-            print(f"[ORDER SERVICE] Size from frontend: {item_data.get('size')}")
-            print(f"[ORDER SERVICE] Color from frontend: {item_data.get('color')}")
-            
-            # Use new colors column structure for inventory management
             chosen_size = item_data.get("size")
             chosen_color = item_data.get("color")
+            quantity = int(item_data.get("quantity", 1))
             
-            if chosen_size and chosen_color:
-                print(f"[ORDER SERVICE] Processing size: {chosen_size} for color: {chosen_color}")
-                try:
-                    # Parse colors JSON if present
-                    if product.colors and isinstance(product.colors, str):
-                        colors_data = json.loads(product.colors)
-                    else:
-                        colors_data = product.get_colors_data()
-                    
-                    # Find the selected color and update its size count
-                    color_found = False
-                    for color_data in colors_data:
-                        if color_data.get('name') == chosen_color:
-                            color_found = True
-                            if chosen_size in color_data.get('sizeCounts', {}):
-                                current_count = color_data['sizeCounts'][chosen_size]
-                                if current_count > 0:
-                                    color_data['sizeCounts'][chosen_size] = max(0, current_count - int(item_data.get("quantity", 1)))
-                                    print(f"[ORDER SERVICE] Updated {chosen_color} {chosen_size} count: {current_count} -> {color_data['sizeCounts'][chosen_size]}")
-                                else:
-                                    print(f"[ORDER SERVICE] Warning: {chosen_color} {chosen_size} has no stock")
-                            break
-                    
-                    if color_found:
-                        # Update the product's colors column
-                        product.colors = json.dumps(colors_data)
-                    else:
-                        print(f"[ORDER SERVICE] Warning: Color {chosen_color} not found in product colors")
-                        
-                except Exception as e:
-                    print(f"[ORDER SERVICE] Failed updating colors data for product {product.id}: {e}")
+            if chosen_size and product.variants:
+                if not reserve_locked_variant(product, chosen_color, chosen_size, quantity, snapshot_deltas):
+                    raise InsufficientStockError(
+                        f"Insufficient stock for {product.pname} ({chosen_color or '-'} / {chosen_size})"
+                    )
             else:
-                print(f"[ORDER SERVICE] No size or color provided for this item")
-            
-            # Deduct total stock (fallback or along with size)
-            try:
-                product.stock = max(0, int(product.stock or 0) - int(item_data.get("quantity", 1)))
-                # Keep quantity aligned to stock for storefront consistency
-                product.quantity = product.stock
-            except Exception as e:
-                print(f"[ORDER SERVICE] Failed updating stock for product {product.id}: {e}")
+                # Products not yet backfilled into product_variant (or ordered without a size)
+                if chosen_size and chosen_color:
+                    success, message = product.reserve_color_size(chosen_color, chosen_size, quantity)
+                    if not success:
+                        print(f"[ORDER SERVICE] Warning: {message}")
+                else:
+                    print(f"[ORDER SERVICE] No size or color provided for this item")
+                product.stock = max(0, (product.stock or 0) - quantity)
+                product.quantity = max(0, (product.quantity or 0) - quantity)
 
-            print(f"[ORDER SERVICE] Creating OrderItem with size: {chosen_size}, color: {chosen_color}")
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                quantity=item_data["quantity"],
-                unit_price=item_data["price"],
-                total_price=item_data["price"] * item_data["quantity"],
-                product_name=product.pname,
-                product_image=product.image,
-                selected_size=chosen_size,  # Add the selected size
-                selected_color=chosen_color  # Add the selected color
-            )
-            db.session.add(order_item)
+            item_rows.append({
+                "order_id": order.id,
+                "product_id": product.id,
+                "quantity": item_data["quantity"],
+                "unit_price": item_data["price"],
+                "total_price": item_data["price"] * item_data["quantity"],
+                "unit_cost": float(product.actual_price or 0),
+                "product_name": product.pname,
+                "product_image": product.image,
+                "selected_size": chosen_size,
+                "selected_color": chosen_color,
+                "status": "pending",
+                "quantity_cancel": 0,
+                "return_delivery_status": "not_applicable",
+                "payment_return_delivery": 0.0,
+                "refund_status": "not_applicable",
+                "refund_amount": 0.0,
+                "exchange_status": "not_applicable",
+                "created_at": now,
+                "updated_at": now,
+            })
             print(f"[ORDER SERVICE] Added order item: {product.pname} x {item_data['quantity']} with size: {chosen_size}, color: {chosen_color}")
-            # Log size chosen for refund/exchange tracking
-            try:
-                chosen_size = item_data.get("size")
-                if chosen_size:
-                    # Ensure we have an ID
-                    db.session.flush()
-                    item_sizes_log.append({
-                        "order_item_id": order_item.id,
-                        "product_id": product.id,
-                        "size": chosen_size,
-                        "quantity": int(item_data.get("quantity", 1))
-                    })
-            except Exception as e:
-                print(f"[ORDER SERVICE] Failed to log item size: {e}")
-        # Commit item-level deductions and attach sizes log to delivery_notes
-        db.session.flush()
+
+        # One INSERT for all items; Core inserts skip the rollup flush hook
+        if item_rows:
+            db.session.execute(insert(OrderItem.__table__), item_rows)
+            apply_items_inserted(order, item_rows)
+        apply_snapshot_deltas(snapshot_deltas)
+        order_items = order.order_items.order_by(OrderItem.id.asc()).all()
+
+        # Log sizes chosen for refund/exchange tracking in delivery_notes
+        item_sizes_log = [
+            {
+                "order_item_id": order_item.id,
+                "product_id": order_item.product_id,
+                "size": order_item.selected_size,
+                "quantity": int(order_item.quantity or 1)
+            }
+            for order_item in order_items if order_item.selected_size
+        ]
         try:
             notes = {}
             if order.delivery_notes:
@@ -202,49 +207,47 @@ def create_order(customer_id: int, order_data: dict):
         except Exception as e:
             print(f"[ORDER SERVICE] Failed to save item sizes log: {e}")
         
-        # Increment coupon usage count if coupon was applied (before commit)
+        # Increment coupon usage count if coupon was applied (same transaction)
         if coupon_id:
-            print(f"[ORDER SERVICE] Incrementing usage count for coupon {coupon_id}")
-            coupon = Coupon.query.get(coupon_id)
-            if coupon:
-                coupon.used_count += 1
-                print(f"[ORDER SERVICE] Incremented usage count for coupon {coupon.code} to {coupon.used_count}")
+            updated = Coupon.query.filter_by(id=coupon_id).update(
+                {Coupon.used_count: func.coalesce(Coupon.used_count, 0) + 1},
+                synchronize_session=False,
+            )
+            if updated:
+                print(f"[ORDER SERVICE] Incremented usage count for coupon {coupon_id}")
             else:
                 print(f"[ORDER SERVICE] Warning: Coupon {coupon_id} not found")
         
+        # Ledger entry for the order payment, committed together with the order
+        Transaction.create_transaction(
+            customer_id=customer_id,
+            transaction_type="order_payment",
+            amount=total_amount,
+            description=f"Order payment for Order #{order.order_number}",
+            reference_id=str(order.id),
+            reference_type="order",
+            payment_method=payment_method,
+            metadata={
+                "order_id": order.id,
+                "order_number": order.order_number,
+                "subtotal": subtotal,
+                "delivery_fee": delivery_fee,
+                "platform_fee": platform_fee,
+                "discount_amount": discount_amount,
+                "total_amount": total_amount,
+                "item_count": len(items),
+                "coupon_id": coupon_id
+            },
+            commit=False
+        )
+        
         print(f"[ORDER SERVICE] Committing to database...")
         db.session.commit()
         print(f"[ORDER SERVICE] Order committed successfully")
         
-        # Create transaction record for order payment
-        try:
-            Transaction.create_transaction(
-                customer_id=customer_id,
-                transaction_type="order_payment",
-                amount=total_amount,
-                description=f"Order payment for Order #{order.order_number}",
-                reference_id=str(order.id),
-                reference_type="order",
-                payment_method=payment_method,
-                metadata={
-                    "order_id": order.id,
-                    "order_number": order.order_number,
-                    "subtotal": subtotal,
-                    "delivery_fee": delivery_fee,
-                    "platform_fee": platform_fee,
-                    "discount_amount": discount_amount,
-                    "total_amount": total_amount,
-                    "item_count": len(items),
-                    "coupon_id": coupon_id
-                }
-            )
-            print(f"[ORDER SERVICE] Transaction logged for order {order.id}")
-        except Exception as e:
-            print(f"[ORDER SERVICE] Warning: Failed to log transaction: {str(e)}")
-        
-        # Get complete order data
+        # Get complete order data (one query reloads the items expired by the commit)
         order_data = order.as_dict()
-        order_data["items"] = [item.as_dict() for item in order.order_items]
+        order_data["items"] = [item.as_dict() for item in order.order_items.order_by(OrderItem.id.asc())]
         
         print(f"[ORDER SERVICE] Final order data: {order_data}")
         
@@ -263,6 +266,10 @@ def create_order(customer_id: int, order_data: dict):
             "message": "Order created successfully"
         }, 201
         
+    except InsufficientStockError as e:
+        print(f"❌ Create order rejected: {str(e)}")
+        db.session.rollback()
+        return {"error": str(e)}, 409
     except Exception as e:
         print(f"❌ Create order error: {str(e)}")
         db.session.rollback()
@@ -300,57 +307,93 @@ def get_order_by_id(order_id: int, customer_id: int = None):
         print(f"❌ Get order error: {str(e)}")
         return {"error": "Failed to retrieve order"}, 500
 
-def get_customer_orders(customer_id: int, limit: int = 20):
-    """Get all orders for a customer"""
+def encode_order_cursor(order):
+    """Opaque keyset cursor pointing just after `order` in a newest-first history"""
+    raw = json.dumps({"id": order.id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+def decode_order_cursor(cursor):
+    """Decode a cursor produced by encode_order_cursor; returns the last seen order id"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _product_sizes_by_id(product_ids):
+    """{product_id: (pname, size JSON)} for the given products in one query"""
+    if not product_ids:
+        return {}
+    rows = db.session.query(Product.id, Product.pname, Product.size)\
+        .filter(Product.id.in_(product_ids)).all()
+    return {product_id: (pname, size) for product_id, pname, size in rows}
+
+def _item_product_summary(item, products):
+    """Product id / name / sizes attached to each history item"""
+    pname, size = products.get(item.product_id, (None, None))
+    if pname is not None and size:
+        try:
+            return {
+                'id': item.product_id,
+                'pname': pname,
+                'sizes': json.loads(size) if isinstance(size, str) else size
+            }
+        except Exception as e:
+            print(f"[ORDER SERVICE] Error parsing product sizes: {e}")
+            return {'id': item.product_id, 'pname': pname, 'sizes': {}}
+    return {'id': item.product_id, 'pname': item.product_name, 'sizes': {}}
+
+def get_customer_orders(customer_id: int, limit: int = CUSTOMER_ORDERS_DEFAULT_LIMIT, after: str = None, status: str = None):
+    """
+    Customer order history, newest first, keyset-paginated by `after`
+    (the next_cursor of the previous page) and optionally filtered by status.
+    Runs three queries: orders (+ coupon), their items, their products.
+    """
+    # Only a bad cursor is the client's fault; anything raised below is a server error
     try:
-        orders = Order.query.filter_by(customer_id=customer_id)\
+        after_id = decode_order_cursor(after) if after else None
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    try:
+        limit = max(1, min(int(limit or CUSTOMER_ORDERS_DEFAULT_LIMIT), CUSTOMER_ORDERS_MAX_LIMIT))
+        query = Order.query.filter(Order.customer_id == customer_id)
+        if after_id is not None:
+            query = query.filter(Order.id < after_id)
+        if status:
+            statuses = [s.strip() for s in status.split(",") if s.strip()]
+            query = query.filter(Order.status.in_(statuses))
+
+        # One extra row tells whether another page exists
+        orders = query.options(joinedload(Order.coupon), selectinload(Order.items))\
             .order_by(Order.id.desc())\
-            .limit(limit)\
+            .limit(limit + 1)\
             .all()
-        
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+
+        products = _product_sizes_by_id({item.product_id for order in orders for item in order.items})
+
         orders_data = []
         for order in orders:
             order_data = order.as_dict()
-            
-            # Get order items with product data including sizes
             order_items = []
-            for item in order.order_items:
+            for item in order.items:
                 item_dict = item.as_dict()
-                
-                # Get the product to access sizes
-                product = Product.query.get(item.product_id)
-                if product and product.size:
-                    try:
-                        import json
-                        item_dict['product'] = {
-                            'id': product.id,
-                            'pname': product.pname,
-                            'sizes': json.loads(product.size) if isinstance(product.size, str) else product.size
-                        }
-                    except Exception as e:
-                        print(f"[ORDER SERVICE] Error parsing product sizes: {e}")
-                        item_dict['product'] = {
-                            'id': product.id,
-                            'pname': product.pname,
-                            'sizes': {}
-                        }
-                else:
-                    item_dict['product'] = {
-                        'id': item.product_id,
-                        'pname': item.product_name,
-                        'sizes': {}
-                    }
-                
+                item_dict['product'] = _item_product_summary(item, products)
                 order_items.append(item_dict)
-            
             order_data["items"] = order_items
             orders_data.append(order_data)
-        
+
+        next_cursor = encode_order_cursor(orders[-1]) if has_more and orders else None
+
         # Encrypt the response data
         encrypted_data = encrypt_payload({
             "success": True,
             "orders": orders_data,
-            "total_count": len(orders_data)
+            "total_count": len(orders_data),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         })
         
         return {
@@ -392,58 +435,8 @@ def update_order_status(order_id: int, status: str, customer_id: int = None):
         if status == "delivered" and order.payment_method == "cod":
             order.payment_status = "completed"
         
-        # Automatically update all order items with the new status
-        order_items = OrderItem.query.filter_by(order_id=order_id).all()
-        updated_items_count = 0
-        
-        if order_items:
-            print(f"🔄 [ORDER SERVICE] Found {len(order_items)} order items to update")
-            
-            for item in order_items:
-                # Skip items that are already cancelled or have specific statuses
-                if item.status in ["cancelled", "refunded"]:
-                    print(f"🔄 [ORDER SERVICE] Skipping item {item.id} (status: {item.status})")
-                    continue
-                
-                # Update item status
-                old_item_status = item.status
-                item.status = status
-                item.updated_at = datetime.utcnow()
-                
-                # Log the status change
-                print(f"🔄 [ORDER SERVICE] Updated item {item.id} status from '{old_item_status}' to '{status}'")
-                updated_items_count += 1
-                
-                # Handle special cases for specific statuses
-                if status == "cancelled":
-                    # Mark item as cancelled and add cancellation timestamp
-                    item.cancelled_at = datetime.utcnow()
-                    item.cancelled_by = "admin"  # or get from admin context
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as cancelled")
-                
-                elif status == "delivered":
-                    # Mark item as delivered
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as delivered")
-                
-                elif status == "shipped":
-                    # Mark item as shipped
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as shipped")
-                
-                elif status == "out_for_delivery":
-                    # Mark item as out for delivery
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as out for delivery")
-                
-                elif status == "processing":
-                    # Mark item as processing
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as processing")
-                
-                elif status == "confirmed":
-                    # Mark item as confirmed
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as confirmed")
-                
-                elif status == "pending":
-                    # Mark item as pending
-                    print(f"🔄 [ORDER SERVICE] Item {item.id} marked as pending")
+        # Automatically move all non-final order items with one set-based UPDATE
+        updated_items_count = update_items_of_orders([order_id], status)
         
         print(f"🔄 [ORDER SERVICE] Successfully updated {updated_items_count} order items")
         
@@ -489,53 +482,36 @@ def update_order_items_status(order_id: int, status: str, item_ids: list = None)
         
         print(f"🔄 [ORDER SERVICE] Updating order items status for order {order_id} to '{status}'")
         
-        # Query order items
+        # Read only what the response needs, then update with one statement
+        query = db.session.query(OrderItem.id, OrderItem.status, OrderItem.product_name)\
+            .filter(OrderItem.order_id == order_id)
         if item_ids:
-            # Update specific items
-            order_items = OrderItem.query.filter(
-                OrderItem.order_id == order_id,
-                OrderItem.id.in_(item_ids)
-            ).all()
-            print(f"🔄 [ORDER SERVICE] Updating {len(order_items)} specific order items")
-        else:
-            # Update all items
-            order_items = OrderItem.query.filter_by(order_id=order_id).all()
-            print(f"🔄 [ORDER SERVICE] Updating all {len(order_items)} order items")
+            query = query.filter(OrderItem.id.in_(item_ids))
+        order_items = query.all()
+        print(f"🔄 [ORDER SERVICE] Updating {len(order_items)} order items")
         
         updated_items = []
         skipped_items = []
         
-        for item in order_items:
+        for item_id, old_status, product_name in order_items:
             # Skip items that shouldn't be updated
-            if item.status in ["cancelled", "refunded"] and status not in ["cancelled", "refunded"]:
+            if old_status in FINAL_ITEM_STATUSES and status not in FINAL_ITEM_STATUSES:
                 skipped_items.append({
-                    "id": item.id,
-                    "reason": f"Item already {item.status}"
+                    "id": item_id,
+                    "reason": f"Item already {old_status}"
                 })
                 continue
-            
-            # Update item status
-            old_status = item.status
-            item.status = status
-            item.updated_at = datetime.utcnow()
-            
-            # Handle special cases
-            if status == "cancelled":
-                item.cancelled_at = datetime.utcnow()
-                item.cancelled_by = "admin"
-            elif status == "delivered":
-                item.delivered_at = datetime.utcnow()
-            elif status == "shipped":
-                item.shipped_at = datetime.utcnow()
-            
             updated_items.append({
-                "id": item.id,
+                "id": item_id,
                 "old_status": old_status,
                 "new_status": status,
-                "product_name": item.product_name
+                "product_name": product_name
             })
-            
-            print(f"🔄 [ORDER SERVICE] Updated item {item.id} ({item.product_name}) from '{old_status}' to '{status}'")
+        
+        if updated_items:
+            OrderItem.query.filter(
+                OrderItem.id.in_([item["id"] for item in updated_items])
+            ).update(item_status_values(status, datetime.utcnow()), synchronize_session=False)
         
         # Commit changes
         db.session.commit()
@@ -713,7 +689,12 @@ def cancel_order(order_id: int, customer_id: int = None):
 def get_all_orders():
     """Get all orders for admin panel"""
     try:
-        orders = Order.query.order_by(Order.id.desc()).all()
+        # Batch the relations the admin list serializes instead of loading them per order
+        orders = Order.query.options(
+            joinedload(Order.coupon),
+            selectinload(Order.customer),
+            selectinload(Order.items)
+        ).order_by(Order.id.desc()).all()
         return orders
     except Exception as e:
         print(f"❌ Get all orders error: {str(e)}")
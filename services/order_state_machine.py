@@ -0,0 +1,136 @@
+# services/order_state_machine.py
+"""
+Order status transitions and set-based status updates.
+
+ORDER_TRANSITIONS lists, for every order status, the statuses an admin may
+move it to. bulk_update_order_status() applies one target status to many
+orders with a handful of statements: it locks the orders (in id order),
+groups them by current status and issues one guarded
+UPDATE ... WHERE id IN (...) AND status = <from> per group for orders and
+their items. The sales and location rollups are moved with their
+set-based counterparts, since these UPDATEs skip the flush hooks.
+"""
+from datetime import datetime
+from extensions import db
+from models.order import Order, OrderItem
+from services.sales_rollup_service import apply_order_status_change
+from services.order_location_service import apply_order_location_status_change
+
+ORDER_TRANSITIONS = {
+    "pending": ("confirmed", "processing", "cancelled", "rejected"),
+    "confirmed": ("processing", "shipped", "cancelled", "rejected"),
+    "approved": ("processing", "shipped", "cancelled", "rejected"),
+    "assigned": ("processing", "shipped", "out_for_delivery", "cancelled", "rejected"),
+    "processing": ("shipped", "out_for_delivery", "cancelled"),
+    "shipped": ("out_for_delivery", "delivered"),
+    "picked_up": ("out_for_delivery", "delivered"),
+    "out_for_delivery": ("delivered",),
+    "rejected": ("cancelled",),
+    "delivered": (),
+    "cancelled": (),
+    "refund_initiated": (),
+    "refunded": (),
+}
+
+# Cancelling restocks and refunds, which cancel_order() handles per order
+BULK_STATUS_TARGETS = ("confirmed", "processing", "shipped", "out_for_delivery", "delivered", "rejected")
+BULK_STATUS_MAX_ORDERS = 1000
+
+# Items in these states keep their status when their order moves
+FINAL_ITEM_STATUSES = ("cancelled", "refunded")
+
+
+def allowed_from(target):
+    """Order statuses that may transition to `target`"""
+    return tuple(status for status, targets in ORDER_TRANSITIONS.items() if target in targets)
+
+
+def can_transition(current, target):
+    return target in ORDER_TRANSITIONS.get(current, ())
+
+
+def item_status_values(status, now):
+    """Column values for items moved to `status` (cancellations are stamped as admin)"""
+    values = {OrderItem.status: status, OrderItem.updated_at: now}
+    if status == "cancelled":
+        values[OrderItem.cancelled_at] = now
+        values[OrderItem.cancelled_by] = "admin"
+    return values
+
+
+def update_items_of_orders(order_ids, status, now=None):
+    """Move every non-final item of the given orders to `status` in one UPDATE; returns rows changed"""
+    if not order_ids:
+        return 0
+    return OrderItem.query.filter(
+        OrderItem.order_id.in_(order_ids),
+        ~OrderItem.status.in_(FINAL_ITEM_STATUSES),
+    ).update(item_status_values(status, now or datetime.utcnow()), synchronize_session=False)
+
+
+def bulk_update_order_status(order_ids, target):
+    """
+    Move `order_ids` to `target` where the transition table allows it.
+    Returns {order_id: outcome} with outcome["result"] one of updated,
+    unchanged, not_found or invalid_transition. The caller commits.
+    """
+    if target not in BULK_STATUS_TARGETS:
+        raise ValueError(f"status must be one of: {', '.join(BULK_STATUS_TARGETS)}")
+    try:
+        order_ids = sorted({int(order_id) for order_id in order_ids})
+    except (TypeError, ValueError):
+        raise ValueError("order_ids must be a list of integers")
+    if not order_ids:
+        raise ValueError("order_ids is required")
+    if len(order_ids) > BULK_STATUS_MAX_ORDERS:
+        raise ValueError(f"At most {BULK_STATUS_MAX_ORDERS} orders can be updated at once")
+
+    # Lock in id order so concurrent bulk actions and checkouts cannot deadlock
+    current = dict(
+        db.session.query(Order.id, Order.status)
+        .filter(Order.id.in_(order_ids))
+        .order_by(Order.id.asc())
+        .with_for_update()
+        .all()
+    )
+
+    outcomes = {}
+    groups = {}
+    sources = set(allowed_from(target))
+    for order_id in order_ids:
+        status = current.get(order_id)
+        if status is None:
+            outcomes[order_id] = {"result": "not_found"}
+        elif status == target:
+            outcomes[order_id] = {"result": "unchanged", "status": status}
+        elif status not in sources:
+            outcomes[order_id] = {"result": "invalid_transition", "status": status,
+                                  "allowed_targets": list(ORDER_TRANSITIONS.get(status, ()))}
+        else:
+            groups.setdefault(status, []).append(order_id)
+
+    now = datetime.utcnow()
+    for old_status, ids in groups.items():
+        updated = Order.query.filter(Order.id.in_(ids), Order.status == old_status).update(
+            {Order.status: target, Order.updated_at: now}, synchronize_session=False
+        )
+        if updated != len(ids):
+            # Rows are locked above, so this only happens if the lock was not honoured
+            raise RuntimeError(f"Order status changed concurrently ({updated}/{len(ids)} updated)")
+        if target == "delivered":
+            Order.query.filter(Order.id.in_(ids), Order.payment_method == "cod").update(
+                {Order.payment_status: "completed"}, synchronize_session=False
+            )
+        items_updated = update_items_of_orders(ids, target, now)
+        apply_order_status_change(ids, old_status, target)
+        apply_order_location_status_change(ids, old_status, target)
+        for order_id in ids:
+            outcomes[order_id] = {"result": "updated", "old_status": old_status, "new_status": target}
+        print(f"🔄 [ORDER STATE] {len(ids)} orders {old_status} -> {target} ({items_updated} items)")
+
+    # Objects already in the session still hold the old values
+    moved = {order_id for ids in groups.values() for order_id in ids}
+    for obj in list(db.session.identity_map.values()):
+        if (isinstance(obj, Order) and obj.id in moved) or (isinstance(obj, OrderItem) and obj.order_id in moved):
+            db.session.expire(obj)
+    return outcomes
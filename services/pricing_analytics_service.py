@@ -0,0 +1,171 @@
+# services/pricing_analytics_service.py
+"""
+Pricing analytics for the admin dashboard computed over column arrays.
+
+Listed products are fetched as plain tuples with a single Core select (no ORM
+objects, no JSON parsing) and every derived figure is a NumPy vector
+operation, so cost grows with the row fetch rather than per-product Python.
+"""
+import numpy as np
+from sqlalchemy import func, select
+from extensions import db
+from models.product import Product
+from models.category import Category
+from models.subcategory import SubCategory
+from models.product_stock_snapshot import ProductStockSnapshot
+
+PERCENTILES = (10, 25, 50, 75, 90)
+GROUP_BY_COLUMNS = {"category": "cid", "subcategory": "sid"}
+
+
+def _load_pricing_columns():
+    # Stock: snapshot total when the product has variant rows, else Product.stock
+    snapshot_totals = select(
+        ProductStockSnapshot.product_id.label("product_id"),
+        func.sum(ProductStockSnapshot.count).label("total"),
+    ).group_by(ProductStockSnapshot.product_id).subquery()
+
+    stmt = select(
+        Product.id,
+        Product.pname,
+        Product.cid,
+        Product.sid,
+        func.coalesce(Product.price, 0.0),
+        func.coalesce(Product.actual_price, 0.0),
+        func.coalesce(Product.discount_value, 0.0),
+        func.coalesce(func.nullif(snapshot_totals.c.total, 0), Product.stock, 0),
+    ).outerjoin(
+        snapshot_totals, snapshot_totals.c.product_id == Product.id
+    ).where(
+        Product.is_active == True,
+        Product.visibility == True,
+    ).order_by(Product.id.asc())
+    # Executed on the connection so rows skip the ORM loading layer
+    return db.session.connection().execute(stmt).all()
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def _group_summary(keys, price, actual, discount_amount, final, profit, names):
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse)
+    sums = {
+        "total_original_price": np.bincount(inverse, weights=price),
+        "total_actual_price": np.bincount(inverse, weights=actual),
+        "total_discount_amount": np.bincount(inverse, weights=discount_amount),
+        "total_final_price": np.bincount(inverse, weights=final),
+        "total_profit_amount": np.bincount(inverse, weights=profit),
+    }
+    final_sums = sums["total_final_price"]
+    margins = np.divide(
+        sums["total_profit_amount"] * 100, final_sums,
+        out=np.zeros_like(final_sums), where=final_sums > 0,
+    )
+
+    groups = []
+    for i, key in enumerate(unique_keys.tolist()):
+        group_id = None if key < 0 else int(key)
+        groups.append({
+            "id": group_id,
+            "name": names.get(group_id),
+            "total_products": int(counts[i]),
+            **{name: _round(values[i]) for name, values in sums.items()},
+            "average_profit_margin": _round(margins[i]),
+        })
+    return groups
+
+
+def get_pricing_analytics(group_by=None, include_products=True):
+    """
+    Totals, margins and percentile summaries over listed products.
+    group_by: None, "category" or "subcategory".
+    """
+    if group_by is not None and group_by not in GROUP_BY_COLUMNS:
+        raise ValueError("group_by must be one of category, subcategory")
+
+    rows = _load_pricing_columns()
+    n = len(rows)
+    if n:
+        ids, names, cids, sids, price, actual, discount, stock = zip(*rows)
+    else:
+        ids = names = cids = sids = price = actual = discount = stock = ()
+
+    price = np.asarray(price, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    discount = np.asarray(discount, dtype=np.float64)
+
+    discount_amount = price * discount / 100
+    final = price - discount_amount
+    # Profit only counts when a cost price has been recorded
+    profit = np.where(actual > 0, final - actual, 0.0)
+    margin = np.divide(profit * 100, final, out=np.zeros_like(final), where=final > 0)
+
+    total_final = final.sum()
+    total_profit = profit.sum()
+    analytics_data = {
+        "total_products": n,
+        "total_original_price": _round(price.sum()),
+        "total_actual_price": _round(actual.sum()),
+        "total_discount_amount": _round(discount_amount.sum()),
+        "total_final_price": _round(total_final),
+        "total_profit_amount": _round(total_profit),
+        "average_profit_margin": _round(total_profit / total_final * 100) if total_final > 0 else 0,
+        "percentiles": {
+            metric: (
+                {f"p{p}": _round(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+                if n else {}
+            )
+            for metric, values in (
+                ("final_price", final),
+                ("profit_amount", profit),
+                ("profit_margin", margin),
+                ("discount_value", discount),
+            )
+        },
+    }
+
+    if group_by:
+        column = cids if group_by == "category" else sids
+        # -1 stands in for products without a subcategory
+        keys = np.asarray([-1 if k is None else k for k in column], dtype=np.int64)
+        if group_by == "category":
+            group_names = dict(db.session.query(Category.id, Category.category_name).all())
+        else:
+            group_names = dict(db.session.query(SubCategory.id, SubCategory.sub_category_name).all())
+        analytics_data["group_by"] = group_by
+        analytics_data["groups"] = (
+            _group_summary(keys, price, actual, discount_amount, final, profit, group_names) if n else []
+        )
+
+    if include_products:
+        columns = zip(
+            ids,
+            names,
+            np.round(price, 2).tolist(),
+            np.round(actual, 2).tolist(),
+            np.round(discount, 2).tolist(),
+            np.round(discount_amount, 2).tolist(),
+            np.round(final, 2).tolist(),
+            np.round(profit, 2).tolist(),
+            np.round(margin, 2).tolist(),
+            stock,
+        )
+        analytics_data["products"] = [
+            {
+                "id": pid,
+                "name": name,
+                "original_price": p,
+                "actual_price": a,
+                "discount_value": d,
+                "discount_amount": da,
+                "final_price": f,
+                "profit_amount": pr,
+                "profit_margin": m,
+                "stock": int(s or 0),
+            }
+            for pid, name, p, a, d, da, f, pr, m, s in columns
+        ]
+
+    return analytics_data
@@ -0,0 +1,333 @@
+# services/product_import_service.py
+"""
+Bulk product import / export for catalog onboarding.
+
+Imports stream CSV or NDJSON rows, validate them against category and
+subcategory ids loaded once up front and write products, variants and
+stock snapshot rows with executemany INSERTs, one commit per batch.
+Rows that fail validation are reported by row number and skipped; the
+rest of the file still imports.
+"""
+import codecs
+import csv
+import io
+import json
+from sqlalchemy import select
+from extensions import db
+from models.product import Product
+from models.product_variant import ProductVariant
+from models.product_stock_snapshot import ProductStockSnapshot
+from models.category import Category
+from models.subcategory import SubCategory
+from services.inventory_service import InvalidVariantError, variant_counts_from_data
+from services.search_service import product_search_index
+from utils.barcode_generator import generate_unique_barcodes
+from utils.catalog_cache import bump_catalog_version
+
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+
+BOOLEAN_FIELDS = {
+    "visibility": True,
+    "is_active": True,
+    "is_returnable": True,
+    "is_cod_available": True,
+    "is_featured": False,
+    "is_latest": False,
+    "is_trending": False,
+    "is_new": False,
+}
+
+EXPORT_COLUMNS = [
+    "id", "barcode", "pname", "pdescription", "price", "actual_price", "discount_value",
+    "cid", "sid", "tag", "image", "colors", "size", "color", "stock",
+    *BOOLEAN_FIELDS,
+]
+
+
+def detect_import_format(filename=None, content_type=None):
+    """csv / ndjson from a file name or content type, or None"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return None
+
+
+def iter_import_rows(stream, fmt):
+    """Yield (row_number, dict or None, error) from a binary stream without reading it whole"""
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    if fmt == "csv":
+        # Row numbers count the header as row 1, matching spreadsheet line numbers
+        for row_number, row in enumerate(csv.DictReader(lines), start=2):
+            yield row_number, row, None
+    elif fmt == "ndjson":
+        for row_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {str(e)}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, row, None
+    else:
+        raise ValueError("format must be one of csv, ndjson")
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_bool(value, default):
+    if _blank(value):
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+
+def _parse_number(raw, field, cast, default=None, required=False):
+    value = raw.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f"Missing required field: {field}")
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: {value}")
+
+
+def _parse_structured(value, field, expected):
+    """CSV cells carry JSON as text; NDJSON rows carry it natively"""
+    if _blank(value):
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError(f"Invalid JSON in {field}")
+    if not isinstance(value, expected):
+        raise ValueError(f"{field} must be a JSON {'list' if expected is list else 'object'}")
+    return value
+
+
+def _image_field(raw):
+    images = raw.get("images")
+    if isinstance(images, list):
+        return ",".join(str(u).strip() for u in images if str(u).strip()) or None
+    if isinstance(images, str) and images.strip():
+        # CSV: pipe or comma separated URLs
+        return ",".join(u.strip() for u in images.replace("|", ",").split(",") if u.strip()) or None
+    image = raw.get("image")
+    return image.strip() if isinstance(image, str) and image.strip() else None
+
+
+def build_product_values(raw, category_ids, subcategory_cids):
+    """
+    Validate one import row and return (column values, {(color, size): stock}).
+    Mirrors create_product's handling of colors / size / stock.
+    """
+    pname = (raw.get("pname") or "").strip() if isinstance(raw.get("pname"), str) else raw.get("pname")
+    if not pname:
+        raise ValueError("Missing required field: pname")
+    price = _parse_number(raw, "price", float, required=True)
+    if price <= 0:
+        raise ValueError("price must be greater than 0")
+    cid = _parse_number(raw, "cid", int, required=True)
+    if cid not in category_ids:
+        raise ValueError(f"Category with ID {cid} does not exist")
+    sid = _parse_number(raw, "sid", int)
+    if sid is not None:
+        if sid not in subcategory_cids:
+            raise ValueError(f"Subcategory with ID {sid} does not exist")
+        if subcategory_cids[sid] != cid:
+            raise ValueError(f"Subcategory {sid} does not belong to category {cid}")
+
+    colors = _parse_structured(raw.get("colors"), "colors", list)
+    if colors:
+        sizes = None
+        size_field = None
+        colors_field = json.dumps(colors)
+    else:
+        colors_field = None
+        sizes = _parse_structured(raw.get("size"), "size", dict) if not _blank(raw.get("size")) else None
+        size_field = json.dumps(sizes) if sizes is not None else None
+    try:
+        counts = variant_counts_from_data(colors, sizes)
+    except InvalidVariantError:
+        raise
+    except (TypeError, ValueError):
+        raise ValueError("Stock counts in colors/size must be integers")
+    total_stock = sum(counts.values()) if counts else _parse_number(raw, "stock", int, default=0)
+
+    values = {
+        "pname": str(pname)[:120],
+        "pdescription": raw.get("pdescription") or None,
+        "size": size_field,
+        "color": None if colors else (raw.get("color") or None),
+        "colors": colors_field,
+        "price": price,
+        "cid": cid,
+        "sid": sid,
+        "stock": int(total_stock),
+        "quantity": int(total_stock),
+        "rating": _parse_number(raw, "rating", float, default=0.0),
+        "discount_value": _parse_number(raw, "discount_value", float, default=0.0),
+        "shared_count": _parse_number(raw, "shared_count", int, default=0),
+        "image": _image_field(raw),
+        "tag": raw.get("tag") or None,
+        "actual_price": _parse_number(raw, "actual_price", float, default=0.0),
+    }
+    for field, default in BOOLEAN_FIELDS.items():
+        try:
+            values[field] = _parse_bool(raw.get(field), default)
+        except ValueError:
+            raise ValueError(f"Invalid {field}: {raw.get(field)}")
+    return values, counts
+
+
+def _insert_batch(batch):
+    """Insert one validated batch; returns the new product ids. Caller commits."""
+    barcodes = generate_unique_barcodes(len(batch))
+    for (_, values, _), barcode in zip(batch, barcodes):
+        values["barcode"] = barcode
+    # Core executemany on the session's connection skips the ORM bulk-persistence layer
+    connection = db.session.connection()
+    connection.execute(Product.__table__.insert(), [values for _, values, _ in batch])
+
+    # Barcodes are unique, so they map the executemany rows back to their ids
+    ids = dict(connection.execute(
+        select(Product.barcode, Product.id).where(Product.barcode.in_(barcodes))
+    ).all())
+
+    variant_rows = []
+    snapshot_rows = []
+    for _, values, counts in batch:
+        product_id = ids[values["barcode"]]
+        is_listed = bool(values["is_active"] and values["visibility"])
+        for (color, size), stock in counts.items():
+            variant_rows.append({"product_id": product_id, "color": color, "size": size, "stock": stock})
+            snapshot_rows.append({
+                "product_id": product_id,
+                "product_name": values["pname"],
+                "color": color,
+                "size": size,
+                "count": stock,
+                "is_listed": is_listed,
+            })
+    if variant_rows:
+        connection.execute(ProductVariant.__table__.insert(), variant_rows)
+        connection.execute(ProductStockSnapshot.__table__.insert(), snapshot_rows)
+    return list(ids.values())
+
+
+def import_products(stream, fmt, batch_size=DEFAULT_IMPORT_BATCH_SIZE):
+    """Stream-import products; returns a report with per-row errors"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError("format must be one of csv, ndjson")
+    batch_size = max(1, min(int(batch_size), MAX_IMPORT_BATCH_SIZE))
+
+    category_ids = {cid for (cid,) in db.session.query(Category.id)}
+    subcategory_cids = dict(db.session.query(SubCategory.id, SubCategory.cid).all())
+
+    report = {"total_rows": 0, "imported": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def record_error(row_number, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+        else:
+            report["errors_truncated"] = True
+
+    def flush(batch):
+        try:
+            _insert_batch(batch)
+            db.session.commit()
+            report["imported"] += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[PRODUCT IMPORT] Batch starting at row {batch[0][0]} failed: {str(e)}")
+            for row_number, _, _ in batch:
+                record_error(row_number, f"Batch insert failed: {str(e)}")
+
+    batch = []
+    for row_number, raw, error in iter_import_rows(stream, fmt):
+        report["total_rows"] += 1
+        if error:
+            record_error(row_number, error)
+            continue
+        try:
+            values, counts = build_product_values(raw, category_ids, subcategory_cids)
+        except ValueError as e:
+            record_error(row_number, str(e))
+            continue
+        batch.append((row_number, values, counts))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if report["imported"]:
+        # One version bump for the whole import; facets and search catch up from it
+        bump_catalog_version()
+        db.session.commit()
+        product_search_index.refresh()
+
+    print(f"[PRODUCT IMPORT] {report['imported']} imported, {report['failed']} failed "
+          f"of {report['total_rows']} rows")
+    return report
+
+
+def _export_value(value):
+    return "" if value is None else value
+
+
+def iter_product_export(fmt):
+    """Yield the catalog as CSV or NDJSON text chunks, one chunk per id batch"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError("format must be one of csv, ndjson")
+    columns = [getattr(Product, name) for name in EXPORT_COLUMNS]
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(Product.id > last_id).order_by(Product.id.asc()).limit(EXPORT_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([_export_value(value) for value in row])
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in rows
+            )
+        last_id = rows[-1][0]
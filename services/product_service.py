@@ -1,21 +1,145 @@
-from models.product import Product
+from models.product import Product, PRODUCT_FIELD_GETTERS, PRODUCT_VARIANT_FIELDS
 from extensions import db
 from utils.crypto import encrypt_payload, decrypt_payload
 from utils.barcode_generator import generate_unique_barcode, regenerate_barcode
+from services.inventory_service import sync_product_variants
+from services.stock_snapshot_service import refresh_product_snapshot
+from utils.catalog_cache import cached, bump_catalog_version
+from services.search_service import product_search_index
+from services.image_derivative_service import set_image_variants, product_image_urls
+from sqlalchemy.orm import joinedload, selectinload
+import base64
 import json
+
+# Paginated customer catalog limits
+CUSTOMER_PAGE_DEFAULT_LIMIT = 24
+CUSTOMER_PAGE_MAX_LIMIT = 100
+# Default projection for paginated listings
+CUSTOMER_PAGE_DEFAULT_FIELDS = list(PRODUCT_FIELD_GETTERS)
+
 def get_all_products():
-    return Product.query.order_by(Product.id.desc()).all()
+    return Product.query.options(selectinload(Product.variants)).order_by(Product.id.desc()).all()
 
 def get_customer_products():
     """Get products visible to customers (active and visible)"""
     return Product.query.filter(
         Product.is_active == True,
         Product.visibility == True
-    ).order_by(Product.id.desc()).all()
+    ).options(selectinload(Product.variants)).order_by(Product.id.desc()).all()
+
+def get_customer_product_dicts():
+    """Serialized customer catalog, served from the catalog cache"""
+    return cached(("customer_products",), lambda: [p.to_dict() for p in get_customer_products()])
+
+def encode_product_cursor(product):
+    """Build an opaque keyset cursor pointing just after `product` (pages are ordered by id only)"""
+    raw = json.dumps({"id": product.id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+def decode_product_cursor(cursor):
+    """Decode a cursor produced by encode_product_cursor; returns the last seen id (other keys are ignored)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
+        return int(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_product_fields(fields_param):
+    """Parse a comma separated `fields=` value into a validated projection list"""
+    if not fields_param:
+        return list(CUSTOMER_PAGE_DEFAULT_FIELDS)
+    fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in PRODUCT_FIELD_GETTERS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # id is always needed to continue pagination
+    if "id" not in fields:
+        fields.insert(0, "id")
+    return fields
+
+def get_customer_products_page(cursor=None, limit=None, fields=None):
+    """
+    Keyset-paginated customer catalog (newest first).
+    Returns (products as projected dicts, next_cursor or None).
+    """
+    if limit is None:
+        limit = CUSTOMER_PAGE_DEFAULT_LIMIT
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(limit, CUSTOMER_PAGE_MAX_LIMIT)
+    fields = fields or list(CUSTOMER_PAGE_DEFAULT_FIELDS)
+    return cached(
+        ("customer_products_page", cursor, limit, tuple(fields)),
+        lambda: _load_customer_products_page(cursor, limit, fields),
+    )
+
+def _load_customer_products_page(cursor, limit, fields):
+
+    query = Product.query.filter(
+        Product.is_active == True,
+        Product.visibility == True
+    )
+    if cursor:
+        query = query.filter(Product.id < decode_product_cursor(cursor))
+
+    # Only pull the heavy columns / relationships when they are projected
+    options = []
+    if "category" in fields:
+        options.append(joinedload(Product.category))
+    if "subcategory" in fields:
+        options.append(joinedload(Product.subcategory))
+    if not PRODUCT_VARIANT_FIELDS.isdisjoint(fields):
+        options.append(selectinload(Product.variants))
+    if options:
+        query = query.options(*options)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Product.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_product_cursor(rows[-1]) if has_more and rows else None
+    return [p.to_dict(fields) for p in rows], next_cursor
 
 def get_product_by_id(pid):
     return Product.query.get(pid)
 
+def get_product_dict_by_id(pid):
+    """Serialized product (or None), served from the catalog cache"""
+    def build():
+        product = get_product_by_id(pid)
+        return product.to_dict() if product else None
+    return cached(("product", pid), build)
+
+def get_product_detail_by_id(pid):
+    """Serialized product plus review stats from its aggregate columns (or None), cached"""
+    def build():
+        product = get_product_by_id(pid)
+        if not product:
+            return None
+        return {"product": product.to_dict(), "review_stats": product.review_stats()}
+    return cached(("product_detail", pid), build)
+
+def get_barcode_sheet_labels(product_ids=None, cid=None, sid=None, limit=None):
+    """(barcode, name, id) for products with a barcode, by id list (kept in order) or category"""
+    query = db.session.query(Product.barcode, Product.pname, Product.id).filter(Product.barcode.isnot(None))
+    if product_ids:
+        query = query.filter(Product.id.in_(product_ids))
+    else:
+        if cid:
+            query = query.filter(Product.cid == cid)
+        if sid:
+            query = query.filter(Product.sid == sid)
+        query = query.order_by(Product.id.asc())
+    if limit:
+        query = query.limit(limit)
+    labels = [tuple(row) for row in query.all()]
+    if product_ids:
+        position = {pid: i for i, pid in enumerate(product_ids)}
+        labels.sort(key=lambda label: position[label[2]])
+    return labels
+
 def create_product(data):
     # Validate required fields
     required_fields = ["pname", "price", "cid"]
@@ -99,8 +223,14 @@ def create_product(data):
             tag=data.get("tag"),
             actual_price=float(data.get("actual_price", 0)),
         )
+        set_image_variants(product, product_image_urls(product))
         db.session.add(product)
+        db.session.flush()
+        sync_product_variants(product)
+        refresh_product_snapshot(product)
+        bump_catalog_version()
         db.session.commit()
+        product_search_index.index_product(product)
         return product
     except Exception as e:
         db.session.rollback()
@@ -175,8 +305,18 @@ def update_product(pid, data):
     for key, value in data.items():
         if key in allowed_fields:
             setattr(product, key, value)
+    if "image" in data:
+        set_image_variants(product, product_image_urls(product))
+
+    # Explicit stock edits from admin overwrite the variant rows
+    if "colors" in data or "size" in data:
+        sync_product_variants(product)
+    # Name / visibility live in the snapshot too, so refresh on every edit
+    refresh_product_snapshot(product)
     
+    bump_catalog_version()
     db.session.commit()
+    product_search_index.index_product(product)
     return product
 
 def delete_product(pid):
@@ -184,7 +324,9 @@ def delete_product(pid):
     if not product:
         return False
     db.session.delete(product)
+    bump_catalog_version()
     db.session.commit()
+    product_search_index.remove_product(pid)
     return True
 
 def regenerate_product_barcode(pid):
@@ -193,6 +335,8 @@ def regenerate_product_barcode(pid):
     """
     try:
         new_barcode = regenerate_barcode(pid)
+        bump_catalog_version()
+        db.session.commit()
         return {"success": True, "barcode": new_barcode}
     except ValueError as e:
         return {"success": False, "error": str(e)}
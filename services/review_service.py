@@ -1,7 +1,9 @@
 from typing import List, Optional, Dict, Any
+from sqlalchemy import bindparam, case, func
 from extensions import db
 from models.review import ProductReview
 from models.product import Product
+from services.image_derivative_service import set_image_variants, review_image_urls
 
 
 def _join_urls(urls: Optional[List[str]]) -> Optional[str]:
@@ -16,7 +18,7 @@ def create_review(customer_id: int, data: Dict[str, Any]) -> ProductReview:
     if rating < 1 or rating > 5:
         raise ValueError("Rating must be between 1 and 5")
 
-    if not Product.query.get(product_id):
+    if not db.session.query(Product.id).filter_by(id=product_id).first():
         raise ValueError("Invalid product_id")
 
     review = ProductReview(
@@ -30,9 +32,10 @@ def create_review(customer_id: int, data: Dict[str, Any]) -> ProductReview:
         is_verified_purchase=bool(data.get("is_verified_purchase", False)),
         status="approved"
     )
+    set_image_variants(review, review_image_urls(review))
     db.session.add(review)
+    _apply_review_delta(product_id, rating, 1)
     db.session.commit()
-    _recalculate_product_rating(product_id)
     return review
 
 
@@ -53,16 +56,19 @@ def list_reviews_for_admin(product_id: Optional[int] = None, status: Optional[st
 
 
 def update_review_status(review_id: int, status: str, admin_note: Optional[str] = None) -> Optional[ProductReview]:
-    review = ProductReview.query.get(review_id)
-    if not review:
-        return None
     if status not in ("pending", "approved", "rejected"):
         raise ValueError("Invalid status")
+    # Row lock so concurrent moderation of the same review applies one delta
+    review = ProductReview.query.filter_by(id=review_id).with_for_update().first()
+    if not review:
+        return None
+    was_approved = review.status == "approved"
     review.status = status
     if admin_note is not None:
         review.admin_note = admin_note
+    if was_approved != (status == "approved"):
+        _apply_review_delta(review.product_id, review.rating, 1 if status == "approved" else -1)
     db.session.commit()
-    _recalculate_product_rating(review.product_id)
     return review
 
 
@@ -78,43 +84,92 @@ def add_media_to_review(review_id: int, images: Optional[List[str]] = None, vide
         current_videos.extend([u for u in videos if u.strip()])
     review.image_urls = _join_urls(current_images)
     review.video_urls = _join_urls(current_videos)
+    if images:
+        set_image_variants(review, review_image_urls(review))
     db.session.commit()
     return review
 
 
-def _recalculate_product_rating(product_id: int) -> None:
-    try:
-        approved = ProductReview.query.with_entities(ProductReview.rating).filter_by(product_id=product_id, status="approved").all()
-        if not approved:
-            product = Product.query.get(product_id)
-            if product:
-                product.rating = 0.0
-                db.session.commit()
-            return
-        ratings = [r[0] for r in approved]
-        avg = round(sum(ratings) / len(ratings), 2)
-        product = Product.query.get(product_id)
-        if product:
-            product.rating = float(avg)
-            db.session.commit()
-    except Exception:
-        # Likely table doesn't exist yet; ignore to avoid crashing reads
-        db.session.rollback()
+def _apply_review_delta(product_id: int, rating: int, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one approved rating from the product aggregates. Caller commits."""
+    # Core UPDATEs that set updated_at to itself: a new rating is not a product edit,
+    # so the onupdate stamp must not fire
+    table = Product.__table__
+    star_column = table.c[f"rating_count_{int(rating)}"]
+    db.session.execute(
+        table.update()
+        .where(table.c.id == product_id)
+        .values(
+            updated_at=table.c.updated_at,
+            review_count=table.c.review_count + sign,
+            rating_sum=table.c.rating_sum + sign * int(rating),
+            **{star_column.name: star_column + sign},
+        )
+    )
+    # Separate statement: MySQL evaluates SET clauses left to right
+    db.session.execute(
+        table.update()
+        .where(table.c.id == product_id)
+        .values(
+            updated_at=table.c.updated_at,
+            rating=case(
+                (table.c.review_count > 0, func.round(table.c.rating_sum * 1.0 / table.c.review_count, 2)),
+                else_=0.0,
+            ),
+        )
+    )
+
+
+def rebuild_review_stats() -> int:
+    """Recompute every product's review aggregates from approved reviews"""
+    star_sums = [
+        func.sum(case((ProductReview.rating == i, 1), else_=0)).label(f"rating_count_{i}")
+        for i in range(1, 6)
+    ]
+    rows = db.session.query(
+        ProductReview.product_id,
+        func.count(ProductReview.id),
+        func.sum(ProductReview.rating),
+        *star_sums,
+    ).filter(ProductReview.status == "approved").group_by(ProductReview.product_id).all()
+
+    # Core UPDATEs that set updated_at to itself: a stats rebuild is not a product edit,
+    # so the onupdate stamp must not fire (fragments key on the stat columns themselves)
+    table = Product.__table__
+    stat_columns = ["review_count", "rating_sum", "rating"] + [f"rating_count_{i}" for i in range(1, 6)]
+    zero = {column: 0 for column in stat_columns}
+    db.session.execute(
+        table.update()
+        .where((table.c.review_count != 0) | (table.c.rating != 0))
+        .values(updated_at=table.c.updated_at, **zero)
+    )
+    if rows:
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(updated_at=table.c.updated_at, **{column: bindparam(f"b_{column}") for column in stat_columns}),
+            [
+                {
+                    "b_id": product_id,
+                    "b_review_count": int(count),
+                    "b_rating_sum": int(total or 0),
+                    "b_rating": round(int(total or 0) / int(count), 2),
+                    **{f"b_rating_count_{i}": int(stars[i - 1] or 0) for i in range(1, 6)},
+                }
+                for product_id, count, total, *stars in rows
+            ],
+        )
+    db.session.commit()
+    return len(rows)
 
 
 def get_product_review_stats(product_id: int) -> Dict[str, Any]:
     try:
-        q = ProductReview.query.filter_by(product_id=product_id, status="approved")
-        total = q.count()
-        if total == 0:
+        product = db.session.get(Product, product_id)
+        if not product:
             return {"total": 0, "average": 0.0, "breakdown": {str(i): 0 for i in range(1, 6)}}
-        breakdown = {}
-        for i in range(1, 6):
-            breakdown[str(i)] = q.filter_by(rating=i).count()
-        avg = round(sum(int(k) * v for k, v in breakdown.items()) / total, 2)
-        return {"total": total, "average": avg, "breakdown": breakdown}
+        return product.review_stats()
     except Exception:
-        # Table not ready, return empty stats gracefully
+        # Columns not migrated yet, return empty stats gracefully
+        db.session.rollback()
         return {"total": 0, "average": 0.0, "breakdown": {str(i): 0 for i in range(1, 6)}}
-
-
@@ -0,0 +1,483 @@
+# services/sales_rollup_service.py
+"""
+Daily sales / profit rollups behind the order analytics endpoints.
+
+sales_daily_rollup holds item totals per (day, product, order status) and
+order_daily_rollup holds order counts / amounts per (day, order status); day
+is the order's created_at date. Both are maintained from a before_flush /
+after_flush hook, so any ORM change to Order.status, Order.total_amount or
+to order items moves the affected totals between buckets in the same
+transaction without touching the many call sites that update orders.
+Set-based UPDATEs that bypass the ORM must call apply_order_status_change(),
+bulk item INSERTs apply_items_inserted().
+rebuild_sales_rollups() (backfill_sales_rollups.py) recomputes everything.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, insert, inspect, select
+from extensions import db
+from models.order import Order, OrderItem
+from models.product import Product
+from models.sales_rollup import SalesDailyRollup, OrderDailyRollup
+from utils.db_upsert import upsert_increment
+
+# Order statuses counted as sales by the dashboard
+SALES_STATUSES = ("delivered", "confirmed", "processing", "shipped")
+RECENT_ORDERS_LIMIT = 5
+PROFIT_BY_ORDER_LIMIT = 50
+TOP_PRODUCTS_LIMIT = 10
+
+_PENDING_KEY = "sales_rollup_deltas"
+
+
+def stored_value(obj, attr):
+    """Value of `attr` as currently stored in the database"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if inspect(obj).pending:
+        return None
+    return getattr(obj, attr)
+
+
+def _order_day(order):
+    created_at = order.created_at
+    return (created_at or datetime.utcnow()).date()
+
+
+def _item_values(item, old=False):
+    read = (lambda attr: stored_value(item, attr)) if old else (lambda attr: getattr(item, attr))
+    quantity = int(read("quantity") or 0)
+    return (
+        read("product_id"),
+        quantity,
+        float(read("total_price") or 0),
+        float(read("unit_cost") or 0) * quantity,
+    )
+
+
+def _collect_deltas(session):
+    item_deltas = defaultdict(lambda: [0, 0.0, 0.0])   # (day, product_id, status) -> [qty, revenue, cost]
+    order_deltas = defaultdict(lambda: [0, 0.0])       # (day, status) -> [orders, amount]
+
+    def add_item(day, status, values, sign):
+        product_id, quantity, revenue, cost = values
+        delta = item_deltas[(day, product_id, status)]
+        delta[0] += sign * quantity
+        delta[1] += sign * revenue
+        delta[2] += sign * cost
+
+    def add_order(day, status, amount, sign):
+        delta = order_deltas[(day, status)]
+        delta[0] += sign
+        delta[1] += sign * float(amount or 0)
+
+    status_changed = {}
+    for obj in session.new:
+        if isinstance(obj, Order):
+            add_order(_order_day(obj), obj.status or "pending", obj.total_amount, 1)
+    for obj in session.dirty:
+        if isinstance(obj, Order) and session.is_modified(obj):
+            old_status, old_amount = stored_value(obj, "status"), stored_value(obj, "total_amount")
+            if old_status != obj.status or old_amount != obj.total_amount:
+                add_order(_order_day(obj), old_status, old_amount, -1)
+                add_order(_order_day(obj), obj.status, obj.total_amount, 1)
+            if old_status != obj.status:
+                status_changed[obj.id] = (obj, old_status)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            add_order(_order_day(obj), stored_value(obj, "status"), stored_value(obj, "total_amount"), -1)
+
+    handled_items = set()
+    for obj in session.new:
+        if isinstance(obj, OrderItem):
+            if obj.unit_cost is None and obj.product_id:
+                product = session.get(Product, obj.product_id)
+                obj.unit_cost = float(product.actual_price or 0) if product else 0.0
+            order = session.get(Order, obj.order_id) if obj.order_id else obj.order
+            if order is not None:
+                add_item(_order_day(order), order.status or "pending", _item_values(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, OrderItem) and (session.is_modified(obj) or obj.order_id in status_changed):
+            order = session.get(Order, obj.order_id)
+            if order is None:
+                continue
+            handled_items.add(obj.id)
+            add_item(_order_day(order), stored_value(order, "status"), _item_values(obj, old=True), -1)
+            add_item(_order_day(order), order.status, _item_values(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, OrderItem):
+            order = session.get(Order, stored_value(obj, "order_id"))
+            if order is not None:
+                handled_items.add(obj.id)
+                add_item(_order_day(order), stored_value(order, "status"), _item_values(obj, old=True), -1)
+
+    # Persisted items of orders whose status changed move bucket as a group
+    for order_id, (order, old_status) in status_changed.items():
+        filters = [OrderItem.order_id == order_id]
+        if handled_items:
+            filters.append(~OrderItem.id.in_(handled_items))
+        rows = session.query(
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.total_price),
+            func.sum(func.coalesce(OrderItem.unit_cost, 0) * OrderItem.quantity),
+        ).filter(*filters).group_by(OrderItem.product_id).all()
+        day = _order_day(order)
+        for product_id, quantity, revenue, cost in rows:
+            values = (product_id, int(quantity or 0), float(revenue or 0), float(cost or 0))
+            add_item(day, old_status, values, -1)
+            add_item(day, order.status, values, 1)
+
+    return item_deltas, order_deltas
+
+
+def _apply_deltas(connection, item_deltas, order_deltas):
+    items_table = SalesDailyRollup.__table__
+    orders_table = OrderDailyRollup.__table__
+    for (day, product_id, status), (quantity, revenue, cost) in item_deltas.items():
+        if quantity == 0 and abs(revenue) < 1e-9 and abs(cost) < 1e-9:
+            continue
+        upsert_increment(
+            connection, items_table,
+            {"day": day, "product_id": product_id, "status": status},
+            {"quantity": quantity, "revenue": revenue, "cost": cost},
+        )
+    for (day, status), (count, amount) in order_deltas.items():
+        if count == 0 and abs(amount) < 1e-9:
+            continue
+        upsert_increment(
+            connection, orders_table,
+            {"day": day, "status": status},
+            {"order_count": count, "order_amount": amount},
+        )
+
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Make SQLAlchemy load the stored value before these attributes are overwritten
+# on expired objects (e.g. after a commit), so stored_value() sees the real old bucket
+for _attribute in (
+    Order.status,
+    Order.total_amount,
+    OrderItem.order_id,
+    OrderItem.product_id,
+    OrderItem.quantity,
+    OrderItem.total_price,
+    OrderItem.unit_cost,
+):
+    event.listen(_attribute, "set", _track_previous_value, active_history=True)
+
+
+@event.listens_for(db.session, "before_flush")
+def _collect_rollup_deltas(session, flush_context, instances):
+    session.info.pop(_PENDING_KEY, None)
+    with session.no_autoflush:
+        item_deltas, order_deltas = _collect_deltas(session)
+    if item_deltas or order_deltas:
+        session.info[_PENDING_KEY] = (item_deltas, order_deltas)
+
+
+@event.listens_for(db.session, "after_flush")
+def _write_rollup_deltas(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _apply_deltas(session.connection(), *pending)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_rollup_deltas(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def apply_order_status_change(order_ids, old_status, new_status):
+    """
+    Move rollup totals for orders changed by a set-based UPDATE (which skips
+    the flush hook). Call in the same transaction, before committing.
+    """
+    if not order_ids or old_status == new_status:
+        return
+    day = func.date(Order.created_at)
+    order_rows = db.session.query(day, func.count(Order.id), func.sum(Order.total_amount))\
+        .filter(Order.id.in_(order_ids)).group_by(day).all()
+    item_rows = db.session.query(
+        day,
+        OrderItem.product_id,
+        func.sum(OrderItem.quantity),
+        func.sum(OrderItem.total_price),
+        func.sum(func.coalesce(OrderItem.unit_cost, 0) * OrderItem.quantity),
+    ).join(Order, OrderItem.order_id == Order.id)\
+        .filter(Order.id.in_(order_ids))\
+        .group_by(day, OrderItem.product_id).all()
+
+    item_deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    order_deltas = defaultdict(lambda: [0, 0.0])
+    for row_day, count, amount in order_rows:
+        row_day = _as_date(row_day)
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            order_deltas[(row_day, status)][0] += sign * int(count or 0)
+            order_deltas[(row_day, status)][1] += sign * float(amount or 0)
+    for row_day, product_id, quantity, revenue, cost in item_rows:
+        row_day = _as_date(row_day)
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            delta = item_deltas[(row_day, product_id, status)]
+            delta[0] += sign * int(quantity or 0)
+            delta[1] += sign * float(revenue or 0)
+            delta[2] += sign * float(cost or 0)
+    _apply_deltas(db.session.connection(), item_deltas, order_deltas)
+
+
+def apply_items_inserted(order, item_rows):
+    """
+    Add rollup totals for order items written with a Core bulk INSERT (which
+    skips the flush hook). `item_rows` are the inserted column dicts; call in
+    the same transaction, before committing.
+    """
+    item_deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    day, status = _order_day(order), order.status or "pending"
+    for row in item_rows:
+        quantity = int(row.get("quantity") or 0)
+        delta = item_deltas[(day, row["product_id"], status)]
+        delta[0] += quantity
+        delta[1] += float(row.get("total_price") or 0)
+        delta[2] += float(row.get("unit_cost") or 0) * quantity
+    _apply_deltas(db.session.connection(), item_deltas, {})
+
+
+def _as_date(value):
+    # DATE() comes back as a string on SQLite
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    return value
+
+
+def rebuild_sales_rollups():
+    """Recompute both rollup tables from orders / order items in one transaction"""
+    try:
+        # Items created before unit_cost existed use the product's current cost price
+        OrderItem.query.filter(OrderItem.unit_cost.is_(None)).update(
+            {
+                OrderItem.unit_cost: select(func.coalesce(Product.actual_price, 0.0))
+                .where(Product.id == OrderItem.product_id)
+                .scalar_subquery()
+            },
+            synchronize_session=False,
+        )
+
+        SalesDailyRollup.query.delete(synchronize_session=False)
+        OrderDailyRollup.query.delete(synchronize_session=False)
+
+        day = func.date(Order.created_at)
+        db.session.execute(insert(SalesDailyRollup).from_select(
+            ["day", "product_id", "status", "quantity", "revenue", "cost"],
+            select(
+                day,
+                OrderItem.product_id,
+                Order.status,
+                func.sum(OrderItem.quantity),
+                func.sum(OrderItem.total_price),
+                func.sum(func.coalesce(OrderItem.unit_cost, 0) * OrderItem.quantity),
+            ).join(Order, OrderItem.order_id == Order.id)
+            .group_by(day, OrderItem.product_id, Order.status),
+        ))
+        db.session.execute(insert(OrderDailyRollup).from_select(
+            ["day", "status", "order_count", "order_amount"],
+            select(day, Order.status, func.count(Order.id), func.sum(Order.total_amount))
+            .group_by(day, Order.status),
+        ))
+        db.session.commit()
+        print("[SALES ROLLUP] Rollups rebuilt")
+        return True
+    except Exception as e:
+        print(f"[SALES ROLLUP] Rebuild failed: {str(e)}")
+        db.session.rollback()
+        raise
+
+
+def parse_date_range(start_date, end_date):
+    """Parse inclusive YYYY-MM-DD bounds; either may be omitted"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    if start and end and start > end:
+        raise ValueError("start_date must be on or before end_date")
+    return start, end
+
+
+def _day_filters(column, start, end):
+    filters = []
+    if start:
+        filters.append(column >= start)
+    if end:
+        filters.append(column <= end)
+    return filters
+
+
+def _created_at_filters(start, end):
+    filters = []
+    if start:
+        filters.append(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        filters.append(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return filters
+
+
+def get_sales_analytics(start=None, end=None):
+    """Sales dashboard figures answered from the rollups (4 queries regardless of volume)"""
+    order_days = db.session.query(
+        OrderDailyRollup.day,
+        func.sum(OrderDailyRollup.order_count),
+        func.sum(OrderDailyRollup.order_amount),
+    ).filter(
+        OrderDailyRollup.status.in_(SALES_STATUSES),
+        *_day_filters(OrderDailyRollup.day, start, end),
+    ).group_by(OrderDailyRollup.day).all()
+
+    item_days = dict(db.session.query(
+        SalesDailyRollup.day,
+        func.sum(SalesDailyRollup.quantity),
+    ).filter(
+        SalesDailyRollup.status.in_(SALES_STATUSES),
+        *_day_filters(SalesDailyRollup.day, start, end),
+    ).group_by(SalesDailyRollup.day).all())
+
+    top_products = db.session.query(
+        Product.pname,
+        func.sum(SalesDailyRollup.quantity).label("total_quantity"),
+        func.sum(SalesDailyRollup.revenue).label("total_revenue"),
+    ).join(Product, Product.id == SalesDailyRollup.product_id)\
+        .filter(
+            SalesDailyRollup.status.in_(SALES_STATUSES),
+            *_day_filters(SalesDailyRollup.day, start, end),
+        )\
+        .group_by(Product.id, Product.pname)\
+        .order_by(func.sum(SalesDailyRollup.quantity).desc())\
+        .limit(TOP_PRODUCTS_LIMIT).all()
+
+    recent_orders = Order.query.filter(
+        Order.status.in_(SALES_STATUSES),
+        *_created_at_filters(start, end),
+    ).order_by(Order.created_at.desc()).limit(RECENT_ORDERS_LIMIT).all()
+
+    total_orders = sum(int(count or 0) for _, count, _ in order_days)
+    total_sales_amount = sum(float(amount or 0) for _, _, amount in order_days)
+    daily = [
+        {
+            "date": str(day),
+            "orders": int(count or 0),
+            "sales_amount": round(float(amount or 0), 2),
+            "items_sold": int(item_days.get(day) or 0),
+        }
+        for day, count, amount in sorted(order_days, key=lambda row: row[0])
+    ]
+
+    return {
+        "total_orders": total_orders,
+        "total_sales_amount": round(total_sales_amount, 2),
+        "total_items_sold": sum(int(q or 0) for q in item_days.values()),
+        "average_order_value": round(total_sales_amount / total_orders, 2) if total_orders > 0 else 0,
+        "top_products": [
+            {
+                "name": product_name,
+                "quantity_sold": int(total_quantity or 0),
+                "revenue": float(total_revenue or 0),
+            }
+            for product_name, total_quantity, total_revenue in top_products
+        ],
+        "recent_orders": [
+            {
+                "order_number": order.order_number,
+                "total_amount": order.total_amount,
+                "status": order.status,
+                "created_at": order.created_at.isoformat() if order.created_at else None,
+            }
+            for order in recent_orders
+        ],
+        "daily": daily,
+    }
+
+
+def get_profit_analytics(start=None, end=None):
+    """Profit dashboard figures answered from the rollups (4 queries regardless of volume)"""
+    total_orders = db.session.query(func.sum(OrderDailyRollup.order_count)).filter(
+        OrderDailyRollup.status.in_(SALES_STATUSES),
+        *_day_filters(OrderDailyRollup.day, start, end),
+    ).scalar()
+
+    item_days = db.session.query(
+        SalesDailyRollup.day,
+        func.sum(SalesDailyRollup.revenue),
+        func.sum(SalesDailyRollup.cost),
+    ).filter(
+        SalesDailyRollup.status.in_(SALES_STATUSES),
+        *_day_filters(SalesDailyRollup.day, start, end),
+    ).group_by(SalesDailyRollup.day).order_by(SalesDailyRollup.day.asc()).all()
+
+    profit_expr = func.sum(SalesDailyRollup.revenue) - func.sum(SalesDailyRollup.cost)
+    profitable_products = db.session.query(
+        Product.pname,
+        func.sum(SalesDailyRollup.quantity),
+        func.sum(SalesDailyRollup.revenue),
+        func.sum(SalesDailyRollup.cost),
+    ).join(Product, Product.id == SalesDailyRollup.product_id)\
+        .filter(
+            SalesDailyRollup.status.in_(SALES_STATUSES),
+            *_day_filters(SalesDailyRollup.day, start, end),
+        )\
+        .group_by(Product.id, Product.pname)\
+        .order_by(profit_expr.desc())\
+        .limit(TOP_PRODUCTS_LIMIT).all()
+
+    # Per-order breakdown for the most recent orders only
+    order_revenue = func.sum(OrderItem.total_price)
+    order_cost = func.sum(func.coalesce(OrderItem.unit_cost, 0) * OrderItem.quantity)
+    recent_order_profit = db.session.query(Order.order_number, order_revenue, order_cost)\
+        .join(OrderItem, OrderItem.order_id == Order.id)\
+        .filter(Order.status.in_(SALES_STATUSES), *_created_at_filters(start, end))\
+        .group_by(Order.id, Order.order_number)\
+        .order_by(Order.id.desc())\
+        .limit(PROFIT_BY_ORDER_LIMIT).all()
+
+    def profit_entry(revenue, cost):
+        revenue, cost = float(revenue or 0), float(cost or 0)
+        profit = revenue - cost
+        return {
+            "revenue": round(revenue, 2),
+            "cost": round(cost, 2),
+            "profit": round(profit, 2),
+            "profit_margin": round((profit / revenue * 100) if revenue > 0 else 0, 2),
+        }
+
+    total_revenue = sum(float(revenue or 0) for _, revenue, _ in item_days)
+    total_cost = sum(float(cost or 0) for _, _, cost in item_days)
+    total_profit = total_revenue - total_cost
+
+    return {
+        "total_orders": int(total_orders or 0),
+        "total_revenue": round(total_revenue, 2),
+        "total_cost": round(total_cost, 2),
+        "total_profit": round(total_profit, 2),
+        "profit_margin": round((total_profit / total_revenue) * 100, 2) if total_revenue > 0 else 0,
+        "top_profitable_products": [
+            {
+                "name": product_name,
+                "quantity_sold": int(quantity or 0),
+                **profit_entry(revenue, cost),
+            }
+            for product_name, quantity, revenue, cost in profitable_products
+        ],
+        "profit_by_order": [
+            {"order_number": order_number, **profit_entry(revenue, cost)}
+            for order_number, revenue, cost in recent_order_profit
+        ],
+        "profit_by_day": [
+            {"date": str(day), **profit_entry(revenue, cost)}
+            for day, revenue, cost in item_days
+        ],
+    }
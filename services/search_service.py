@@ -0,0 +1,278 @@
+# services/search_service.py
+"""
+In-process product search: inverted index over pname, pdescription, tag and
+category / subcategory names with BM25 ranking.
+
+Only customer-visible products (is_active and visibility) are indexed. The
+worker that handles a product write updates its index directly; other
+workers catch up when the catalog version (utils/catalog_cache.py) changes by
+re-indexing rows whose updated_at moved past their watermark.
+"""
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from datetime import timedelta
+from extensions import db
+from models.product import Product
+from models.category import Category
+from models.subcategory import SubCategory
+from utils.catalog_cache import get_catalog_version
+
+# Field weights (BM25F-style weighted term frequency)
+FIELD_WEIGHTS = {
+    "pname": 3.0,
+    "tag": 2.0,
+    "category": 1.5,
+    "subcategory": 1.5,
+    "pdescription": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Prefix matches score slightly below exact term matches
+PREFIX_WEIGHT = 0.8
+# Cap on how many index terms a single prefix can expand to
+MAX_PREFIX_EXPANSION = 64
+SEARCH_MAX_LIMIT = 100
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "the", "of", "for", "with", "in", "on", "to", "by", "or"}
+
+
+def _normalize(token):
+    # Light plural folding so "shirts" matches "shirt"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercase, split on non-alphanumerics, drop stopwords, fold plurals"""
+    if not text:
+        return []
+    return [_normalize(t) for t in _TOKEN_RE.findall(str(text).lower()) if t not in _STOPWORDS]
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}      # term -> {product_id: weighted tf}
+        self.doc_terms = {}     # product_id -> set(terms)
+        self.doc_len = {}       # product_id -> weighted length
+        self.total_len = 0.0
+        self.sorted_terms = []  # for prefix lookups
+        self._doc_norm = None   # product_id -> BM25 length normalisation, rebuilt after writes
+        self.category_names = {}
+        self.subcategory_names = {}
+        self.built = False
+        self.version = None
+        self.watermark = None   # max(updated_at) seen
+
+    # ------------------------------------------------------------------ build
+
+    def _load_rows(self, *criteria):
+        query = db.session.query(
+            Product.id,
+            Product.pname,
+            Product.pdescription,
+            Product.tag,
+            Product.cid,
+            Product.sid,
+            Product.is_active,
+            Product.visibility,
+            Product.updated_at,
+        )
+        if criteria:
+            query = query.filter(*criteria)
+        return query.all()
+
+    def _load_taxonomy(self):
+        self.category_names = dict(db.session.query(Category.id, Category.category_name).all())
+        self.subcategory_names = dict(db.session.query(SubCategory.id, SubCategory.sub_category_name).all())
+
+    def rebuild(self):
+        """Build the whole index from the database"""
+        with self._lock:
+            version = get_catalog_version()
+            self._reset()
+            self._load_taxonomy()
+            for row in self._load_rows(Product.is_active == True, Product.visibility == True):
+                self._index_row(row)
+            self.sorted_terms = sorted(self.postings)
+            self.built = True
+            self.version = version
+
+    def refresh(self):
+        """Bring the index up to date after another worker changed the catalog"""
+        with self._lock:
+            version = get_catalog_version()
+            if not self.built:
+                self.rebuild()
+                return
+            if version == self.version:
+                return
+
+            old_categories, old_subcategories = self.category_names, self.subcategory_names
+            self._load_taxonomy()
+            renamed_cids = {cid for cid, name in self.category_names.items() if old_categories.get(cid) != name}
+            renamed_sids = {sid for sid, name in self.subcategory_names.items() if old_subcategories.get(sid) != name}
+
+            criteria = []
+            if self.watermark is not None:
+                # Small overlap guards against same-second writes
+                criteria.append(Product.updated_at >= self.watermark - timedelta(seconds=1))
+            # No watermark means nothing was indexed yet, so every row counts as changed
+            changed = self._load_rows(*criteria)
+            if renamed_cids or renamed_sids:
+                changed += self._load_rows(db.or_(Product.cid.in_(renamed_cids), Product.sid.in_(renamed_sids)))
+            for row in changed:
+                self._remove(row.id)
+                if row.is_active and row.visibility:
+                    self._index_row(row)
+
+            # Deletions leave no row behind, so diff against the live id set
+            live_ids = {pid for (pid,) in db.session.query(Product.id).filter(
+                Product.is_active == True, Product.visibility == True
+            )}
+            for pid in list(self.doc_terms):
+                if pid not in live_ids:
+                    self._remove(pid)
+
+            self.sorted_terms = sorted(self.postings)
+            self.version = version
+
+    # -------------------------------------------------------------- mutations
+
+    def _fields_for_row(self, row):
+        return {
+            "pname": row.pname,
+            "tag": row.tag,
+            "category": self.category_names.get(row.cid),
+            "subcategory": self.subcategory_names.get(row.sid),
+            "pdescription": row.pdescription,
+        }
+
+    def _index_row(self, row):
+        tf = {}
+        length = 0.0
+        for field, text in self._fields_for_row(row).items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                tf[term] = tf.get(term, 0.0) + weight
+                length += weight
+        if not tf:
+            return
+        for term, freq in tf.items():
+            self.postings.setdefault(term, {})[row.id] = freq
+        self.doc_terms[row.id] = set(tf)
+        self.doc_len[row.id] = length
+        self.total_len += length
+        self._doc_norm = None
+        if row.updated_at and (self.watermark is None or row.updated_at > self.watermark):
+            self.watermark = row.updated_at
+
+    def _remove(self, product_id):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(product_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(product_id, 0.0)
+        self._doc_norm = None
+
+    def index_product(self, product):
+        """(Re)index a single product after it was created or updated in this worker"""
+        with self._lock:
+            if not self.built:
+                return
+            self.category_names[product.cid] = product.category.category_name if product.category else None
+            if product.sid:
+                self.subcategory_names[product.sid] = product.subcategory.sub_category_name if product.subcategory else None
+            self._remove(product.id)
+            if product.is_active and product.visibility:
+                self._index_row(product)
+            self.sorted_terms = sorted(self.postings)
+
+    def remove_product(self, product_id):
+        with self._lock:
+            if not self.built:
+                return
+            self._remove(product_id)
+            self.sorted_terms = sorted(self.postings)
+
+    # ----------------------------------------------------------------- search
+
+    def _get_doc_norms(self):
+        if self._doc_norm is None:
+            avgdl = (self.total_len / len(self.doc_len)) if self.doc_len else 1.0
+            self._doc_norm = {
+                pid: BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                for pid, length in self.doc_len.items()
+            }
+        return self._doc_norm
+
+    def _expand_prefix(self, prefix):
+        start = bisect_left(self.sorted_terms, prefix)
+        matches = []
+        for term in self.sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > MAX_PREFIX_EXPANSION:
+            # Keep the most common completions
+            matches = heapq.nlargest(MAX_PREFIX_EXPANSION, matches, key=lambda t: len(self.postings[t]))
+        return matches
+
+    def search(self, query, limit=20, prefix=True):
+        """
+        Rank products for `query`. The last query token is also matched as a
+        prefix (autocomplete) unless prefix=False.
+        Returns [(product_id, score)] best first.
+        """
+        with self._lock:
+            raw_tokens = [t for t in _TOKEN_RE.findall(str(query or "").lower()) if t not in _STOPWORDS]
+            if not raw_tokens or not self.doc_terms:
+                return []
+
+            weighted_terms = {}
+            for token in raw_tokens:
+                weighted_terms[_normalize(token)] = 1.0
+            if prefix:
+                for term in self._expand_prefix(raw_tokens[-1]):
+                    weighted_terms.setdefault(term, PREFIX_WEIGHT)
+
+            n_docs = len(self.doc_terms)
+            doc_norm = self._get_doc_norms()
+            scores = {}
+            for term, query_weight in weighted_terms.items():
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                factor = query_weight * idf * (BM25_K1 + 1)
+                for pid, freq in posting.items():
+                    scores[pid] = scores.get(pid, 0.0) + factor * freq / (freq + doc_norm[pid])
+
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+product_search_index = ProductSearchIndex()
+
+
+def search_products(query, limit=20, prefix=True):
+    """Search customer-visible products; returns [{"id", "score"}] best first"""
+    limit = max(1, min(int(limit or 20), SEARCH_MAX_LIMIT))
+    product_search_index.refresh()
+    return [
+        {"id": pid, "score": round(score, 4)}
+        for pid, score in product_search_index.search(query, limit=limit, prefix=prefix)
+    ]
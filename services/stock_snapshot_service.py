@@ -0,0 +1,188 @@
+# services/stock_snapshot_service.py
+"""
+Maintains product_stock_snapshot, the read model behind
+GET /api/products/stock-analytics.
+
+- reserve_variant / release_variant apply their delta to the matching row
+  in the same transaction (apply_snapshot_delta)
+- admin stock edits and legacy JSON stock changes re-derive a product's rows
+  (refresh_product_snapshot)
+- rebuild_stock_snapshot() re-derives everything and is run periodically
+  (see rebuild_stock_snapshot.py) as a safety net
+"""
+from sqlalchemy import bindparam, case, func, insert
+from sqlalchemy.orm import selectinload
+from extensions import db
+from models.product import Product
+from models.product_stock_snapshot import ProductStockSnapshot
+
+DEFAULT_LOW_STOCK_THRESHOLD = 5
+REBUILD_BATCH_SIZE = 500
+
+
+def _product_stock_counts(product):
+    from services.inventory_service import variant_counts_from_json
+    if product.variants:
+        return {(v.color, v.size): int(v.stock or 0) for v in product.variants}
+    return variant_counts_from_json(product)
+
+
+def refresh_product_snapshot(product):
+    """Replace a product's snapshot rows from its current variant / JSON stock. Caller commits."""
+    ProductStockSnapshot.query.filter(
+        ProductStockSnapshot.product_id == product.id
+    ).delete(synchronize_session=False)
+
+    is_listed = bool(product.is_active and product.visibility)
+    rows = [
+        {
+            "product_id": product.id,
+            "product_name": product.pname,
+            "color": color,
+            "size": size,
+            "count": count,
+            "is_listed": is_listed,
+        }
+        for (color, size), count in _product_stock_counts(product).items()
+    ]
+    if rows:
+        db.session.execute(insert(ProductStockSnapshot), rows)
+    return len(rows)
+
+
+def apply_snapshot_delta(product_id, color, size, delta):
+    """Shift one snapshot row by `delta` (clamped at zero). Caller commits."""
+    ProductStockSnapshot.query.filter(
+        ProductStockSnapshot.product_id == product_id,
+        ProductStockSnapshot.color == (color or ""),
+        ProductStockSnapshot.size == size,
+    ).update(
+        {
+            ProductStockSnapshot.count: case(
+                (ProductStockSnapshot.count + delta < 0, 0),
+                else_=ProductStockSnapshot.count + delta,
+            )
+        },
+        synchronize_session=False,
+    )
+
+
+def apply_snapshot_deltas(deltas):
+    """apply_snapshot_delta for {(product_id, color, size): delta} in one executemany. Caller commits."""
+    table = ProductStockSnapshot.__table__
+    rows = [
+        {"b_product_id": product_id, "b_color": color or "", "b_size": size, "b_delta": delta}
+        for (product_id, color, size), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    delta = bindparam("b_delta")
+    db.session.execute(
+        table.update()
+        .where(
+            table.c.product_id == bindparam("b_product_id"),
+            table.c.color == bindparam("b_color"),
+            table.c.size == bindparam("b_size"),
+        )
+        .values(count=case((table.c.count + delta < 0, 0), else_=table.c.count + delta)),
+        rows,
+    )
+
+
+def rebuild_stock_snapshot(batch_size=REBUILD_BATCH_SIZE):
+    """Re-derive the whole snapshot table, committing once per batch of products"""
+    last_id = 0
+    products_done = 0
+    rows_done = 0
+    while True:
+        products = Product.query.options(selectinload(Product.variants))\
+            .filter(Product.id > last_id)\
+            .order_by(Product.id.asc())\
+            .limit(batch_size)\
+            .all()
+        if not products:
+            break
+        for product in products:
+            rows_done += refresh_product_snapshot(product)
+        db.session.commit()
+        products_done += len(products)
+        last_id = products[-1].id
+        # Keep the identity map small on large catalogs
+        db.session.expunge_all()
+
+    # Rows of products deleted outside the ORM cascade
+    ProductStockSnapshot.query.filter(
+        ~ProductStockSnapshot.product_id.in_(db.session.query(Product.id))
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"[STOCK SNAPSHOT] Rebuilt {rows_done} rows for {products_done} products")
+    return products_done, rows_done
+
+
+def get_stock_analytics(low_stock_threshold=DEFAULT_LOW_STOCK_THRESHOLD, status=None):
+    """
+    Per-product stock breakdown for listed products plus overall summary.
+    status: None (everything), "in_stock", "out_of_stock" or "low_stock".
+    """
+    threshold = max(0, int(low_stock_threshold))
+    listed = ProductStockSnapshot.is_listed == True
+
+    summary_row = db.session.query(
+        func.count(func.distinct(ProductStockSnapshot.product_id)),
+        func.coalesce(func.sum(ProductStockSnapshot.count), 0),
+        func.coalesce(func.sum(case((ProductStockSnapshot.count > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((ProductStockSnapshot.count <= 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            ((ProductStockSnapshot.count > 0) & (ProductStockSnapshot.count <= threshold), 1), else_=0
+        )), 0),
+    ).filter(listed).one()
+
+    query = db.session.query(
+        ProductStockSnapshot.product_id,
+        ProductStockSnapshot.product_name,
+        ProductStockSnapshot.color,
+        ProductStockSnapshot.size,
+        ProductStockSnapshot.count,
+    ).filter(listed)
+    if status == "in_stock":
+        query = query.filter(ProductStockSnapshot.count > 0)
+    elif status == "out_of_stock":
+        query = query.filter(ProductStockSnapshot.count <= 0)
+    elif status == "low_stock":
+        query = query.filter(ProductStockSnapshot.count > 0, ProductStockSnapshot.count <= threshold)
+    elif status is not None:
+        raise ValueError("status must be one of in_stock, out_of_stock, low_stock")
+
+    products = {}
+    for product_id, name, color, size, count in query.order_by(ProductStockSnapshot.product_id.asc()):
+        entry = products.get(product_id)
+        if entry is None:
+            entry = products[product_id] = {
+                "id": product_id,
+                "name": name,
+                "total_stock": 0,
+                "current_stock": [],
+                "out_of_stock": [],
+                "low_stock": [],
+            }
+        variant = {"color": color, "size": size, "count": max(0, count)}
+        entry["total_stock"] += variant["count"]
+        if count > 0:
+            entry["current_stock"].append(variant)
+            if count <= threshold:
+                entry["low_stock"].append(variant)
+        else:
+            entry["out_of_stock"].append(variant)
+
+    return {
+        "data": list(products.values()),
+        "summary": {
+            "products": int(summary_row[0] or 0),
+            "total_units": int(summary_row[1] or 0),
+            "in_stock_variants": int(summary_row[2] or 0),
+            "out_of_stock_variants": int(summary_row[3] or 0),
+            "low_stock_variants": int(summary_row[4] or 0),
+            "low_stock_threshold": threshold,
+        },
+    }
@@ -3,27 +3,30 @@ from models.subcategory import SubCategory
 from models.category import Category
 from extensions import db
 from utils.crypto import encrypt_payload, decrypt_payload
+from utils.catalog_cache import cached, bump_catalog_version
 import json
 
+def _build_subcategories_data():
+    subcategories = SubCategory.query.order_by(SubCategory.id.desc()).all()
+    # One lookup for all parent category names instead of one query per row
+    category_names = dict(db.session.query(Category.id, Category.category_name).all())
+    subcategories_data = []
+    
+    for subcategory in subcategories:
+        subcategory_dict = {
+            "id": subcategory.id,
+            "name": subcategory.sub_category_name,
+            "category_id": subcategory.cid,
+            "category_name": category_names.get(subcategory.cid, "Unknown"),
+            "sub_category_count": subcategory.sub_category_count
+        }
+        subcategories_data.append(subcategory_dict)
+    return subcategories_data
+
 def get_all_subcategories():
     """Get all subcategories with encryption"""
     try:
-        subcategories = SubCategory.query.order_by(SubCategory.id.desc()).all()
-        subcategories_data = []
-        
-        for subcategory in subcategories:
-            # Get parent category name
-            parent_category = Category.query.get(subcategory.cid)
-            parent_name = parent_category.category_name if parent_category else "Unknown"
-            
-            subcategory_dict = {
-                "id": subcategory.id,
-                "name": subcategory.sub_category_name,
-                "category_id": subcategory.cid,
-                "category_name": parent_name,
-                "sub_category_count": subcategory.sub_category_count
-            }
-            subcategories_data.append(subcategory_dict)
+        subcategories_data = cached(("subcategories",), _build_subcategories_data)
         
         # Encrypt the response data
         encrypted_data = encrypt_payload({
@@ -139,6 +142,7 @@ def create_subcategory(encrypted_data):
         )
         
         db.session.add(new_subcategory)
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -201,6 +205,7 @@ def update_subcategory(subcategory_id, encrypted_data):
         subcategory.sub_category_name = name
         subcategory.cid = category_id
         
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -241,6 +246,7 @@ def delete_subcategory(subcategory_id):
             return {"error": "Cannot delete subcategory with existing products"}, 400
         
         db.session.delete(subcategory)
+        bump_catalog_version()
         db.session.commit()
         
         return {
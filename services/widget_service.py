@@ -7,16 +7,16 @@ from werkzeug.utils import secure_filename
 from models.widget import Widget
 from extensions import db
 from utils.crypto import encrypt_payload, decrypt_payload
-from utils.s3_service import S3Service
+from utils.s3_service import s3_service
+from utils.catalog_cache import cached, bump_catalog_version
+from services.image_derivative_service import generate_derivatives_for_files, set_image_variants, widget_image_urls
+from models.image_derivative import parse_variants_map
 
 # Image upload configuration
 UPLOAD_FOLDER = 'assets/img/widgets'  # Keep for backward compatibility
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
-# Initialize S3 service
-s3_service = S3Service()
-
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -24,6 +24,7 @@ def allowed_file(filename):
 def save_widget_images(files, widget_id):
     """Save multiple widget images to S3 and return their URLs"""
     image_urls = []
+    uploaded = []
     
     for file in files:
         if file and file.filename and allowed_file(file.filename):
@@ -38,6 +39,7 @@ def save_widget_images(files, widget_id):
                 
                 if s3_url:
                     image_urls.append(s3_url)
+                    uploaded.append((s3_url, file))
                     print(f"✅ Widget image uploaded to S3: {s3_url}")
                 else:
                     print(f"❌ Failed to upload widget image: {file.filename}")
@@ -46,6 +48,7 @@ def save_widget_images(files, widget_id):
                 print(f"❌ Error uploading widget image {file.filename}: {str(e)}")
                 # Continue with other files even if one fails
     
+    generate_derivatives_for_files(uploaded)
     return image_urls
 
 def delete_widget_images(image_paths):
@@ -66,15 +69,9 @@ def delete_widget_images(image_paths):
             
         try:
             # Check if it's an S3 URL
-            if image_path.startswith('https://') and 's3' in image_path:
-                # Extract S3 key from URL
-                s3_key = image_path.split('.com/')[-1] if '.com/' in image_path else image_path
-                
-                # Delete from S3
-                s3_service.s3_client.delete_object(
-                    Bucket=s3_service.bucket_name,
-                    Key=s3_key
-                )
+            if s3_service.key_from_url(image_path):
+                # Delete from storage
+                s3_service.delete_file(image_path)
                 print(f"✅ Deleted widget image from S3: {image_path}")
                 
             else:
@@ -87,34 +84,39 @@ def delete_widget_images(image_paths):
         except Exception as e:
             print(f"❌ Error deleting widget image {image_path}: {str(e)}")
 
+def _build_widgets_data():
+    widgets = Widget.query.order_by(Widget.id.desc()).all()
+    widgets_data = []
+    
+    for widget in widgets:
+        # Parse images JSON
+        images = []
+        if widget.images:
+            try:
+                images = json.loads(widget.images)
+            except:
+                images = []
+        
+        widget_dict = {
+            "id": widget.id,
+            "name": widget.name,
+            "title": widget.title,
+            "type": widget.type,
+            "page": widget.page,
+            "description": widget.description,
+            "images": images,
+            "image_variants": parse_variants_map(widget.image_variants),
+            "created_at": widget.created_at.isoformat() if widget.created_at else None,
+            "updated_at": widget.updated_at.isoformat() if widget.updated_at else None,
+            "is_active": widget.is_active
+        }
+        widgets_data.append(widget_dict)
+    return widgets_data
+
 def get_all_widgets():
     """Get all widgets with encryption"""
     try:
-        widgets = Widget.query.order_by(Widget.id.desc()).all()
-        widgets_data = []
-        
-        for widget in widgets:
-            # Parse images JSON
-            images = []
-            if widget.images:
-                try:
-                    images = json.loads(widget.images)
-                except:
-                    images = []
-            
-            widget_dict = {
-                "id": widget.id,
-                "name": widget.name,
-                "title": widget.title,
-                "type": widget.type,
-                "page": widget.page,
-                "description": widget.description,
-                "images": images,
-                "created_at": widget.created_at.isoformat() if widget.created_at else None,
-                "updated_at": widget.updated_at.isoformat() if widget.updated_at else None,
-                "is_active": widget.is_active
-            }
-            widgets_data.append(widget_dict)
+        widgets_data = cached(("widgets",), _build_widgets_data)
         
         # Encrypt the response data
         encrypted_data = encrypt_payload({
@@ -155,6 +157,7 @@ def get_widget_by_id(widget_id):
             "page": widget.page,
             "description": widget.description,
             "images": images,
+            "image_variants": parse_variants_map(widget.image_variants),
             "created_at": widget.created_at.isoformat() if widget.created_at else None,
             "updated_at": widget.updated_at.isoformat() if widget.updated_at else None,
             "is_active": widget.is_active
@@ -217,7 +220,9 @@ def create_widget(encrypted_data, files=None):
         # Update widget with image paths
         if image_paths:
             new_widget.images = json.dumps(image_paths)
+            set_image_variants(new_widget, image_paths)
         
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -229,6 +234,7 @@ def create_widget(encrypted_data, files=None):
             "page": new_widget.page,
             "description": new_widget.description,
             "images": image_paths,
+            "image_variants": parse_variants_map(new_widget.image_variants),
             "created_at": new_widget.created_at.isoformat() if new_widget.created_at else None,
             "updated_at": new_widget.updated_at.isoformat() if new_widget.updated_at else None,
             "is_active": new_widget.is_active
@@ -301,8 +307,10 @@ def update_widget(widget_id, encrypted_data, files=None):
         widget.description = description
         widget.page = page
         widget.images = json.dumps(all_images)
+        set_image_variants(widget, widget_image_urls(widget))
         widget.updated_at = datetime.utcnow()
         
+        bump_catalog_version()
         db.session.commit()
         
         # Return encrypted response
@@ -314,6 +322,7 @@ def update_widget(widget_id, encrypted_data, files=None):
             "page": widget.page,
             "description": widget.description,
             "images": all_images,
+            "image_variants": parse_variants_map(widget.image_variants),
             "created_at": widget.created_at.isoformat() if widget.created_at else None,
             "updated_at": widget.updated_at.isoformat() if widget.updated_at else None,
             "is_active": widget.is_active
@@ -348,6 +357,7 @@ def delete_widget(widget_id):
             delete_widget_images(widget.images)
         
         db.session.delete(widget)
+        bump_catalog_version()
         db.session.commit()
         
         return {
@@ -389,7 +399,9 @@ def delete_widget_image(widget_id, image_path):
             
             # Update widget
             widget.images = json.dumps(images)
+            set_image_variants(widget, widget_image_urls(widget))
             widget.updated_at = datetime.utcnow()
+            bump_catalog_version()
             db.session.commit()
             
             return {
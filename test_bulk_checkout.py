@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the lock-ordered bulk checkout in create_order.
+Runs against an in-memory SQLite database, so no MySQL or AWS access is needed.
+"""
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+from flask import Flask
+from sqlalchemy import event
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    return app
+
+
+def _seed_products(count, stock):
+    from models.category import Category
+    from models.product import Product
+    from models.product_variant import ProductVariant
+
+    category = Category(category_name="Test", description="Test category")
+    db.session.add(category)
+    db.session.flush()
+    product_ids = []
+    for i in range(count):
+        product = Product(
+            pname=f"Test product {i}", price=100, actual_price=40, cid=category.id,
+            colors=json.dumps([{"name": "red", "sizeCounts": {"M": stock}}]),
+            stock=stock, quantity=stock, is_active=True, visibility=True,
+        )
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(ProductVariant(product_id=product.id, color="red", size="M", stock=stock))
+        product_ids.append(product.id)
+    db.session.commit()
+    return product_ids
+
+
+def _order_data(product_ids, quantity):
+    items = [
+        {"product_id": pid, "size": "M", "color": "red", "quantity": quantity, "price": 100}
+        for pid in product_ids
+    ]
+    total = 100 * quantity * len(items)
+    return {"items": items, "delivery_address": {"city": "Test"}, "payment_method": "cod",
+            "subtotal": total, "total": total}
+
+
+def test_checkout_single_insert_and_commit():
+    """All items go out in one INSERT and the ledger row commits with the order"""
+    from models.order import Order, OrderItem
+    from models.product_variant import ProductVariant
+    from models.transaction import Transaction
+    from services.order_service import create_order
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        product_ids = _seed_products(5, stock=5)
+
+        statements = []
+        commits = []
+        on_execute = lambda conn, cursor, statement, *args: statements.append(statement)
+        on_commit = lambda session: commits.append(1)
+        event.listen(db.engine, "before_cursor_execute", on_execute)
+        event.listen(db.session, "after_commit", on_commit)
+        try:
+            result, status = create_order(7, _order_data(product_ids, 2))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", on_execute)
+            event.remove(db.session, "after_commit", on_commit)
+
+        assert status == 201, result
+        item_inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO ORDER_ITEM")]
+        assert len(item_inserts) == 1, f"expected one order_item INSERT, got {len(item_inserts)}"
+        assert len(commits) == 1, f"expected one commit, got {len(commits)}"
+
+        order = Order.query.one()
+        assert OrderItem.query.filter_by(order_id=order.id).count() == 5
+        assert Transaction.query.filter_by(reference_id=str(order.id), reference_type="order").count() == 1
+        assert all(v.stock == 3 for v in ProductVariant.query.all())
+        print("✅ One order_item INSERT, one commit, ledger row present, stock reserved")
+
+
+def test_checkout_insufficient_stock_rolls_back():
+    """Insufficient stock returns 409 and leaves no order, items, ledger row or stock change"""
+    from models.order import Order, OrderItem
+    from models.product_variant import ProductVariant
+    from models.transaction import Transaction
+    from services.order_service import create_order
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        product_ids = _seed_products(3, stock=2)
+
+        result, status = create_order(7, _order_data(product_ids, 3))
+
+        assert status == 409, (status, result)
+        assert Order.query.count() == 0
+        assert OrderItem.query.count() == 0
+        assert Transaction.query.count() == 0
+        assert all(v.stock == 2 for v in ProductVariant.query.all())
+        print("✅ Insufficient stock returned 409 and rolled everything back")
+
+
+if __name__ == "__main__":
+    print("🛒 Bulk checkout test")
+    print("=" * 30)
+    test_checkout_single_insert_and_commit()
+    test_checkout_insufficient_stock_rolls_back()
+    print("\n🏁 Bulk checkout test completed!")
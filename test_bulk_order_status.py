@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for set-based bulk order status transitions (services/order_state_machine.py).
+Runs against an in-memory SQLite database, so no MySQL or AWS access is needed.
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+from flask import Flask
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    return app
+
+
+def _seed_orders(statuses):
+    """One order per status, each with two live items and one cancelled item"""
+    from models.order import Order, OrderItem
+    order_ids = []
+    for n, status in enumerate(statuses):
+        order = Order(
+            customer_id=1, order_number=f"TEST{n:04d}", status=status, payment_status="pending",
+            delivery_address="Test", delivery_type="standard", payment_method="cod" if n % 2 else "razorpay",
+            subtotal=10, total_amount=10, created_at=datetime(2026, 1, 1),
+        )
+        db.session.add(order)
+        db.session.flush()
+        for item_status in (status, status, "cancelled"):
+            db.session.add(OrderItem(order_id=order.id, product_id=1, quantity=1, unit_price=10,
+                                     total_price=10, product_name="Test", status=item_status))
+        order_ids.append(order.id)
+    db.session.commit()
+    return order_ids
+
+
+def test_bulk_transition_outcomes():
+    """Only allowed transitions move; orders, items and the status rollup move together"""
+    from models.order import Order, OrderItem
+    from models.sales_rollup import OrderDailyRollup
+    from services.order_state_machine import bulk_update_order_status
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        shipped_a, pending, delivered, shipped_b = _seed_orders(["shipped", "pending", "delivered", "shipped"])
+
+        outcomes = bulk_update_order_status([shipped_a, pending, delivered, shipped_b, 999999], "delivered")
+        db.session.commit()
+
+        assert outcomes[shipped_a] == {"result": "updated", "old_status": "shipped", "new_status": "delivered"}
+        assert outcomes[shipped_b]["result"] == "updated"
+        assert outcomes[pending]["result"] == "invalid_transition"
+        assert outcomes[delivered]["result"] == "unchanged"
+        assert outcomes[999999]["result"] == "not_found"
+
+        assert db.session.get(Order, pending).status == "pending"
+        assert db.session.get(Order, shipped_b).payment_status == "completed"  # COD paid on delivery
+        item_statuses = sorted(i.status for i in OrderItem.query.filter_by(order_id=shipped_a))
+        assert item_statuses == ["cancelled", "delivered", "delivered"]
+
+        rollup = {r.status: r.order_count for r in OrderDailyRollup.query}
+        assert rollup.get("shipped", 0) == 0 and rollup["delivered"] == 3, rollup
+        print("✅ Allowed transitions applied; items and rollup followed; others reported")
+
+
+def test_bulk_transition_rejects_bad_input():
+    """Cancelling is not a bulk target and ids must be integers"""
+    from services.order_state_machine import bulk_update_order_status
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        for order_ids, status in (([1], "cancelled"), (["x"], "shipped"), ([], "shipped")):
+            try:
+                bulk_update_order_status(order_ids, status)
+            except ValueError:
+                continue
+            raise AssertionError(f"expected ValueError for {order_ids!r} -> {status}")
+        print("✅ Invalid bulk requests rejected")
+
+
+if __name__ == "__main__":
+    print("🔄 Bulk order status test")
+    print("=" * 30)
+    test_bulk_transition_outcomes()
+    test_bulk_transition_rejects_bad_input()
+    print("\n🏁 Bulk order status test completed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-row fragment cache (utils/fragment_cache.py).
+Runs against an in-memory SQLite database, so no MySQL or AWS access is needed.
+"""
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+from flask import Flask
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    return app
+
+
+def _seed_product():
+    from models.category import Category
+    from models.product import Product
+    category = Category(category_name="Test", description="Test category")
+    db.session.add(category)
+    db.session.flush()
+    product = Product(pname="Old name", price=10, cid=category.id, image="a.jpg,b.jpg",
+                      colors=json.dumps([{"name": "Red", "sizeCounts": {"M": 2}}]))
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def test_same_second_edit_is_not_stale():
+    """An edit that leaves updated_at unchanged still produces a fresh fragment"""
+    from utils.fragment_cache import clear_fragments
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        clear_fragments()
+        product = _seed_product()
+        stamp = product.updated_at
+        assert product.to_dict()["pname"] == "Old name"
+
+        product.pname = "New name"
+        product.price = 20
+        db.session.commit()
+        # Simulate the second write landing in the same DATETIME second
+        db.session.execute(db.text("UPDATE product SET updated_at = :stamp"), {"stamp": stamp})
+        db.session.commit()
+
+        data = product.to_dict()
+        assert product.updated_at == stamp
+        assert (data["pname"], data["price"]) == ("New name", 20), data
+        print("✅ Same-second edit served fresh")
+
+
+def test_caller_mutation_does_not_leak():
+    """Mutating nested lists / dicts of a returned fragment leaves the cache intact"""
+    from utils.fragment_cache import clear_fragments
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        clear_fragments()
+        product = _seed_product()
+
+        first = product.to_dict()
+        first["images"].append("injected.jpg")
+        first["colors"][0]["name"] = "Mutated"
+
+        second = product.to_dict()
+        assert second["images"] == ["a.jpg", "b.jpg"], second["images"]
+        assert second["colors"][0]["name"] == "Red"
+        print("✅ Caller mutations do not reach the cache")
+
+
+if __name__ == "__main__":
+    print("🧊 Fragment cache test")
+    print("=" * 30)
+    test_same_second_edit_is_not_stale()
+    test_caller_mutation_does_not_leak()
+    print("\n🏁 Fragment cache test completed!")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for Idempotency-Key replay on customer mutations.
+Runs against an in-memory SQLite database, so no MySQL or AWS access is needed.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+import jwt
+from flask import Flask, jsonify
+from config import Config
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    from routes.wallet import wallet_bp
+    app.register_blueprint(wallet_bp, url_prefix="/api/wallet")
+    return app
+
+
+def _seed_customer():
+    from models.customer import Customer
+    customer = Customer(username="idem", email="idem@example.com", password_hash="x")
+    db.session.add(customer)
+    db.session.commit()
+    return customer.id
+
+
+def _headers(customer_id, key=None):
+    token = jwt.encode({"id": customer_id}, Config.SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return headers
+
+
+def test_wallet_add_money_replay():
+    """A retried add-money with the same key is replayed, not credited twice"""
+    from models.wallet import Wallet
+    from utils.crypto import encrypt_payload
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        customer_id = _seed_customer()
+        client = app.test_client()
+        headers = _headers(customer_id, key="wallet-retry-1")
+
+        first = client.post("/api/wallet/add-money", json={"payload": encrypt_payload({"amount": 50})}, headers=headers)
+        # The retry is re-encrypted, as the frontend would do
+        retry = client.post("/api/wallet/add-money", json={"payload": encrypt_payload({"amount": 50})}, headers=headers)
+
+        assert first.status_code == 200, first.get_json()
+        assert retry.status_code == 200
+        assert retry.headers.get("Idempotent-Replayed") == "true"
+        assert retry.data == first.data
+        assert Wallet.query.filter_by(customer_id=customer_id).one().balance == 50
+
+        mismatch = client.post("/api/wallet/add-money", json={"payload": encrypt_payload({"amount": 60})}, headers=headers)
+        assert mismatch.status_code == 422
+        assert Wallet.query.filter_by(customer_id=customer_id).one().balance == 50
+        print("✅ Retry replayed the stored response; different body rejected with 422")
+
+
+def test_unrecorded_response_is_never_rerun():
+    """If the response cannot be stored, later retries get 409 instead of running again"""
+    import utils.idempotency as idempotency
+    from models.idempotency_key import IdempotencyKey
+    from utils.auth import require_customer_auth
+
+    app = _make_app()
+    calls = []
+
+    @app.route("/api/test-idempotent", methods=["POST"])
+    @require_customer_auth
+    @idempotency.idempotent("test.unrecorded")
+    def mutate(current_customer):
+        calls.append(1)
+        return jsonify({"success": True}), 200
+
+    def failing_complete(claim_id, response):
+        raise RuntimeError("simulated failure storing the response")
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        headers = _headers(1, key="unrecorded-1")
+
+        original_complete = idempotency._complete
+        idempotency._complete = failing_complete
+        try:
+            first = client.post("/api/test-idempotent", json={}, headers=headers)
+        finally:
+            idempotency._complete = original_complete
+        assert first.status_code == 200
+        assert IdempotencyKey.query.one().status == "completed_unrecorded"
+
+        retry = client.post("/api/test-idempotent", json={}, headers=headers)
+        assert retry.status_code == 409
+        assert len(calls) == 1
+        print("✅ Unrecorded completion answers 409 and never re-runs the mutation")
+
+
+if __name__ == "__main__":
+    print("🔁 Idempotency-Key test")
+    print("=" * 30)
+    test_wallet_add_money_replay()
+    test_unrecorded_response_is_never_rerun()
+    print("\n🏁 Idempotency-Key test completed!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for image derivatives: a .webp original must survive derivative generation.
+Runs against an in-memory SQLite database and a temporary local storage directory.
+"""
+import io
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+from flask import Flask
+from PIL import Image
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    return app
+
+
+def _webp_bytes(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, format="WEBP", lossless=True)
+    return output.getvalue()
+
+
+def test_webp_original_is_not_overwritten():
+    """Deriving from a .webp upload leaves the original bytes untouched"""
+    from utils.s3_service import S3Service, LocalDiskBackend, get_storage, set_storage
+    from services.image_derivative_service import generate_image_derivatives
+
+    app = _make_app()
+    previous = get_storage()
+    with tempfile.TemporaryDirectory() as storage_dir, app.app_context():
+        db.create_all()
+        storage = S3Service(backend=LocalDiskBackend(base_dir=storage_dir))
+        set_storage(storage)
+        try:
+            original = _webp_bytes(900, 600)
+            url = storage.upload_bytes(original, "products/1/photo.webp", "image/webp")
+
+            variants = generate_image_derivatives([(url, original)])[url]
+
+            assert storage.read_file(url) == original, "original .webp was overwritten"
+            assert url not in variants.values()
+            assert variants["webp"].endswith("photo_full.webp"), variants["webp"]
+            assert variants["w400"].endswith("photo_w400.webp"), variants["w400"]
+            print("✅ .webp original unchanged; derivatives stored under their own keys")
+        finally:
+            set_storage(previous)
+
+
+if __name__ == "__main__":
+    print("🖼️ Image derivative test")
+    print("=" * 30)
+    test_webp_original_is_not_overwritten()
+    print("\n🏁 Image derivative test completed!")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental sales / order rollups (services/sales_rollup_service.py).
+Runs against an in-memory SQLite database, so no MySQL or AWS access is needed.
+"""
+import os
+import sys
+import json
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+from flask import Flask
+from extensions import db
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    # Same model registrations as app.py, so every relationship resolves
+    import models  # noqa: F401
+    from models.delivery_loyalty import Delivery_Loyalty  # noqa: F401
+    from models.wallet import Wallet, WalletTransaction  # noqa: F401
+    from models.transaction import Transaction  # noqa: F401
+    from models.earnings_management import EarningsManagement  # noqa: F401
+    from models.otp import OTP  # noqa: F401
+    from models.subcategory import SubCategory  # noqa: F401
+    return app
+
+
+def _seed_products(count):
+    from models.category import Category
+    from models.product import Product
+    from models.product_variant import ProductVariant
+
+    category = Category(category_name="Test", description="Test category")
+    db.session.add(category)
+    db.session.flush()
+    product_ids = []
+    for i in range(count):
+        product = Product(
+            pname=f"Test product {i}", price=100, actual_price=30 + i, cid=category.id,
+            colors=json.dumps([{"name": "red", "sizeCounts": {"M": 50}}]),
+            stock=50, quantity=50, is_active=True, visibility=True,
+        )
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(ProductVariant(product_id=product.id, color="red", size="M", stock=50))
+        product_ids.append(product.id)
+    db.session.commit()
+    return product_ids
+
+
+def _orm_order(number, product_ids, created_at, status="pending"):
+    """An order and its items added through the ORM (flush hook path)"""
+    from models.order import Order, OrderItem
+    order = Order(
+        customer_id=1, order_number=f"ROLLUP{number:04d}", status=status, payment_status="pending",
+        delivery_address="Test", delivery_type="standard", payment_method="cod",
+        subtotal=0, total_amount=0, created_at=created_at,
+    )
+    db.session.add(order)
+    db.session.flush()
+    for quantity, product_id in enumerate(product_ids, start=1):
+        db.session.add(OrderItem(order_id=order.id, product_id=product_id, quantity=quantity,
+                                 unit_price=100, total_price=100 * quantity, product_name="Test",
+                                 status=status))
+        order.total_amount += 100 * quantity
+    order.subtotal = order.total_amount
+    db.session.commit()
+    return order.id
+
+
+def _checkout(product_ids, quantity):
+    """An order created by create_order (bulk item INSERT + apply_items_inserted)"""
+    from models.order import Order
+    from services.order_service import create_order
+    items = [{"product_id": pid, "size": "M", "color": "red", "quantity": quantity, "price": 100}
+             for pid in product_ids]
+    total = 100 * quantity * len(items)
+    result, status = create_order(7, {"items": items, "delivery_address": {"city": "Test"},
+                                      "payment_method": "cod", "subtotal": total, "total": total})
+    assert status == 201, result
+    return db.session.query(db.func.max(Order.id)).scalar()
+
+
+def _rollup_state():
+    """Both rollup tables as comparable dicts; empty buckets are dropped, as a rebuild never writes them"""
+    from models.sales_rollup import SalesDailyRollup, OrderDailyRollup
+    items = {
+        (str(r.day), r.product_id, r.status): (r.quantity, round(r.revenue, 2), round(r.cost, 2))
+        for r in SalesDailyRollup.query
+        if r.quantity or abs(r.revenue) > 1e-9 or abs(r.cost) > 1e-9
+    }
+    orders = {
+        (str(r.day), r.status): (r.order_count, round(r.order_amount, 2))
+        for r in OrderDailyRollup.query
+        if r.order_count or abs(r.order_amount) > 1e-9
+    }
+    return items, orders
+
+
+def test_incremental_rollups_match_rebuild():
+    """Creates, status changes, quantity edits and deletes leave the rollups equal to a full rebuild"""
+    from models.order import Order, OrderItem
+    from services.order_state_machine import bulk_update_order_status
+    from services.sales_rollup_service import rebuild_sales_rollups
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        p1, p2, p3 = _seed_products(3)
+
+        # Creates: ORM orders on two different days, plus bulk-inserted checkouts
+        old_order = _orm_order(1, [p1, p2], datetime(2026, 1, 1, 10))
+        edited_order = _orm_order(2, [p1, p2, p3], datetime(2026, 1, 2, 10))
+        deleted_order = _orm_order(3, [p3], datetime(2026, 1, 2, 11))
+        checkout_a = _checkout([p1, p2], 2)
+        checkout_b = _checkout([p2, p3], 1)
+
+        # Re-status through the ORM (items move bucket with their order)
+        order = db.session.get(Order, old_order)
+        order.status = "confirmed"
+        db.session.commit()
+
+        # Quantity edit and item delete through the ORM
+        item = OrderItem.query.filter_by(order_id=edited_order, product_id=p1).one()
+        item.quantity = 5
+        item.total_price = 500
+        db.session.delete(OrderItem.query.filter_by(order_id=edited_order, product_id=p3).one())
+        order = db.session.get(Order, edited_order)
+        order.total_amount = 500 + 200
+        db.session.commit()
+
+        # Whole order delete (items go with it)
+        db.session.delete(db.session.get(Order, deleted_order))
+        db.session.commit()
+
+        # Set-based re-status (apply_order_status_change)
+        outcomes = bulk_update_order_status([checkout_a, checkout_b, old_order], "processing")
+        db.session.commit()
+        assert all(o["result"] == "updated" for o in outcomes.values()), outcomes
+
+        incremental = _rollup_state()
+        assert incremental[0] and incremental[1], "rollups were never written"
+        rebuild_sales_rollups()
+        rebuilt = _rollup_state()
+
+        assert incremental[0] == rebuilt[0], f"sales_daily_rollup drifted:\n{incremental[0]}\n{rebuilt[0]}"
+        assert incremental[1] == rebuilt[1], f"order_daily_rollup drifted:\n{incremental[1]}\n{rebuilt[1]}"
+        print(f"✅ {len(rebuilt[0])} item buckets and {len(rebuilt[1])} order buckets match a full rebuild")
+
+
+if __name__ == "__main__":
+    print("📊 Sales rollup test")
+    print("=" * 30)
+    test_incremental_rollups_match_rebuild()
+    print("\n🏁 Sales rollup test completed!")
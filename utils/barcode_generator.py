@@ -1,35 +1,101 @@
-import random
+import os
 import string
-from datetime import datetime
+import threading
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from models.product import Product
 from extensions import db
 
+BARCODE_BLOCK_SIZE = int(os.getenv("BARCODE_BLOCK_SIZE", "1000"))
+SEQUENCE_ROW_ID = 1
+SEQUENCE_DIGITS = 13
+_SUFFIX_SPACE = 26 ** 3 * 1000
+
+
+def encode_barcode(value):
+    """
+    Encode a sequence number into the 22-char layout checked by
+    validate_barcode_format: ZT + 14 digits + 3 letters + 3 digits.
+    The digit block is "9" + the zero-padded sequence number; legacy codes
+    carry a YYYYMMDDhhmmss timestamp there, so the two never overlap. The
+    suffix is a scrambled function of the number so codes don't look sequential.
+    """
+    if not 0 < value < 10 ** SEQUENCE_DIGITS:
+        raise ValueError("Barcode sequence exhausted")
+    mixed = (value * 2654435761) % _SUFFIX_SPACE
+    letters_value, numbers = divmod(mixed, 1000)
+    letters = ""
+    for _ in range(3):
+        letters_value, index = divmod(letters_value, 26)
+        letters = string.ascii_uppercase[index] + letters
+    return f"ZT9{value:0{SEQUENCE_DIGITS}d}{letters}{numbers:03d}"
+
+
+class BarcodeAllocator:
+    """
+    Hands out unique barcodes from blocks reserved in the barcode_sequence
+    table. A block is claimed in its own short transaction, so it stays
+    reserved even if the caller's transaction rolls back; codes are then
+    issued from memory with no database round trip until the block runs out.
+    Unused codes of a block are simply skipped when the process exits.
+    """
+
+    def __init__(self, block_size=BARCODE_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def _reserve_block(self, size):
+        from models.barcode_sequence import BarcodeSequence
+        table = BarcodeSequence.__table__
+        for attempt in range(3):
+            try:
+                with db.engine.begin() as connection:
+                    start = connection.execute(
+                        select(table.c.next_value).where(table.c.id == SEQUENCE_ROW_ID).with_for_update()
+                    ).scalar()
+                    if start is None:
+                        start = 1
+                        connection.execute(table.insert().values(id=SEQUENCE_ROW_ID, next_value=start + size))
+                    else:
+                        connection.execute(
+                            table.update().where(table.c.id == SEQUENCE_ROW_ID)
+                            .values(next_value=table.c.next_value + size)
+                        )
+                return start, start + size
+            except IntegrityError:
+                # Another worker seeded the row first; read it again
+                continue
+        raise ValueError("Unable to reserve a barcode block")
+
+    def allocate(self, count=1):
+        """Return `count` unique barcodes"""
+        barcodes = []
+        with self._lock:
+            while len(barcodes) < count:
+                if self._next >= self._end:
+                    self._next, self._end = self._reserve_block(max(self.block_size, count - len(barcodes)))
+                take = min(count - len(barcodes), self._end - self._next)
+                barcodes.extend(encode_barcode(value) for value in range(self._next, self._next + take))
+                self._next += take
+        return barcodes
+
+
+barcode_allocator = BarcodeAllocator()
+
+
 def generate_unique_barcode():
     """
     Generate a unique barcode for products.
-    Format: ZT + timestamp + random string
-    Example: ZT20241201123456ABC123
+    Format: ZT + 14 digits + 3 letters + 3 numbers (see encode_barcode)
+    Example: ZT90000000001234KQZ761
     """
-    max_attempts = 10
-    
-    for attempt in range(max_attempts):
-        # Get current timestamp
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        
-        # Generate random string (3 letters + 3 numbers)
-        random_letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-        random_numbers = ''.join(random.choices(string.digits, k=3))
-        
-        # Combine to create barcode
-        barcode = f"ZT{timestamp}{random_letters}{random_numbers}"
-        
-        # Check if barcode already exists
-        existing_product = Product.query.filter_by(barcode=barcode).first()
-        if not existing_product:
-            return barcode
-    
-    # If we couldn't generate a unique barcode after max attempts, raise an error
-    raise ValueError("Unable to generate unique barcode after multiple attempts")
+    return barcode_allocator.allocate(1)[0]
+
+def generate_unique_barcodes(count):
+    """Generate `count` unique barcodes for bulk product creation"""
+    return barcode_allocator.allocate(count)
 
 def regenerate_barcode(product_id):
     """
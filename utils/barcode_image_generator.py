@@ -1,9 +1,4 @@
-import os
-import io
-from barcode import Code128
-from barcode.writer import ImageWriter
-from PIL import Image, ImageDraw, ImageFont
-import base64
+from utils.barcode_renderer import get_barcode_data_uri
 
 def generate_barcode_image(barcode_text, product_name=None, product_id=None):
     """
@@ -18,106 +13,8 @@ def generate_barcode_image(barcode_text, product_name=None, product_id=None):
         str: Base64 encoded image data
     """
     try:
-        # Create barcode
-        barcode = Code128(barcode_text, writer=ImageWriter())
-        
-        # Generate barcode image with better scanning properties
-        barcode_buffer = io.BytesIO()
-        barcode.write(barcode_buffer, options={
-            'module_width': 0.6,  # Increased for better scanning
-            'module_height': 20.0,  # Increased height for better scanning
-            'quiet_zone': 8.0,  # Increased quiet zone
-            'font_size': 12,  # Larger font for better readability
-            'text_distance': 8.0,  # More space between barcode and text
-            'background': 'white',
-            'foreground': 'black',
-            'write_text': True,  # Ensure text is written
-            'center_text': True,  # Center the text
-        })
-        
-        # Open the barcode image
-        barcode_image = Image.open(barcode_buffer)
-        
-        # Create a larger canvas for the sticker (increased size for better scanning)
-        sticker_width = 400
-        sticker_height = 250
-        sticker = Image.new('RGB', (sticker_width, sticker_height), 'white')
-        
-        # Calculate positions
-        barcode_width, barcode_height = barcode_image.size
-        barcode_x = (sticker_width - barcode_width) // 2
-        barcode_y = 20
-        
-        # Paste barcode onto sticker
-        sticker.paste(barcode_image, (barcode_x, barcode_y))
-        
-        # Add text
-        draw = ImageDraw.Draw(sticker)
-        
-        # Try to use a better font, fallback to default
-        try:
-            font_large = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 20)
-            font_medium = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 16)
-            font_small = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 12)
-        except:
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 20)
-                font_medium = ImageFont.truetype("arial.ttf", 16)
-                font_small = ImageFont.truetype("arial.ttf", 12)
-            except:
-                try:
-                    # Try to load default font with larger size
-                    font_large = ImageFont.load_default()
-                    font_medium = ImageFont.load_default()
-                    font_small = ImageFont.load_default()
-                except:
-                    font_large = None
-                    font_medium = None
-                    font_small = None
-        
-        # Add company name at top
-        company_text = "ZinToo"
-        company_bbox = draw.textbbox((0, 0), company_text, font=font_large)
-        company_width = company_bbox[2] - company_bbox[0]
-        company_x = (sticker_width - company_width) // 2
-        draw.text((company_x, 5), company_text, fill='black', font=font_large)
-        
-        # Add barcode number below barcode
-        barcode_number_y = barcode_y + barcode_height + 10
-        barcode_bbox = draw.textbbox((0, 0), barcode_text, font=font_medium)
-        barcode_text_width = barcode_bbox[2] - barcode_bbox[0]
-        barcode_text_x = (sticker_width - barcode_text_width) // 2
-        draw.text((barcode_text_x, barcode_number_y), barcode_text, fill='black', font=font_medium)
-        
-        # Add product info if provided
-        y_offset = barcode_number_y + 25
-        
-        if product_name:
-            # Truncate product name if too long
-            display_name = product_name[:25] + "..." if len(product_name) > 25 else product_name
-            name_bbox = draw.textbbox((0, 0), display_name, font=font_small)
-            name_width = name_bbox[2] - name_bbox[0]
-            name_x = (sticker_width - name_width) // 2
-            draw.text((name_x, y_offset), display_name, fill='black', font=font_small)
-            y_offset += 20
-        
-        if product_id:
-            id_text = f"ID: {product_id}"
-            id_bbox = draw.textbbox((0, 0), id_text, font=font_small)
-            id_width = id_bbox[2] - id_bbox[0]
-            id_x = (sticker_width - id_width) // 2
-            draw.text((id_x, y_offset), id_text, fill='black', font=font_small)
-        
-        # Convert to base64
-        output_buffer = io.BytesIO()
-        sticker.save(output_buffer, format='PNG')
-        output_buffer.seek(0)
-        
-        # Encode as base64
-        image_base64 = base64.b64encode(output_buffer.getvalue()).decode('utf-8')
-        
-        return f"data:image/png;base64,{image_base64}"
-        
+        # Rendered once per (barcode, name, id) and then served from the disk cache
+        return get_barcode_data_uri(barcode_text, product_name, product_id, layout="label")
     except Exception as e:
         print(f"Error generating barcode image: {str(e)}")
         return None
@@ -0,0 +1,185 @@
+"""
+Barcode sticker rendering with a per-process font cache and an on-disk
+PNG cache.
+
+Stickers are content-addressed by (layout, layout version, barcode, product
+name, product id): the same inputs always produce the same file, so the
+cache key doubles as the HTTP ETag. Bump a layout's version whenever its
+drawing code changes so old files stop being served.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+from functools import lru_cache
+from barcode import Code128
+from barcode.writer import ImageWriter
+from PIL import Image, ImageDraw, ImageFont
+
+LAYOUT_VERSIONS = {"label": 1, "delivery": 1}
+DEFAULT_LAYOUT = "delivery"
+
+BARCODE_CACHE_DIR = os.getenv(
+    "BARCODE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "barcode_cache"),
+)
+
+FONT_CANDIDATES = [
+    "/System/Library/Fonts/Arial.ttf",
+    "arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+]
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """First available TrueType font at `size`, resolved once per process"""
+    candidates = [os.getenv("BARCODE_FONT_PATH")] + FONT_CANDIDATES
+    for path in candidates:
+        if not path:
+            continue
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _render_code128(barcode_text, options):
+    # render() hands back the PIL image directly; write() would PNG-encode it
+    # only for us to decode it again
+    return Code128(barcode_text, writer=ImageWriter()).render({
+        'background': 'white',
+        'foreground': 'black',
+        'center_text': True,
+        **options,
+    })
+
+
+def _draw_centered(draw, width, y, text, font, fill='black'):
+    bbox = draw.textbbox((0, 0), text, font=font)
+    draw.text(((width - (bbox[2] - bbox[0])) // 2, y), text, fill=fill, font=font)
+
+
+def _draw_label(barcode_text, product_name, product_id):
+    """400x250 product label with the number printed by the barcode writer"""
+    barcode_image = _render_code128(barcode_text, {
+        'module_width': 0.6,
+        'module_height': 20.0,
+        'quiet_zone': 8.0,
+        'font_size': 12,
+        'text_distance': 8.0,
+        'write_text': True,
+    })
+    sticker_width, sticker_height = 400, 250
+    sticker = Image.new('RGB', (sticker_width, sticker_height), 'white')
+    barcode_width, barcode_height = barcode_image.size
+    barcode_y = 20
+    sticker.paste(barcode_image, ((sticker_width - barcode_width) // 2, barcode_y))
+
+    draw = ImageDraw.Draw(sticker)
+    _draw_centered(draw, sticker_width, 5, "ZinToo", load_font(20))
+    barcode_number_y = barcode_y + barcode_height + 10
+    _draw_centered(draw, sticker_width, barcode_number_y, barcode_text, load_font(16))
+
+    y_offset = barcode_number_y + 25
+    if product_name:
+        display_name = product_name[:25] + "..." if len(product_name) > 25 else product_name
+        _draw_centered(draw, sticker_width, y_offset, display_name, load_font(12))
+        y_offset += 20
+    if product_id:
+        _draw_centered(draw, sticker_width, y_offset, f"ID: {product_id}", load_font(12))
+    return sticker, {}
+
+
+def _draw_delivery(barcode_text, product_name, product_id):
+    """500x300 delivery sticker at 300 DPI"""
+    barcode_image = _render_code128(barcode_text, {
+        'module_width': 0.6,
+        'module_height': 20.0,
+        'quiet_zone': 6.0,
+        'font_size': 12,
+        'text_distance': 5.0,
+        'write_text': False,
+        'dpi': 300,
+    })
+    sticker_width, sticker_height = 500, 300
+    sticker = Image.new('RGB', (sticker_width, sticker_height), 'white')
+    barcode_width, barcode_height = barcode_image.size
+    barcode_y = 20
+    sticker.paste(barcode_image, ((sticker_width - barcode_width) // 2, barcode_y))
+
+    draw = ImageDraw.Draw(sticker)
+    font_small = load_font(14)
+    _draw_centered(draw, sticker_width, 5, "ZinToo Delivery", load_font(24))
+
+    barcode_number_y = min(barcode_y + barcode_height + 15, sticker_height - 30)
+    _draw_centered(draw, sticker_width, barcode_number_y, barcode_text, load_font(18))
+
+    y_offset = barcode_number_y + 30
+    if product_name:
+        display_name = product_name[:30] + "..." if len(product_name) > 30 else product_name
+        _draw_centered(draw, sticker_width, y_offset, display_name, font_small)
+        y_offset += 25
+    if product_id:
+        _draw_centered(draw, sticker_width, y_offset, f"Product ID: {product_id}", font_small)
+        y_offset += 25
+    _draw_centered(draw, sticker_width, y_offset, "SCAN FOR DELIVERY", font_small, fill='red')
+
+    draw.rectangle([0, 0, sticker_width - 1, sticker_height - 1], outline='black', width=2)
+    return sticker, {'dpi': (300, 300)}
+
+
+_LAYOUT_DRAWERS = {"label": _draw_label, "delivery": _draw_delivery}
+
+
+def render_barcode_png(barcode_text, product_name=None, product_id=None, layout=DEFAULT_LAYOUT):
+    """Render a sticker to PNG bytes without touching the cache"""
+    sticker, save_options = _LAYOUT_DRAWERS[layout](barcode_text, product_name, product_id)
+    output = io.BytesIO()
+    # Flat two-colour artwork: fast compression is nearly as small as the default
+    sticker.save(output, format='PNG', compress_level=1, **save_options)
+    return output.getvalue()
+
+
+def sticker_cache_key(barcode_text, product_name=None, product_id=None, layout=DEFAULT_LAYOUT):
+    if layout not in LAYOUT_VERSIONS:
+        raise ValueError(f"layout must be one of {', '.join(LAYOUT_VERSIONS)}")
+    material = "\x1f".join([
+        layout, str(LAYOUT_VERSIONS[layout]), barcode_text, product_name or "", str(product_id or ""),
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get_barcode_png(barcode_text, product_name=None, product_id=None, layout=DEFAULT_LAYOUT):
+    """
+    Return (png_bytes, etag) for a sticker, rendering it only when it is not
+    cached on disk yet.
+    """
+    key = sticker_cache_key(barcode_text, product_name, product_id, layout)
+    path = os.path.join(BARCODE_CACHE_DIR, key[:2], f"{key}.png")
+    try:
+        with open(path, "rb") as cached_file:
+            return cached_file.read(), key
+    except FileNotFoundError:
+        pass
+
+    png = render_barcode_png(barcode_text, product_name, product_id, layout)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(png)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[BARCODE CACHE] Could not cache {key}: {str(e)}")
+    return png, key
+
+
+def get_barcode_data_uri(barcode_text, product_name=None, product_id=None, layout=DEFAULT_LAYOUT):
+    """Cached sticker as a data: URI, for the printable HTML pages"""
+    png, _ = get_barcode_png(barcode_text, product_name, product_id, layout)
+    return f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
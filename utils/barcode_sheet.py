@@ -0,0 +1,146 @@
+"""
+Printable multi-label barcode sheets.
+
+Stickers are rendered into the barcode_renderer disk cache by a process
+pool (rendering is CPU bound and holds the GIL), then composed onto A4
+pages: as HTML that references the cached /barcode.png URLs, or as 1-bit
+page bitmaps for PNG / PDF output. This module deliberately imports no
+Flask or database code so spawned pool workers start quickly.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.barcode_renderer import get_barcode_png, DEFAULT_LAYOUT
+
+SHEET_DPI = 200
+PAGE_SIZE = (1654, 2339)  # A4 at SHEET_DPI
+PAGE_MARGIN = 40
+LABEL_GUTTER = 12
+STICKER_SIZES = {"label": (400, 250), "delivery": (500, 300)}
+RENDER_CHUNK_SIZE = 25
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process pool shared by all requests in this worker, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("BARCODE_SHEET_WORKERS", "0")) or os.cpu_count() or 1
+            # spawn: never fork a process that holds DB connections and threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def grid_for_layout(layout):
+    """(columns, rows) of stickers that fit on one page"""
+    width, height = STICKER_SIZES[layout]
+    columns = (PAGE_SIZE[0] - 2 * PAGE_MARGIN + LABEL_GUTTER) // (width + LABEL_GUTTER)
+    rows = (PAGE_SIZE[1] - 2 * PAGE_MARGIN + LABEL_GUTTER) // (height + LABEL_GUTTER)
+    return max(1, columns), max(1, rows)
+
+
+def paginate(labels, layout):
+    columns, rows = grid_for_layout(layout)
+    per_page = columns * rows
+    return [labels[i:i + per_page] for i in range(0, len(labels), per_page)]
+
+
+def _warm_label(args):
+    barcode_text, product_name, product_id, layout = args
+    get_barcode_png(barcode_text, product_name, product_id, layout)
+    return product_id
+
+
+def _compose_page(args):
+    """Compose one page in a pool worker; returns raw 1-bit pixel data"""
+    labels, layout = args
+    columns, _ = grid_for_layout(layout)
+    width, height = STICKER_SIZES[layout]
+    page = Image.new("1", PAGE_SIZE, 1)
+    for index, (barcode_text, product_name, product_id) in enumerate(labels):
+        png, _ = get_barcode_png(barcode_text, product_name, product_id, layout)
+        sticker = Image.open(io.BytesIO(png)).convert("L").point(lambda v: 255 if v > 160 else 0, mode="1")
+        row, column = divmod(index, columns)
+        x = PAGE_MARGIN + column * (width + LABEL_GUTTER)
+        y = PAGE_MARGIN + row * (height + LABEL_GUTTER)
+        page.paste(sticker.crop((0, 0, width, height)), (x, y))
+    return page.tobytes()
+
+
+def warm_sticker_cache(labels, layout=DEFAULT_LAYOUT):
+    """Render every (barcode, name, product_id) label into the disk cache in parallel"""
+    unique = list(dict.fromkeys(labels))
+    list(_get_pool().map(_warm_label, [(*label, layout) for label in unique], chunksize=RENDER_CHUNK_SIZE))
+    return len(unique)
+
+
+def render_sheet_pages(labels, layout=DEFAULT_LAYOUT):
+    """Yield each page as a 1-bit PIL image, composed in parallel"""
+    pages = paginate(labels, layout)
+    for data in _get_pool().map(_compose_page, [(page, layout) for page in pages]):
+        yield Image.frombytes("1", PAGE_SIZE, data)
+
+
+def render_sheet_pdf(labels, layout=DEFAULT_LAYOUT):
+    """Whole sheet as PDF bytes (one A4 page per grid of stickers)"""
+    pages = list(render_sheet_pages(labels, layout))
+    if not pages:
+        return b""
+    output = io.BytesIO()
+    pages[0].save(output, format="PDF", save_all=True, append_images=pages[1:], resolution=SHEET_DPI)
+    return output.getvalue()
+
+
+def render_sheet_png(labels, page_number=1, layout=DEFAULT_LAYOUT):
+    """A single page of the sheet as PNG bytes (page_number is 1-based)"""
+    pages = paginate(labels, layout)
+    if not 1 <= page_number <= len(pages):
+        raise ValueError(f"page must be between 1 and {len(pages)}")
+    data = _get_pool().submit(_compose_page, (pages[page_number - 1], layout)).result()
+    output = io.BytesIO()
+    Image.frombytes("1", PAGE_SIZE, data).save(output, format="PNG", dpi=(SHEET_DPI, SHEET_DPI))
+    return output.getvalue()
+
+
+def iter_sheet_html(labels, image_url, layout=DEFAULT_LAYOUT):
+    """
+    Stream a printable HTML sheet page by page. `image_url(product_id)`
+    returns the sticker URL; the stickers should already be in the cache.
+    """
+    columns, rows = grid_for_layout(layout)
+    width, height = STICKER_SIZES[layout]
+    # Physical sticker size at SHEET_DPI so the printout matches the PDF
+    width_in, height_in = width / SHEET_DPI, height / SHEET_DPI
+    yield f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Barcode Sheet ({len(labels)} labels)</title>
+    <style>
+        @page {{ size: A4; margin: 0; }}
+        body {{ margin: 0; font-family: Arial, sans-serif; }}
+        .page {{
+            width: 210mm; height: 297mm; box-sizing: border-box; padding: {PAGE_MARGIN / SHEET_DPI}in;
+            display: grid; grid-template-columns: repeat({columns}, {width_in}in);
+            grid-auto-rows: {height_in}in; gap: {LABEL_GUTTER / SHEET_DPI}in;
+            page-break-after: always;
+        }}
+        .page img {{ width: {width_in}in; height: {height_in}in; object-fit: contain; }}
+        @media screen {{ .page {{ border: 1px dashed #999; margin: 10px auto; }} }}
+    </style>
+</head>
+<body>
+"""
+    for page in paginate(labels, layout):
+        cells = "".join(
+            f'<img src="{image_url(product_id)}" alt="{barcode_text}">\n'
+            for barcode_text, _, product_id in page
+        )
+        yield f'<div class="page">\n{cells}</div>\n'
+    yield "</body>\n</html>\n"
@@ -0,0 +1,112 @@
+# utils/catalog_cache.py
+"""
+Versioned in-process cache for serialized catalog data (products, categories,
+subcategories, widgets).
+
+Entries are stored together with the catalog version they were built for.
+Writers call bump_catalog_version() inside their transaction; every worker
+re-reads the version row at most once per CATALOG_CACHE_VERSION_TTL seconds,
+so a write becomes visible across gunicorn workers within that TTL.
+CATALOG_CACHE_MAX_AGE additionally bounds how stale stock counts inside cached
+product dicts can get, since checkout does not bump the version.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from extensions import db
+
+CATALOG_VERSION_ROW_ID = 1
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (version, built_at, value)
+_version_state = {"version": None, "checked_at": 0.0}
+
+
+def _config(name, default):
+    try:
+        value = current_app.config.get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.getenv(name, default)
+    return type(default)(value)
+
+
+def _is_enabled():
+    flag = _config("CATALOG_CACHE_ENABLED", "true")
+    return flag.lower() in ("1", "true", "yes", "on")
+
+
+def _read_version_row():
+    from models.catalog_version import CatalogVersion
+    row = db.session.get(CatalogVersion, CATALOG_VERSION_ROW_ID)
+    return row.version if row else 0
+
+
+def get_catalog_version():
+    """Current catalog version, polled from the database at most once per TTL"""
+    ttl = _config("CATALOG_CACHE_VERSION_TTL", 2.0)
+    now = time.monotonic()
+    if _version_state["version"] is not None and now - _version_state["checked_at"] < ttl:
+        return _version_state["version"]
+    try:
+        version = _read_version_row()
+    except Exception as e:
+        # Table missing / DB hiccup: fall back to the last known version
+        print(f"[CATALOG CACHE] Version check failed: {str(e)}")
+        version = _version_state["version"] or 0
+    _version_state["version"] = version
+    _version_state["checked_at"] = now
+    return version
+
+
+def bump_catalog_version():
+    """
+    Increment the shared catalog version as part of the caller's transaction
+    and drop this worker's cached entries immediately.
+    """
+    from models.catalog_version import CatalogVersion
+    try:
+        updated = CatalogVersion.query.filter_by(id=CATALOG_VERSION_ROW_ID).update(
+            {CatalogVersion.version: CatalogVersion.version + 1},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.session.add(CatalogVersion(id=CATALOG_VERSION_ROW_ID, version=1))
+    except Exception as e:
+        print(f"[CATALOG CACHE] Version bump failed: {str(e)}")
+    invalidate_local()
+
+
+def invalidate_local():
+    """Clear this process's cached entries and force a version re-check"""
+    with _lock:
+        _entries.clear()
+    _version_state["checked_at"] = 0.0
+
+
+def cached(key, builder):
+    """Return the cached value for `key`, building it with `builder()` on a miss"""
+    if not _is_enabled():
+        return builder()
+
+    version = get_catalog_version()
+    max_age = _config("CATALOG_CACHE_MAX_AGE", 30.0)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version and now - entry[1] < max_age:
+            _entries.move_to_end(key)
+            return entry[2]
+
+    value = builder()
+
+    max_entries = _config("CATALOG_CACHE_MAX_ENTRIES", 5000)
+    with _lock:
+        _entries[key] = (version, now, value)
+        _entries.move_to_end(key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+    return value
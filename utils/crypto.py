@@ -1,10 +1,33 @@
 # utils/crypto.py
+"""
+AES-256-CBC payload encryption shared with the web and mobile clients.
+
+A CryptoCodec holds the derived key and settings, so nothing is re-read
+per call; init_crypto(app) builds one at startup. Payloads are
+base64(iv + AES-CBC(PKCS7(json))).
+
+Clients may opt in to compression by sending
+`X-Payload-Compression: zlib`. Payloads of at least
+CRYPTO_COMPRESS_MIN_BYTES are then zlib-compressed before encryption and
+the envelope gets a "z1." prefix. Clients that did not opt in always get
+the unprefixed format. decrypt accepts both formats.
+"""
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 import base64
 import json
 import os
-from flask import current_app
+import zlib
+from flask import current_app, has_request_context, request
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; stdlib json produces the same payloads
+    orjson = None
+
+COMPRESSED_PREFIX = "z1."
+COMPRESSION_HEADER = "X-Payload-Compression"
+DEFAULT_COMPRESS_MIN_BYTES = 16 * 1024
 
 def _normalize_key(secret_str: str):
     key = secret_str.encode("utf-8")
@@ -18,41 +41,97 @@ def _normalize_key(secret_str: str):
         truncated = True
     return key, padded, truncated
 
-def _is_debug_enabled() -> bool:
-    try:
-        cfg_val = current_app.config.get("CRYPTO_DEBUG")
-    except Exception:
-        cfg_val = None
-    env_val = os.getenv("CRYPTO_DEBUG")
-    flag = cfg_val if cfg_val is not None else env_val
-    if isinstance(flag, str):
-        return flag.lower() in ("1", "true", "yes", "on")
-    return bool(flag)
-
-def encrypt_payload(data):
-    """Encrypt data using AES-256-CBC with PKCS7 padding"""
-    try:
-        secret = current_app.config.get("CRYPTO_SECRET", "default_secret")
-        key, padded, truncated = _normalize_key(secret)
-        debug = _is_debug_enabled()
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+class CryptoCodec:
+    """Encrypts / decrypts client payloads with a key derived once"""
 
-        json_data = json.dumps(data)
+    def __init__(self, secret, debug=False, compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES, use_orjson=True):
+        self.key, padded, truncated = _normalize_key(secret)
+        self.debug = debug
+        self.compress_min_bytes = compress_min_bytes
+        self.use_orjson = bool(use_orjson and orjson)
         if debug:
-            print(f"[crypto][enc] json_len={len(json_data)} key_len_in={len(secret)} key_len_used={len(key)} padded={padded} truncated={truncated}")
+            print(f"[crypto] key_len_in={len(secret)} key_len_used={len(self.key)} padded={padded} truncated={truncated} orjson={self.use_orjson}")
+
+    def dumps(self, data) -> bytes:
+        if self.use_orjson:
+            try:
+                return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # e.g. ints beyond 64 bits; stdlib handles them
+        return json.dumps(data).encode("utf-8")
+
+    def loads(self, raw: bytes):
+        return orjson.loads(raw) if self.use_orjson else json.loads(raw)
+
+    def encrypt(self, data, compress=False) -> str:
+        plaintext = self.dumps(data)
+        compressed = compress and len(plaintext) >= self.compress_min_bytes
+        if compressed:
+            plaintext = zlib.compress(plaintext, 6)
 
         iv = os.urandom(16)
-        if debug:
-            print(f"[crypto][enc] iv={iv.hex()}")
+        cipher = AES.new(self.key, AES.MODE_CBC, iv)
+        encrypted_data = cipher.encrypt(pad(plaintext, AES.block_size))
+        result = base64.b64encode(iv + encrypted_data).decode("ascii")
+        if self.debug:
+            print(f"[crypto][enc] plain_len={len(plaintext)} compressed={compressed} iv={iv.hex()} b64_len={len(result)}")
+        return COMPRESSED_PREFIX + result if compressed else result
+
+    def decrypt(self, encrypted_data):
+        compressed = isinstance(encrypted_data, str) and encrypted_data.startswith(COMPRESSED_PREFIX)
+        if compressed:
+            encrypted_data = encrypted_data[len(COMPRESSED_PREFIX):]
+        raw_data = base64.b64decode(encrypted_data)
+        iv = raw_data[:16]
+        ciphertext = raw_data[16:]
+        if self.debug:
+            print(f"[crypto][dec] raw_len={len(raw_data)} iv={iv.hex()} ct_len={len(ciphertext)} compressed={compressed}")
 
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-        padded_data = pad(json_data.encode('utf-8'), AES.block_size)
-        encrypted_data = cipher.encrypt(padded_data)
+        cipher = AES.new(self.key, AES.MODE_CBC, iv)
+        plaintext = unpad(cipher.decrypt(ciphertext), AES.block_size)
+        if compressed:
+            plaintext = zlib.decompress(plaintext)
+        return self.loads(plaintext)
 
-        result = iv + encrypted_data
-        base64_result = base64.b64encode(result).decode('utf-8')
-        if debug:
-            print(f"[crypto][enc] ciphertext_len={len(encrypted_data)} b64_len={len(base64_result)} b64_head={base64_result[:24]}")
-        return base64_result
+def build_codec(config):
+    """CryptoCodec from a Flask config mapping"""
+    debug = config.get("CRYPTO_DEBUG")
+    return CryptoCodec(
+        config.get("CRYPTO_SECRET", "default_secret"),
+        debug=_flag(debug if debug is not None else os.getenv("CRYPTO_DEBUG")),
+        compress_min_bytes=int(config.get("CRYPTO_COMPRESS_MIN_BYTES") or DEFAULT_COMPRESS_MIN_BYTES),
+    )
+
+def init_crypto(app):
+    """Build the app's codec once at startup"""
+    app.extensions["crypto_codec"] = build_codec(app.config)
+    return app.extensions["crypto_codec"]
+
+def get_codec():
+    """The current app's codec (built on first use for apps that skipped init_crypto)"""
+    app = current_app._get_current_object()
+    codec = app.extensions.get("crypto_codec")
+    if codec is None:
+        codec = init_crypto(app)
+    return codec
+
+def client_accepts_compression() -> bool:
+    return has_request_context() and request.headers.get(COMPRESSION_HEADER, "").lower() == "zlib"
+
+def encrypt_payload(data, compress=None):
+    """
+    Encrypt data using AES-256-CBC with PKCS7 padding. `compress` defaults
+    to whether the current request opted in to zlib payloads.
+    """
+    try:
+        if compress is None:
+            compress = client_accepts_compression()
+        return get_codec().encrypt(data, compress=compress)
     except Exception as e:
         print(f"❌ Backend encryption failed: {str(e)}")
         raise ValueError(f"Encryption failed: {str(e)}")
@@ -60,24 +139,7 @@ def encrypt_payload(data):
 def decrypt_payload(encrypted_data):
     """Decrypt data using AES-256-CBC with PKCS7 padding"""
     try:
-        secret = current_app.config.get("CRYPTO_SECRET", "default_secret")
-        key, padded, truncated = _normalize_key(secret)
-        debug = _is_debug_enabled()
-
-        raw_data = base64.b64decode(encrypted_data)
-        iv = raw_data[:16]
-        ciphertext = raw_data[16:]
-        if debug:
-            print(f"[crypto][dec] key_len_in={len(secret)} key_len_used={len(key)} padded={padded} truncated={truncated} raw_len={len(raw_data)} iv={iv.hex()} ct_len={len(ciphertext)}")
-
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-        decrypted_padded = cipher.decrypt(ciphertext)
-        decrypted_data = unpad(decrypted_padded, AES.block_size)
-        json_data = decrypted_data.decode('utf-8')
-        result = json.loads(json_data)
-        if debug:
-            print(f"[crypto][dec] ok json_len={len(json_data)}")
-        return result
+        return get_codec().decrypt(encrypted_data)
     except Exception as e:
         print(f"❌ Backend decryption failed: {str(e)}")
         hint = "Ensure frontend NEXT_PUBLIC_CRYPTO_SECRET equals backend CRYPTO_SECRET and both are exactly 32 ASCII characters."
@@ -0,0 +1,29 @@
+# utils/db_upsert.py
+"""
+Counter-style upsert shared by the rollup tables: add increments to the row
+with the given key, inserting it when missing.
+"""
+
+
+def upsert_increment(connection, table, keys, increments, insert_only=None):
+    """
+    keys: primary key column -> value
+    increments: column -> amount added to the existing value
+    insert_only: column -> value written only when the row is created
+    """
+    insert_only = insert_only or {}
+    if connection.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table).values(**keys, **increments, **insert_only)
+        stmt = stmt.on_duplicate_key_update(
+            **{name: table.c[name] + stmt.inserted[name] for name in increments}
+        )
+        connection.execute(stmt)
+        return
+    # Portable fallback (SQLite in local runs)
+    where = [table.c[name] == value for name, value in keys.items()]
+    result = connection.execute(
+        table.update().where(*where).values(**{name: table.c[name] + value for name, value in increments.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, **increments, **insert_only))
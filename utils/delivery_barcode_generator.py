@@ -1,9 +1,4 @@
-import os
-import io
-from barcode import Code128
-from barcode.writer import ImageWriter
-from PIL import Image, ImageDraw, ImageFont
-import base64
+from utils.barcode_renderer import get_barcode_data_uri
 
 def generate_delivery_barcode_image(barcode_text, product_name=None, product_id=None):
     """
@@ -18,136 +13,8 @@ def generate_delivery_barcode_image(barcode_text, product_name=None, product_id=
         str: Base64 encoded image data
     """
     try:
-        # Create barcode with delivery-optimized settings
-        barcode = Code128(barcode_text, writer=ImageWriter())
-        
-        # Generate barcode image with maximum scanning quality
-        barcode_buffer = io.BytesIO()
-        barcode.write(barcode_buffer, options={
-            'module_width': 0.6,  # Slightly smaller bars to fit better
-            'module_height': 20.0,  # Shorter bars to leave room for text
-            'quiet_zone': 6.0,  # Smaller quiet zone
-            'font_size': 12,  # Smaller font for barcode
-            'text_distance': 5.0,  # Less space between barcode and text
-            'background': 'white',
-            'foreground': 'black',
-            'write_text': False,  # Don't write text in barcode, we'll add it separately
-            'center_text': True,
-            'dpi': 300,  # High DPI for crisp printing
-        })
-        
-        # Open the barcode image
-        barcode_image = Image.open(barcode_buffer)
-        
-        # Create a larger canvas for the delivery sticker
-        sticker_width = 500
-        sticker_height = 300
-        sticker = Image.new('RGB', (sticker_width, sticker_height), 'white')
-        
-        # Calculate positions - leave more room for text below
-        barcode_width, barcode_height = barcode_image.size
-        barcode_x = (sticker_width - barcode_width) // 2
-        barcode_y = 20  # Start higher to leave room for text below
-        
-        # Paste barcode onto sticker
-        sticker.paste(barcode_image, (barcode_x, barcode_y))
-        
-        # Add text with better fonts
-        draw = ImageDraw.Draw(sticker)
-        
-        # Try to use better fonts for delivery scanning
-        try:
-            font_large = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 24)
-            font_medium = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 18)
-            font_small = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 14)
-        except:
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 24)
-                font_medium = ImageFont.truetype("arial.ttf", 18)
-                font_small = ImageFont.truetype("arial.ttf", 14)
-            except:
-                try:
-                    # Try DejaVu Sans font (common on Linux)
-                    font_large = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-                    font_medium = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 18)
-                    font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
-                except:
-                    try:
-                        # Try Liberation Sans font
-                        font_large = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", 24)
-                        font_medium = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", 18)
-                        font_small = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", 14)
-                    except:
-                        # Use default font with larger size
-                        font_large = ImageFont.load_default()
-                        font_medium = ImageFont.load_default()
-                        font_small = ImageFont.load_default()
-        
-        # Add company name at top with delivery branding
-        company_text = "ZinToo Delivery"
-        if font_large:
-            company_bbox = draw.textbbox((0, 0), company_text, font=font_large)
-            company_width = company_bbox[2] - company_bbox[0]
-            company_x = (sticker_width - company_width) // 2
-            draw.text((company_x, 5), company_text, fill='black', font=font_large)
-        
-        # Add barcode number below barcode with better visibility
-        barcode_number_y = barcode_y + barcode_height + 15
-        
-        # Make sure the text fits within the image bounds
-        if barcode_number_y > sticker_height - 30:
-            barcode_number_y = sticker_height - 30
-        
-        if font_medium:
-            barcode_bbox = draw.textbbox((0, 0), barcode_text, font=font_medium)
-            barcode_text_width = barcode_bbox[2] - barcode_bbox[0]
-            barcode_text_x = (sticker_width - barcode_text_width) // 2
-            draw.text((barcode_text_x, barcode_number_y), barcode_text, fill='black', font=font_medium)
-        else:
-            # Fallback: draw text without font
-            draw.text((sticker_width//2, barcode_number_y), barcode_text, fill='black')
-        
-        # Add product info if provided
-        y_offset = barcode_number_y + 30
-        
-        if product_name and font_small:
-            # Truncate product name if too long
-            display_name = product_name[:30] + "..." if len(product_name) > 30 else product_name
-            name_bbox = draw.textbbox((0, 0), display_name, font=font_small)
-            name_width = name_bbox[2] - name_bbox[0]
-            name_x = (sticker_width - name_width) // 2
-            draw.text((name_x, y_offset), display_name, fill='black', font=font_small)
-            y_offset += 25
-        
-        if product_id and font_small:
-            id_text = f"Product ID: {product_id}"
-            id_bbox = draw.textbbox((0, 0), id_text, font=font_small)
-            id_width = id_bbox[2] - id_bbox[0]
-            id_x = (sticker_width - id_width) // 2
-            draw.text((id_x, y_offset), id_text, fill='black', font=font_small)
-            y_offset += 25
-        
-        # Add delivery instructions
-        if font_small:
-            delivery_text = "SCAN FOR DELIVERY"
-            delivery_bbox = draw.textbbox((0, 0), delivery_text, font=font_small)
-            delivery_width = delivery_bbox[2] - delivery_bbox[0]
-            delivery_x = (sticker_width - delivery_width) // 2
-            draw.text((delivery_x, y_offset), delivery_text, fill='red', font=font_small)
-        
-        # Add border for better visibility
-        draw.rectangle([0, 0, sticker_width-1, sticker_height-1], outline='black', width=2)
-        
-        # Convert to base64
-        output_buffer = io.BytesIO()
-        sticker.save(output_buffer, format='PNG', dpi=(300, 300))
-        output_buffer.seek(0)
-        
-        # Encode as base64
-        image_base64 = base64.b64encode(output_buffer.getvalue()).decode('utf-8')
-        
-        return f"data:image/png;base64,{image_base64}"
-        
+        # Rendered once per (barcode, name, id) and then served from the disk cache
+        return get_barcode_data_uri(barcode_text, product_name, product_id, layout="delivery")
     except Exception as e:
         print(f"Error generating delivery barcode image: {str(e)}")
         return None
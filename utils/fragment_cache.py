@@ -0,0 +1,158 @@
+# utils/fragment_cache.py
+"""
+Per-row cache of serialized model fragments (Product.to_dict,
+Order.as_dict, OrderItem.as_dict).
+
+Entries are keyed by (model, id) plus the values of every loaded column
+of the row, and an optional `state` tuple for data that lives on other
+rows (e.g. product_variant stock). updated_at alone is not enough: it only
+has one-second resolution and set-based UPDATEs may leave it untouched.
+Reading the raw column values is cheap next to serializing them, so an
+unchanged row is served without re-parsing its JSON columns or
+re-formatting its timestamps, while any write produces a new key; stale
+keys age out of the LRU.
+
+The cache is bounded both by entry count and by an approximate memory
+budget (FRAGMENT_CACHE_MAX_BYTES), which counts keys as well as values.
+Fragments are stored frozen (marshal bytes) and every caller gets a fresh
+deep copy, so mutating a fragment or its nested lists and dicts never
+leaks into the cache.
+"""
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import inspect as sa_inspect
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (built_at, size, frozen, value)
+_state = {"bytes": 0}
+_column_keys = {}  # model class -> column attribute keys that are loaded by default
+
+
+def _config(name, default):
+    try:
+        value = current_app.config.get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.getenv(name, default)
+    return type(default)(value)
+
+
+def _is_enabled():
+    flag = _config("FRAGMENT_CACHE_ENABLED", "true")
+    return flag.lower() in ("1", "true", "yes", "on")
+
+
+def approx_size(value):
+    """Rough in-memory footprint of a JSON-like value, in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += approx_size(key) + approx_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += approx_size(item)
+    return size
+
+
+def _copy(value):
+    """Deep copy of a JSON-like value (much cheaper than copy.deepcopy)"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _freeze(value):
+    """(frozen, stored) for a fragment; marshal round-trips builtin types several times faster than _copy"""
+    try:
+        return True, marshal.dumps(value)
+    except ValueError:
+        # e.g. a Decimal column value; keep the object and copy it on every read
+        return False, _copy(value)
+
+
+def _thaw(frozen, stored):
+    return marshal.loads(stored) if frozen else _copy(stored)
+
+
+def row_state(obj):
+    """Values of every non-deferred column of `obj`; any write to the row changes it"""
+    cls = type(obj)
+    keys = _column_keys.get(cls)
+    if keys is None:
+        keys = tuple(prop.key for prop in sa_inspect(cls).column_attrs if not prop.deferred)
+        _column_keys[cls] = keys
+    loaded = obj.__dict__
+    try:
+        return tuple([loaded[key] for key in keys])
+    except KeyError:
+        # Expired or not yet loaded: getattr reloads them first
+        return tuple(getattr(obj, key) for key in keys)
+
+
+def _evict(max_entries, max_bytes):
+    # Caller holds _lock
+    while _entries and (len(_entries) > max_entries or _state["bytes"] > max_bytes):
+        _, (_, size, _, _) = _entries.popitem(last=False)
+        _state["bytes"] -= size
+
+
+def fragment(obj, builder, variant=None, state=()):
+    """
+    Serialized fragment for model instance `obj`, built with `builder()` on
+    a miss. `variant` distinguishes different serializations of the same
+    row (e.g. a field projection); `state` adds data read from other rows.
+    """
+    row_id = getattr(obj, "id", None)
+    if row_id is None or not _is_enabled():
+        # Unsaved rows have no stable identity
+        return builder()
+
+    key = (type(obj).__name__, row_id, variant, row_state(obj), state)
+    max_age = _config("FRAGMENT_CACHE_MAX_AGE", 300.0)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and now - entry[0] < max_age:
+            _entries.move_to_end(key)
+            frozen, stored = entry[2], entry[3]
+        else:
+            stored = None
+    if stored is not None:
+        return _thaw(frozen, stored)
+
+    value = builder()
+
+    # The caller keeps `value`; the cache holds its own frozen copy
+    frozen, stored = _freeze(value)
+    size = (len(stored) if frozen else approx_size(stored)) + approx_size(key)
+    max_bytes = _config("FRAGMENT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    if size > max_bytes:
+        return value
+    with _lock:
+        previous = _entries.pop(key, None)
+        if previous:
+            _state["bytes"] -= previous[1]
+        _entries[key] = (now, size, frozen, stored)
+        _state["bytes"] += size
+        _evict(_config("FRAGMENT_CACHE_MAX_ENTRIES", 50000), max_bytes)
+    return value
+
+
+def clear_fragments():
+    """Drop every cached fragment in this process"""
+    with _lock:
+        _entries.clear()
+        _state["bytes"] = 0
+
+
+def fragment_cache_stats():
+    with _lock:
+        return {"entries": len(_entries), "bytes": _state["bytes"]}
@@ -0,0 +1,204 @@
+# utils/idempotency.py
+"""
+Idempotency-Key support for customer mutations (orders, wallet, payments).
+
+A client that may retry sends the same `Idempotency-Key` header on every
+attempt. The first attempt claims the key in the idempotency_key table and
+runs the endpoint; its response (already encrypted by the endpoint) is
+stored and replayed verbatim to later attempts without re-running anything.
+While the first attempt is still running, retries get 409; reusing a key
+for a different request body gets 422. Responses with a 5xx status are not
+stored, since the endpoint rolled back and a retry should run again.
+
+A claim is only released for a new attempt when the endpoint is known not
+to have committed (it raised or returned 5xx). If the response could not
+be stored, the claim becomes "completed_unrecorded", and a claim whose
+worker died stays "in_progress"; both answer 409 until the key expires,
+because the mutation may already have happened.
+
+Keys expire after IDEMPOTENCY_KEY_TTL seconds and are purged by
+purge_idempotency_keys.py. Requests without the header behave as before.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, jsonify, make_response, request
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.idempotency_key import IdempotencyKey
+from utils.crypto import decrypt_payload
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 100
+PURGE_BATCH_SIZE = 1000
+
+
+def _config(name, default):
+    try:
+        value = current_app.config.get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.getenv(name, default)
+    return type(default)(value)
+
+
+def _request_hash():
+    """sha256 of the request, using the decrypted payload so re-encrypted retries still match"""
+    body = request.get_json(silent=True)
+    encrypted = (body.get("payload") or body.get("data")) if isinstance(body, dict) else None
+    canonical = request.get_data(as_text=True)
+    if encrypted:
+        try:
+            canonical = json.dumps(decrypt_payload(encrypted), sort_keys=True, default=str)
+        except Exception:
+            canonical = encrypted
+    return hashlib.sha256(f"{request.method} {request.path}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _insert_claim(connection, customer_id, scope, key, request_hash, now):
+    table = IdempotencyKey.__table__
+    result = connection.execute(table.insert().values(
+        customer_id=customer_id,
+        scope=scope,
+        idempotency_key=key,
+        request_hash=request_hash,
+        status="in_progress",
+        created_at=now,
+        expires_at=now + timedelta(seconds=_config("IDEMPOTENCY_KEY_TTL", 86400)),
+    ))
+    return result.inserted_primary_key[0]
+
+
+def _claim(customer_id, scope, key, request_hash):
+    """
+    Claim the key for this request. Returns (claim_id, None) when this
+    request should run, or (None, existing row) when it was claimed before.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as connection:
+            return _insert_claim(connection, customer_id, scope, key, request_hash, now), None
+    except IntegrityError:
+        pass
+
+    with db.engine.begin() as connection:
+        existing = connection.execute(select(table).where(
+            table.c.customer_id == customer_id,
+            table.c.scope == scope,
+            table.c.idempotency_key == key,
+        )).mappings().first()
+        if existing is None:
+            # Purged between our insert and this read; let the client retry
+            return None, {"status": "in_progress"}
+        if existing["expires_at"] > now:
+            return None, dict(existing)
+        # Expired key: only one retry may take it over
+        deleted = connection.execute(table.delete().where(
+            table.c.id == existing["id"],
+            table.c.created_at == existing["created_at"],
+        )).rowcount
+        if deleted != 1:
+            return None, {"status": "in_progress"}
+        return _insert_claim(connection, customer_id, scope, key, request_hash, now), None
+
+
+def _complete(claim_id, response):
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as connection:
+        if response.status_code >= 500:
+            connection.execute(table.delete().where(table.c.id == claim_id))
+            return
+        connection.execute(table.update().where(table.c.id == claim_id).values(
+            status="completed",
+            response_status=response.status_code,
+            response_body=response.get_data(as_text=True),
+        ))
+
+
+def _mark_unrecorded(claim_id):
+    """The endpoint finished but its response could not be stored; never hand the key out again"""
+    try:
+        with db.engine.begin() as connection:
+            table = IdempotencyKey.__table__
+            connection.execute(table.update().where(table.c.id == claim_id).values(status="completed_unrecorded"))
+    except Exception as e:
+        print(f"[IDEMPOTENCY] Could not mark claim {claim_id} unrecorded: {str(e)}")
+
+
+def _release(claim_id):
+    try:
+        with db.engine.begin() as connection:
+            table = IdempotencyKey.__table__
+            connection.execute(table.delete().where(table.c.id == claim_id))
+    except Exception as e:
+        print(f"[IDEMPOTENCY] Could not release claim {claim_id}: {str(e)}")
+
+
+def idempotent(scope):
+    """
+    Make a customer endpoint replay-safe via the Idempotency-Key header.
+    Apply below @require_customer_auth so current_customer is available.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(current_customer, *args, **kwargs):
+            key = (request.headers.get(IDEMPOTENCY_HEADER) or "").strip()
+            if not key:
+                return f(current_customer, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            customer_id = int(current_customer["id"])
+            request_hash = _request_hash()
+            claim_id, existing = _claim(customer_id, scope, key, request_hash)
+
+            if existing is not None:
+                if existing["status"] == "completed_unrecorded":
+                    return jsonify({"error": "A request with this Idempotency-Key was already processed"}), 409
+                if existing["status"] != "completed":
+                    return jsonify({"error": "A request with this Idempotency-Key is still being processed"}), 409
+                if existing["request_hash"] != request_hash:
+                    return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+                print(f"[IDEMPOTENCY] Replaying {scope} response for key {key}")
+                replay = Response(existing["response_body"], status=existing["response_status"], mimetype="application/json")
+                replay.headers[REPLAYED_HEADER] = "true"
+                return replay
+
+            try:
+                response = make_response(f(current_customer, *args, **kwargs))
+            except Exception:
+                _release(claim_id)
+                raise
+            try:
+                _complete(claim_id, response)
+            except Exception as e:
+                # The mutation already happened; keep the claim so retries get 409, not a re-run
+                print(f"[IDEMPOTENCY] Could not store {scope} response for key {key}: {str(e)}")
+                if response.status_code < 500:
+                    _mark_unrecorded(claim_id)
+            return response
+        return decorated_function
+    return decorator
+
+
+def purge_expired_idempotency_keys(batch_size=PURGE_BATCH_SIZE):
+    """Delete expired keys in batches; returns the number of rows removed"""
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    removed = 0
+    while True:
+        with db.engine.begin() as connection:
+            ids = connection.execute(
+                select(table.c.id).where(table.c.expires_at < now).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            connection.execute(table.delete().where(table.c.id.in_(ids)))
+        removed += len(ids)
+    return removed
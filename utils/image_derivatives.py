@@ -0,0 +1,88 @@
+"""
+Resized WebP derivatives of uploaded images.
+
+Every original gets a full-size WebP copy plus one WebP per width in
+DERIVATIVE_WIDTHS that is narrower than the original. Derivatives are
+stored next to the original under a predictable name
+(`<name>_w400.webp`, `<name>_full.webp`); the full-size copy never
+reuses the original's name, so a .webp original is not overwritten.
+Encoding is CPU bound, so it runs in a spawned process pool; like
+utils/barcode_sheet this module imports no Flask or database code so
+workers start quickly.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+DERIVATIVE_WIDTHS = (200, 400, 800)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+FULL_SIZE_VARIANT = "webp"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process pool shared by all requests in this worker, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", "0")) or os.cpu_count() or 1
+            # spawn: never fork a process that holds DB connections and threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def variant_name(width):
+    return f"w{width}"
+
+
+def derivative_key(key, variant):
+    """Storage key for `variant` of the original at `key`"""
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    if variant == FULL_SIZE_VARIANT:
+        return f"{stem}_full.webp"
+    return f"{stem}_{variant}.webp"
+
+
+def _encode_webp(image):
+    output = io.BytesIO()
+    image.save(output, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def build_derivatives(data):
+    """{variant: webp bytes} for one original image; runs in a pool worker"""
+    image = Image.open(io.BytesIO(data))
+    # Phone photos carry their rotation in EXIF; bake it in before resizing
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    derivatives = {FULL_SIZE_VARIANT: _encode_webp(image)}
+    width, height = image.size
+    for target in DERIVATIVE_WIDTHS:
+        if target >= width:
+            continue
+        resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        derivatives[variant_name(target)] = _encode_webp(resized)
+    return derivatives
+
+
+def _build_or_none(data):
+    try:
+        return build_derivatives(data)
+    except Exception as e:
+        print(f"[IMAGE DERIVATIVES] Could not decode image: {str(e)}")
+        return None
+
+
+def build_derivatives_many(originals):
+    """build_derivatives for a list of byte strings in parallel; undecodable images give None"""
+    if not originals:
+        return []
+    if len(originals) == 1:
+        return [_build_or_none(originals[0])]
+    return list(_get_pool().map(_build_or_none, originals))
@@ -0,0 +1,77 @@
+"""
+Concurrent file uploads through a bounded, process-wide thread pool.
+
+Uploads are network bound, so threads are enough: each worker hands the
+request's file stream straight to the storage client (boto3's
+upload_fileobj reads it in chunks), nothing is buffered whole in memory.
+The uploader is a plain callable so the pipeline runs the same against S3,
+a moto-backed client or a local directory.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Upload pool shared by all requests in this worker, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=UPLOAD_MAX_WORKERS, thread_name_prefix="upload")
+        return _executor
+
+
+def _upload_one(upload, file):
+    try:
+        url = upload(file)
+    except Exception as e:
+        return {"filename": file.filename, "success": False, "error": str(e)}
+    if not url:
+        return {"filename": file.filename, "success": False, "error": f"Failed to upload file: {file.filename}"}
+    return {"filename": file.filename, "success": True, "url": url}
+
+
+def upload_files_concurrently(files, upload):
+    """
+    Run `upload(file) -> url` for every file on the shared pool.
+    Returns one result dict per file, in input order; a failing file does
+    not stop the others.
+    """
+    if not files:
+        return []
+    if len(files) == 1:
+        return [_upload_one(upload, files[0])]
+    futures = [_get_executor().submit(_upload_one, upload, f) for f in files]
+    return [future.result() for future in futures]
+
+
+def map_concurrently(func, items):
+    """[func(item) for item in items] on the shared pool; exceptions propagate"""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(_get_executor().map(func, items))
+
+
+def local_directory_uploader(base_dir, base_url):
+    """
+    Uploader that writes into `base_dir` and returns `base_url/<name>`;
+    a stand-in for S3 in local development and tests.
+    """
+    def upload(file):
+        os.makedirs(base_dir, exist_ok=True)
+        name = f"{uuid.uuid4().hex[:8]}_{os.path.basename(file.filename)}"
+        file.seek(0)
+        with open(os.path.join(base_dir, name), "wb") as out:
+            while True:
+                chunk = file.read(64 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
+        return f"{base_url.rstrip('/')}/{name}"
+    return upload
@@ -1,55 +1,260 @@
 # utils/s3_service.py
+"""
+Object storage for uploaded media.
+
+S3Service is the facade every caller uses; the bytes go to a backend:
+S3Backend in production or LocalDiskBackend (STORAGE_BACKEND=local) for
+offline development and tests. get_storage() returns one process-wide
+facade. Nothing touches the network until the first real storage call:
+the boto3 client is built lazily and there is no startup probe.
+"""
 import boto3
+import jwt
+import os
+import shutil
+import tempfile
+import threading
 import uuid
+from datetime import datetime, timedelta, timezone
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, NoCredentialsError
 from werkzeug.utils import secure_filename
 from config import Config
-import os
 
-class S3Service:
-    def __init__(self):
-        """Initialize S3 client with configuration from environment variables only"""
+STORAGE_BACKEND = Config.STORAGE_BACKEND
+# Upper bound on concurrent requests through one client (see utils/parallel_upload.py)
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "30"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "3"))
+LOCAL_STORAGE_DIR = os.getenv(
+    "LOCAL_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "storage"),
+)
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/api/storage/files")
+LOCAL_DIRECT_UPLOAD_URL = os.getenv("LOCAL_DIRECT_UPLOAD_URL", "/api/storage/direct-upload")
+
+
+class S3Backend:
+    """Bucket storage through one shared, connection-pooled boto3 client"""
+
+    def __init__(self, client=None):
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.bucket_name = Config.S3_BUCKET_NAME
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        # Validate all required environment variables are set
+        if not Config.AWS_ACCESS_KEY_ID:
+            raise ValueError("❌ AWS_ACCESS_KEY_ID environment variable is required")
+        if not Config.AWS_SECRET_ACCESS_KEY:
+            raise ValueError("❌ AWS_SECRET_ACCESS_KEY environment variable is required")
+        if not Config.AWS_REGION:
+            raise ValueError("❌ AWS_REGION environment variable is required")
+        if not Config.S3_BUCKET_NAME:
+            raise ValueError("❌ S3_BUCKET_NAME environment variable is required")
         try:
-            # Validate all required environment variables are set
-            if not Config.AWS_ACCESS_KEY_ID:
-                raise ValueError("❌ AWS_ACCESS_KEY_ID environment variable is required")
-            if not Config.AWS_SECRET_ACCESS_KEY:
-                raise ValueError("❌ AWS_SECRET_ACCESS_KEY environment variable is required")
-            if not Config.AWS_REGION:
-                raise ValueError("❌ AWS_REGION environment variable is required")
-            if not Config.S3_BUCKET_NAME:
-                raise ValueError("❌ S3_BUCKET_NAME environment variable is required")
-            
-            # Initialize S3 client with environment variables
-            self.s3_client = boto3.client(
+            # Clients are thread-safe; one per process shares its connection pool
+            return boto3.client(
                 's3',
                 aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-                region_name=Config.AWS_REGION
+                region_name=Config.AWS_REGION,
+                config=BotoConfig(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    connect_timeout=S3_CONNECT_TIMEOUT,
+                    read_timeout=S3_READ_TIMEOUT,
+                    retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "standard"},
+                ),
             )
+        except NoCredentialsError:
+            raise ValueError("❌ AWS credentials not found. Please set AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY in your .env file")
+
+    def url(self, key):
+        return f"https://{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/{key}"
+
+    def key_from_url(self, file_url):
+        # URL format: https://bucket-name.s3.region.amazonaws.com/folder/filename
+        marker = f"s3.{Config.AWS_REGION}.amazonaws.com/"
+        if not file_url or marker not in file_url:
+            return None
+        return file_url.split(marker, 1)[1]
+
+    def put_fileobj(self, fileobj, key, content_type):
+        # upload_fileobj streams in chunks (multipart for large files)
+        self.client.upload_fileobj(fileobj, self.bucket_name, key, ExtraArgs={'ContentType': content_type})
+
+    def put_bytes(self, data, key, content_type):
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data, ContentType=content_type)
+
+    def get_bytes(self, key):
+        return self.client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+
+    def exists(self, key):
+        return self.stat(key) is not None
+
+    def stat(self, key):
+        """(size, content type) of a stored object, or None if it is missing"""
+        try:
+            head = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+        return head["ContentLength"], head.get("ContentType")
+
+    def presign_post(self, key, content_type, max_bytes, expires_in):
+        """Browser-style POST form straight to the bucket, limited to one key, type and size"""
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=expires_in,
+        )
+
+
+class LocalDiskBackend:
+    """Files under a local directory, served by routes/storage.py; for dev and tests"""
+
+    def __init__(self, base_dir=LOCAL_STORAGE_DIR, base_url=LOCAL_STORAGE_URL):
+        self.base_dir = os.path.abspath(base_dir)
+        self.base_url = base_url.rstrip("/")
+        self.bucket_name = "local"
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.base_dir, key))
+        if not path.startswith(self.base_dir + os.sep):
+            raise ValueError(f"❌ Invalid storage key: {key}")
+        return path
+
+    def url(self, key):
+        return f"{self.base_url}/{key}"
+
+    def key_from_url(self, file_url):
+        prefix = self.base_url + "/"
+        if not file_url or not file_url.startswith(prefix):
+            return None
+        return file_url[len(prefix):]
+
+    def _write(self, key, write):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write(out)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def put_fileobj(self, fileobj, key, content_type):
+        self._write(key, lambda out: shutil.copyfileobj(fileobj, out))
+
+    def put_bytes(self, data, key, content_type):
+        self._write(key, lambda out: out.write(data))
+
+    def get_bytes(self, key):
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def stat(self, key):
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        # The type was enforced by the direct-upload route; nothing to report here
+        return os.path.getsize(path), None
+
+    def presign_post(self, key, content_type, max_bytes, expires_in):
+        """Same form shape as S3; the policy is checked by routes/storage.py"""
+        policy = jwt.encode({
+            "purpose": "local_direct_upload",
+            "key": key,
+            "content_type": content_type,
+            "max_bytes": max_bytes,
+            "exp": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        }, Config.SECRET_KEY, algorithm="HS256")
+        return {"url": LOCAL_DIRECT_UPLOAD_URL, "fields": {"key": key, "Content-Type": content_type, "policy": policy}}
+
+    @staticmethod
+    def verify_policy(policy):
+        """Decoded presign_post policy; raises ValueError when invalid or expired"""
+        try:
+            claims = jwt.decode(policy, Config.SECRET_KEY, algorithms=["HS256"])
+        except jwt.InvalidTokenError as e:
+            raise ValueError(f"Invalid upload policy: {str(e)}")
+        if claims.get("purpose") != "local_direct_upload":
+            raise ValueError("Invalid upload policy")
+        return claims
+
+
+def _default_backend():
+    if STORAGE_BACKEND == "local":
+        return LocalDiskBackend()
+    if STORAGE_BACKEND != "s3":
+        raise ValueError(f"❌ Unknown STORAGE_BACKEND: {STORAGE_BACKEND} (expected s3 or local)")
+    return S3Backend()
+
+
+class S3Service:
+    def __init__(self, backend=None, client=None, test_connection=False):
+        """
+        Storage facade over `backend` (default from STORAGE_BACKEND).
+        `client` wraps an existing boto3 client (e.g. a moto-backed one in tests);
+        `test_connection=True` probes the bucket with list_buckets.
+        """
+        try:
+            self.backend = backend or (S3Backend(client) if client is not None else _default_backend())
             
             # Set bucket and folder configurations from environment
-            self.bucket_name = Config.S3_BUCKET_NAME
-            self.category_folder = Config.S3_CATEGORY_FOLDER
-            self.product_folder = Config.S3_PRODUCT_FOLDER
-            self.review_folder = Config.S3_REVIEW_FOLDER
-            self.widget_folder = Config.S3_WIDGET_FOLDER
-            self.video_folder = Config.S3_VIDEO_FOLDER
-            self.document_folder = Config.S3_DOCUMENT_FOLDER
+            self.bucket_name = self.backend.bucket_name
+            self.category_folder = Config.S3_CATEGORY_FOLDER or "categories/"
+            self.product_folder = Config.S3_PRODUCT_FOLDER or "products/"
+            self.review_folder = Config.S3_REVIEW_FOLDER or "reviews/"
+            self.widget_folder = Config.S3_WIDGET_FOLDER or "widgets/"
+            self.video_folder = Config.S3_VIDEO_FOLDER or "videos/"
+            self.document_folder = Config.S3_DOCUMENT_FOLDER or "documents/"
             self.delivery_onboarding_folder = "delivery_onboarding/"
             
             # Test S3 connection
-            self._test_connection()
+            if test_connection:
+                self._test_connection()
             
-        except NoCredentialsError:
-            raise ValueError("❌ AWS credentials not found. Please set AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY in your .env file")
         except Exception as e:
             raise ValueError(f"❌ Error initializing S3 client: {str(e)}")
+
+    @property
+    def s3_client(self):
+        """Underlying boto3 client (S3 backend only), built on first access"""
+        return self.backend.client
     
     def _test_connection(self):
         """Test S3 connection by listing buckets"""
         try:
-            self.s3_client.list_buckets()
+            if isinstance(self.backend, S3Backend):
+                self.s3_client.list_buckets()
             print("✅ S3 connection successful")
         except Exception as e:
             raise ValueError(f"❌ S3 connection failed: {str(e)}. Please check your AWS credentials and region.")
@@ -87,17 +292,10 @@ class S3Service:
             file.seek(0)
             
             # Upload file to S3
-            self.s3_client.upload_fileobj(
-                file,
-                self.bucket_name,
-                s3_key,
-                ExtraArgs={
-                    'ContentType': file.content_type or 'application/octet-stream'
-                }
-            )
+            self.backend.put_fileobj(file, s3_key, file.content_type or 'application/octet-stream')
             
             # Generate public URL
-            public_url = f"https://{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/{s3_key}"
+            public_url = self.public_url(s3_key)
             
             print(f"✅ File uploaded successfully: {public_url}")
             return public_url
@@ -162,17 +360,10 @@ class S3Service:
             file.seek(0)
             
             # Upload file to S3
-            self.s3_client.upload_fileobj(
-                file,
-                self.bucket_name,
-                s3_key,
-                ExtraArgs={
-                    'ContentType': file.content_type or 'application/octet-stream'
-                }
-            )
+            self.backend.put_fileobj(file, s3_key, file.content_type or 'application/octet-stream')
             
             # Generate public URL
-            public_url = f"https://{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/{s3_key}"
+            public_url = self.public_url(s3_key)
             
             print(f"✅ Product file uploaded successfully: {public_url}")
             return public_url
@@ -186,6 +377,31 @@ class S3Service:
             print(error_msg)
             raise ValueError(error_msg)
 
+    def public_url(self, s3_key):
+        return self.backend.url(s3_key)
+
+    def key_from_url(self, file_url):
+        """Storage key of one of our public URLs, or None for foreign URLs"""
+        return self.backend.key_from_url(file_url)
+
+    def upload_bytes(self, data, s3_key, content_type="application/octet-stream"):
+        """Store generated content (e.g. image derivatives) under `s3_key` and return its public URL"""
+        try:
+            self.backend.put_bytes(data, s3_key, content_type)
+            return self.public_url(s3_key)
+        except ClientError as e:
+            raise ValueError(f"❌ S3 upload error: {str(e)}")
+
+    def read_file(self, file_url):
+        """Bytes of one of our public URLs"""
+        s3_key = self.key_from_url(file_url)
+        if not s3_key:
+            raise ValueError(f"❌ Invalid S3 URL format: {file_url}")
+        try:
+            return self.backend.get_bytes(s3_key)
+        except (ClientError, OSError) as e:
+            raise ValueError(f"❌ S3 read error: {str(e)}")
+
     def delete_file(self, file_url):
         """
         Delete file from S3 using the public URL
@@ -200,21 +416,13 @@ class S3Service:
             if not file_url:
                 return True
             
-            # Extract S3 key from URL
-            # URL format: https://bucket-name.s3.region.amazonaws.com/folder/filename
-            if f"s3.{Config.AWS_REGION}.amazonaws.com/" in file_url:
-                s3_key = file_url.split(f"s3.{Config.AWS_REGION}.amazonaws.com/", 1)[1]
-            elif f"{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/" in file_url:
-                s3_key = file_url.split(f"{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/", 1)[1]
-            else:
+            s3_key = self.key_from_url(file_url)
+            if not s3_key:
                 print(f"❌ Invalid S3 URL format: {file_url}")
                 return False
             
             # Delete file from S3
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
+            self.backend.delete(s3_key)
             
             print(f"✅ File deleted successfully: {s3_key}")
             return True
@@ -243,17 +451,12 @@ class S3Service:
             if not file_url:
                 return False
             
-            # Extract S3 key from URL
-            if f"s3.{Config.AWS_REGION}.amazonaws.com/" in file_url:
-                s3_key = file_url.split(f"s3.{Config.AWS_REGION}.amazonaws.com/", 1)[1]
-            elif f"{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/" in file_url:
-                s3_key = file_url.split(f"{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/", 1)[1]
-            else:
+            s3_key = self.key_from_url(file_url)
+            if not s3_key:
                 return False
             
             # Check if object exists
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
-            return True
+            return self.backend.exists(s3_key)
             
         except ClientError as e:
             if e.response['Error']['Code'] == '404':
@@ -331,7 +534,31 @@ class S3Service:
         Returns:
             str: Public URL
         """
-        return f"https://{self.bucket_name}.s3.{Config.AWS_REGION}.amazonaws.com/{s3_key}"
+        return self.public_url(s3_key)
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+def get_storage():
+    """Process-wide storage facade, created on first use"""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = S3Service()
+    return _shared_service
+
+def set_storage(service):
+    """Replace the process-wide facade (tests, scripts pointing at another backend)"""
+    global _shared_service
+    with _shared_lock:
+        _shared_service = service
+
+class _LazyStorage:
+    """Module-level handle that resolves to get_storage() on first attribute access"""
+
+    def __getattr__(self, name):
+        return getattr(get_storage(), name)
 
-# Create a global instance
-s3_service = S3Service()
+# Shared instance for `from utils.s3_service import s3_service` callers
+s3_service = _LazyStorage()